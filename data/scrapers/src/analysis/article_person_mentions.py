@@ -26,6 +26,8 @@ from pathlib import Path
 from typing import Any
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from tqdm import tqdm
 
 from analysis.utils import as_sequence
@@ -56,6 +58,10 @@ JUDGE_VERSION = 1
 # below the vLLM total-context cap (32768 tokens) minus the prompt, or the
 # server rejects the request with HTTP 400.
 MAX_TOKENS = 16000
+# A judgement that is still thinking past this many characters is in a loop,
+# not close to a verdict: the stream is cut there, freeing the lane for the
+# next pair, and the pair is re-asked without thinking like any `unknown`.
+MAX_THINK_CHARS = 24000
 TEMPERATURE = 0.0
 TEXT_LIMIT = 30000
 # Window of article text sent to the judge around the first name match. Long
@@ -79,6 +85,17 @@ _RUN_RE = re.compile(rf"(?:{_WORD}\s+){{1,{_MAX_RUN_WORDS - 1}}}{_WORD}")
 # truncated article excerpt, so verdicts can be eyeballed later.
 _DEBUG_FILE = Path(VERSIONED_DIR) / "article_person_mentions" / "judge_debug.jsonl"
 _DEBUG_CONTENT_LIMIT = 2000
+# What the scan reads of article_parsed; outbound_urls, most of each row, is
+# never decoded.
+_SCANNED_COLUMNS = [
+    "url",
+    "domain",
+    "parse_status",
+    "title",
+    "publication_date",
+    "ld_json",
+    "article_content",
+]
 
 
 def _name_tuple(name: str) -> tuple[str, ...]:
@@ -529,24 +546,37 @@ def _display_name(row: dict[str, Any]) -> str:
 def _krs_name_map() -> dict[str, str]:
     """krs -> company name, from the company pipelines' outputs."""
     names: dict[str, str] = {}
-    for rel in ("company_krs/company_krs.jsonl", "company_kmgp/company_kmgp.jsonl"):
-        path = Path(VERSIONED_DIR) / rel
-        try:
-            with open(path, encoding="utf-8") as handle:
-                for line in handle:
-                    raw = line.strip()
-                    if not raw:
-                        continue
-                    try:
-                        row = json.loads(raw)
-                    except Exception:
-                        continue
-                    krs = row.get("krs")
-                    name = row.get("name")
-                    if krs and name and krs not in names:
-                        names[str(krs)] = str(name)
-        except FileNotFoundError:
-            continue
+    # company_krs is Parquet, so the two columns needed come straight off disk
+    # without parsing the rest of every row.
+    try:
+        krs_companies = pd.read_parquet(
+            Path(VERSIONED_DIR) / "company_krs" / "company_krs.parquet",
+            columns=["krs", "name"],
+        )
+    except FileNotFoundError:
+        pass
+    else:
+        for krs, name in zip(krs_companies["krs"], krs_companies["name"]):
+            if isinstance(krs, str) and isinstance(name, str) and krs and name:
+                names.setdefault(krs, name)
+
+    path = Path(VERSIONED_DIR) / "company_kmgp" / "company_kmgp.jsonl"
+    try:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                raw = line.strip()
+                if not raw:
+                    continue
+                try:
+                    row = json.loads(raw)
+                except Exception:
+                    continue
+                krs = row.get("krs")
+                name = row.get("name")
+                if krs and name and krs not in names:
+                    names[str(krs)] = str(name)
+    except FileNotFoundError:
+        pass
     return names
 
 
@@ -756,15 +786,18 @@ def _judge_multi_request(
             f"organizacje={', '.join(orgs) or 'brak'}, "
             f"sygnały={proof_text}"
         )
+    article = _context_window(content, person)
     return LLMRequest(
         prompt=_JUDGE_MULTI_PROMPT.format(
-            article=_context_window(content, person),
+            article=article,
             candidates="\n".join(lines),
         ),
         max_tokens=MAX_TOKENS,
         temperature=TEMPERATURE,
         model=model,
         enable_thinking=True,
+        affinity=article,
+        max_think_chars=MAX_THINK_CHARS,
     )
 
 
@@ -846,9 +879,12 @@ def _judge_request(
         if same_name_count > 1
         else ""
     )
+    # The excerpt comes before anything about the candidate, so every candidate
+    # of one name shares the prompt up to it; see `LLMRequest.affinity`.
+    article = _context_window(content, person)
     return LLMRequest(
         prompt=_JUDGE_PROMPT.format(
-            article=_context_window(content, person),
+            article=article,
             name=person,
             parties=", ".join(parties) or "brak",
             regions=", ".join(regions) or "brak",
@@ -860,6 +896,8 @@ def _judge_request(
         temperature=TEMPERATURE,
         model=model,
         enable_thinking=True,
+        affinity=article,
+        max_think_chars=MAX_THINK_CHARS,
     )
 
 
@@ -1023,7 +1061,7 @@ async def _submit_requests(
 
 async def _scan_and_judge(
     ctx: Context,
-    parsed_path: Path,
+    parsed: Iterable[pa.RecordBatch],
     index: PersonNameIndex,
     profiles: PersonProfileIndex,
     domain_map: DomainRegionMap,
@@ -1033,10 +1071,10 @@ async def _scan_and_judge(
 ) -> None:
     """Scan parsed articles and LLM-judge confirmed matches on the fly.
 
-    Reads the corpus line by line; every article whose names pass the proof
+    Reads the corpus a batch at a time; every article whose names pass the proof
     filter has its (article, person) pairs submitted to the LLM response pool
     immediately, so judging overlaps the scan and article text is never kept in
-    memory. Each row is emitted as soon as its last request lands.
+    memory past its batch. Each row is emitted as soon as its last request lands.
     """
     await LLM.from_context(ctx).check_health()
 
@@ -1069,6 +1107,7 @@ async def _scan_and_judge(
                 temperature=TEMPERATURE,
                 model=request.model,
                 enable_thinking=False,
+                affinity=request.affinity,
             )
             while pool.is_full():
                 await drain(pool)
@@ -1081,43 +1120,38 @@ async def _scan_and_judge(
 
     with tqdm(total=0, desc="Judging mentions", unit="pair") as bar:
         async with LLM.from_context(ctx).response_pool() as pool:
-            with parsed_path.open(encoding="utf-8") as f:
-                for line in tqdm(f, desc="Scanning parsed articles", unit="article"):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        raw = json.loads(line)
-                    except Exception:
-                        continue
-                    if raw.get("parse_status") != "ok":
-                        continue
-                    content = (
-                        str(raw.get("title") or "")
-                        + " "
-                        + str(raw.get("article_content") or "")
-                    )
-                    if not content.strip():
-                        continue
-                    built = _build_requests(
-                        raw,
-                        content,
-                        index,
-                        profiles,
-                        domain_map,
-                        generic_org_stems,
-                        model,
-                    )
-                    if built is None:
-                        continue
-                    row, requests, dropped_in_article = built
-                    dropped += dropped_in_article
-                    candidates += len(requests)
-                    rows += 1
-                    bar.total += len(requests)
-                    await _submit_requests(
-                        pool, inflight, drain, row, content, requests
-                    )
+            with tqdm(desc="Scanning parsed articles", unit="article") as scan:
+                for batch in parsed:
+                    scan.update(batch.num_rows)
+                    for raw in batch.to_pylist():
+                        content = (
+                            str(raw["title"] or "")
+                            + " "
+                            + str(raw["article_content"] or "")
+                        )
+                        if not content.strip():
+                            continue
+                        if raw["ld_json"] is not None:
+                            raw["ld_json"] = json.loads(raw["ld_json"])
+                        built = _build_requests(
+                            raw,
+                            content,
+                            index,
+                            profiles,
+                            domain_map,
+                            generic_org_stems,
+                            model,
+                        )
+                        if built is None:
+                            continue
+                        row, requests, dropped_in_article = built
+                        dropped += dropped_in_article
+                        candidates += len(requests)
+                        rows += 1
+                        bar.total += len(requests)
+                        await _submit_requests(
+                            pool, inflight, drain, row, content, requests
+                        )
             while inflight:
                 await drain(pool)
 
@@ -1177,8 +1211,7 @@ class ArticlePersonMentions(IncrementalJsonlPipeline[ArticlePersonMentioned]):
         domain_map = DomainRegionMap(self.domain_regions.final_output_path)
         print(f"Loaded region map for {len(domain_map._data):,} domains")
 
-        parsed_path = self.parsed.final_output_path
-        if not parsed_path.exists():
+        if not self.parsed.final_output_path.exists():
             print("No parsed articles found, nothing to emit")
             return pd.DataFrame()
 
@@ -1186,7 +1219,11 @@ class ArticlePersonMentions(IncrementalJsonlPipeline[ArticlePersonMentioned]):
         asyncio.run(
             _scan_and_judge(
                 ctx,
-                parsed_path,
+                self.parsed.read_batches(
+                    ctx,
+                    columns=_SCANNED_COLUMNS,
+                    where=pc.field("parse_status") == "ok",
+                ),
                 index,
                 profiles,
                 domain_map,
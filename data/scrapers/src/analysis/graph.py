@@ -1,12 +1,19 @@
+import itertools
 import typing
 
-import networkx as nx
+import numpy as np
 import pandas as pd
 
 from analysis.people_pkw_merged import PeoplePKWMerged
+from analysis.ppr import adjacency, personalized_pagerank
 from scrapers.pkw.elections import committee_to_party
 from scrapers.stores import Context, Pipeline
 
+#: How many groups `calculate_ppr_scores` walks from in one iteration. Each
+#: costs a column of floats over the whole graph, so every PKW committee at
+#: once would not fit in memory on a nationwide graph.
+PPR_GROUP_BATCH = 64
+
 
 def flatten_parties(df):
     df["person_id"] = (
@@ -122,84 +129,64 @@ def calculate_ppr_scores(
     """
 
     print("Building the graph...")
-    # 1. Create a directed graph
-    G: nx.DiGraph = nx.DiGraph()
-
-    # We must add prefixes to node IDs to prevent collisions
-    def p_node(pid):
-        return f"p_{pid}"
-
-    def s_node(sid):
-        return f"s_{sid}"
-
-    def g_node(gid):
-        return f"g_{gid}"
-
-    # 2. Build the reversed graph structure
-
-    # Add 'Group -> Subgroup' edges
-    for _, row in df_subgroups_groups.iterrows():
-        G.add_edge(g_node(row["group_id"]), s_node(row["subgroup_id"]))
-
-    # Add 'Subgroup <-> Person' edges (bi-directional)
-    # This allows influence to flow from S->P and also P->S,
-    # which is crucial for your indirect connection (P1 -> S1 -> P2 -> S2)
-    for _, row in df_people_subgroups.iterrows():
-        person_id = p_node(row["person_id"])
-        subgroup_id = s_node(row["subgroup_id"])
-        G.add_edge(subgroup_id, person_id)  # S -> P
-        G.add_edge(person_id, subgroup_id)  # P -> S
+    # Every id is numbered within its own kind - people first, then subgroups,
+    # then groups - so a person and a party that share a name stay apart. Ids
+    # are compared as strings, as they were when they were node names.
+    people = df_people_subgroups["person_id"].astype(str)
+    memberships = df_people_subgroups["subgroup_id"].astype(str)
+    parents = df_subgroups_groups["subgroup_id"].astype(str)
+    groups = df_subgroups_groups["group_id"].astype(str)
+
+    person_codes, person_ids = pd.factorize(people)
+    subgroup_codes, subgroup_ids = pd.factorize(pd.concat([memberships, parents]))
+    group_codes, group_ids = pd.factorize(groups)
+    first_group = len(person_ids) + len(subgroup_ids)
+    subgroup_codes = subgroup_codes + len(person_ids)
+    group_codes = group_codes + first_group
+    size = first_group + len(group_ids)
+
+    member_of = subgroup_codes[: len(memberships)]
+    parent_of = subgroup_codes[len(memberships) :]
+    # Group -> Subgroup one way; Subgroup <-> Person both ways, which is what
+    # lets influence reach a person indirectly (P1 -> S1 -> P2 -> S2).
+    graph = adjacency(
+        np.concatenate([group_codes, member_of, person_codes]),
+        np.concatenate([parent_of, person_codes, member_of]),
+        1.0,
+        size,
+    )
 
-    # Get unique node lists for filtering later
     if measured_id == "person_id":
-        measured_nodes = [
-            p_node(pid) for pid in df_people_subgroups["person_id"].unique()
-        ]
+        measured_ids, measured_nodes = person_ids, np.arange(len(person_ids))
     elif measured_id == "subgroup_id":
-        measured_nodes = [
-            s_node(pid) for pid in df_people_subgroups["subgroup_id"].unique()
-        ]
-    group_nodes = [g_node(gid) for gid in df_subgroups_groups["group_id"].unique()]
-
-    print(f"Graph built: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges.")
-    print(f"Found {len(measured_nodes)} measured nodes and {len(group_nodes)} groups.")
-
-    # 3. Run Personalized PageRank for each group
-    all_scores = {}
-
-    for i, group_node in enumerate(group_nodes):
-        print(f"Calculating PPR for group {i + 1}/{len(group_nodes)} ({group_node})...")
-
-        # Create the personalization vector
-        # This vector tells PageRank to "teleport" back to our target group
-        personalization = {node: 0 for node in G.nodes()}
-        personalization[group_node] = 1
-
-        # Run PageRank
-        ppr_scores = nx.pagerank(
-            G, alpha=alpha, personalization=personalization, nstart=personalization
-        )
-
-        # 4. Extract scores for *measured* nodes only
-        group_results = {}
-        for p_id in measured_nodes:
-            # .get(p_id, 0) ensures a score of 0 if a person is
-            # in a completely disconnected part of the graph
-            group_results[p_id] = ppr_scores.get(p_id, 0)
-
-        all_scores[group_node] = group_results
-
-    # 5. Convert to DataFrame and Normalize
+        measured_codes = np.unique(member_of)
+        measured_ids = subgroup_ids[measured_codes - len(person_ids)]
+        measured_nodes = measured_codes
+
+    print(f"Graph built: {size} nodes, {graph.nnz} edges.")
+    print(f"Found {len(measured_ids)} measured nodes and {len(group_ids)} groups.")
+
+    # 1. Run Personalized PageRank for every group at once: one teleport
+    # column per group, batched so the dense nodes x groups matrix stays small.
+    scores = np.zeros((len(measured_nodes), len(group_ids)))
+    for batch in itertools.batched(range(len(group_ids)), PPR_GROUP_BATCH):
+        columns = list(batch)
+        print(f"Calculating PPR for groups {columns[0] + 1}-{columns[-1] + 1}...")
+        personalization = np.zeros((size, len(columns)))
+        personalization[first_group + np.array(columns), range(len(columns))] = 1
+        walks = personalized_pagerank(graph, personalization, alpha=alpha)
+        # 2. Extract scores for *measured* nodes only
+        scores[:, columns] = walks[measured_nodes]
+
+    # 3. Convert to DataFrame and Normalize
     print("Normalizing scores...")
 
     # Create the (Person x Group) score matrix
-    df_scores = pd.DataFrame(all_scores)
-
-    # Clean up the index and column names (remove 'p_' and 'g_')
-    df_scores.index = df_scores.index.map(lambda x: x[2:])
-    df_scores.columns = df_scores.columns.map(lambda x: x[2:])
-    df_scores.index.name = measured_id
-    df_scores.columns.name = "group_id"
+    df_scores = pd.DataFrame(
+        scores,
+        index=pd.Index(measured_ids, name=measured_id),
+        columns=pd.Index(group_ids, name="group_id"),
+    )
 
     if normalize_rows:
         average_row = df_scores.sum().sum() / len(df_scores[df_scores.sum(axis=1) > 0])
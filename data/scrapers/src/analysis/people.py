@@ -1,6 +1,9 @@
 import math
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from analysis.people_krs_merged import PeopleKRSMerged
 from analysis.people_pkw_merged import PeoplePKWMerged
@@ -27,42 +30,67 @@ SAMPLE_FILTER = ""
 
 
 LN_10 = math.log(10)
+# Assumed when the region has no count for the last name.
+MISSING_NAME_COUNT = 50000.0
 
 
-def unique_probability(
-    p1: float, p2: float | None, second_name_match: bool, n: float
-) -> float:
+def unique_probabilities(
+    p1: np.ndarray, p2: np.ndarray, second_name_match: np.ndarray, n: np.ndarray
+) -> np.ndarray:
     """
-    Calculates the probability of no accidental match.
+    Calculates the probability of no accidental match, for whole columns.
     p1: probability of the first name.
     p2: probability of the second name (or 1.0 if no second name).
     n: number of people with the same last name in the region.
+    NaN stands for a missing probability. A missing count is for the callers
+    to fill in with MISSING_NAME_COUNT; a NaN one gives NaN back, as it did
+    when this was computed a pair at a time.
     """
-
-    if p2 is None or math.isnan(p2) or not second_name_match:
-        p2 = 1.0
-    if p1 is None or math.isnan(p1):
-        p1 = 1.0
-
+    p1 = np.where(np.isnan(p1), 1.0, p1)
+    p2 = np.where(np.isnan(p2) | ~second_name_match.astype(bool), 1.0, p2)
     p_combined = p1 * p2
-    if n is None:
-        n = 50000
     n = n / 40
-    if p_combined is None or p_combined == 1:
-        return 0
+
     # Poisson approximation for (1-p)^n ~= exp(-n*p) to avoid floating point issues
     # Probability of no collision is exp(-n*p)
     # We are interested in high precision, so we're returning
     # e^(-ln 10) = 1/10, so ln 10 is the number of zeroes
     # (n * p_combined) / LN_10) should be good
+    chance = np.where(n < 50, np.power(1 - p_combined, n), np.exp(-n * p_combined))
+    return np.where(p_combined == 1, 0.0, chance)
+
+
+def unique_probability(
+    p1: float | None, p2: float | None, second_name_match: bool, n: float | None
+) -> float:
+    """`unique_probabilities` for one pair, with None for anything missing."""
+
+    def column(value: float | None) -> np.ndarray:
+        return np.array([math.nan if value is None else value], dtype=np.float64)
 
-    if n < 50:
-        return math.pow(1 - p_combined, n)
-    return math.exp(-n * p_combined)
+    match = np.array([bool(second_name_match)])
+    count = column(MISSING_NAME_COUNT if n is None else n)
+    return float(unique_probabilities(column(p1), column(p2), match, count)[0])
+
+
+def _unique_probability_arrow(
+    p1: pa.Array, p2: pa.Array, second_name_match: pa.Array, n: pa.Array
+) -> pa.Array:
+    """`unique_probabilities` as a DuckDB UDF, a vector of rows per call."""
+
+    def column(values: pa.Array) -> np.ndarray:
+        return values.cast(pa.float64()).to_numpy(zero_copy_only=False)
+
+    match = pc.fill_null(second_name_match, False).to_numpy(zero_copy_only=False)
+    count = column(pc.fill_null(n.cast(pa.float64()), MISSING_NAME_COUNT))
+    return pa.array(unique_probabilities(column(p1), column(p2), match, count))
 
 
 class PeopleMerged(Pipeline):
     filename = "people_merged"
+    # Read by every payload and score pipeline; reloading it as JSONL was most
+    # of their start-up time.
+    format = "parquet"
 
     people_krs: PeopleKRSMerged
     people_wiki: PeopleWikiMerged
@@ -89,19 +117,32 @@ def people_merged(
     pkw_people,  # noqa: F841
     names_count_by_region_table,  # noqa: F841
     first_name_freq_table,  # noqa: F841
+    koryta_people: pd.DataFrame | None = None,
 ):
     con = ctx.con
+    # Types by name: scrapers.krs.scrape imports this module, and scrapers may
+    # not depend on duckdb, so duckdb.sqltypes is not imported here.
     con.create_function(
         "unique_probability",
-        unique_probability,
+        _unique_probability_arrow,
+        ["DOUBLE", "DOUBLE", "BOOLEAN", "DOUBLE"],  # type: ignore
+        "DOUBLE",  # type: ignore
+        type="arrow",  # type: ignore
         null_handling="special",  # type: ignore
     )
-
-    # TODO koryta_people = people_koryta_merged.process(ctx)
-    koryta_people = pd.DataFrame(  # noqa: F841
-        data=[{"first_name": "empty", "last_name": "empty", "full_name": "empty"}]
+    # The padded bigrams of a name: '^ab$' gives '^a', 'ab', 'b$'. The keys of
+    # the n-gram index the fuzzy koryta join is blocked on.
+    con.execute(
+        "CREATE OR REPLACE MACRO name_bigrams(name) AS list_distinct(list_transform("
+        "range(1, length(name) + 2), lambda i: substring('^' || name || '$', i, 2)))"
     )
 
+    if koryta_people is None:
+        # TODO koryta_people = people_koryta_merged.process(ctx)
+        koryta_people = pd.DataFrame(  # noqa: F841
+            data=[{"first_name": "empty", "last_name": "empty", "full_name": "empty"}]
+        )
+
     print("--- Imported table sizes ---")
     for table in [
         "krs_people",
@@ -263,13 +304,34 @@ def people_merged(
         FROM krs_pkw kp
         LEFT JOIN wiki_match w USING (krs_row)
     ),
+    koryta_numbered AS (
+        SELECT row_number() OVER () as koryta_row, * FROM koryta_people
+    ),
+    koryta_candidates AS (
+        -- The koryta join is fuzzy on both names, so there is no key for it to
+        -- hash on and every merged person would be compared with every koryta
+        -- one. Only last names that share a padded bigram are compared: two
+        -- over 0.95 either start with the same letter or agree on nearly every
+        -- letter in order, and either way they share one.
+        SELECT DISTINCT k.base_last_name, ko.koryta_row
+        FROM (
+            SELECT base_last_name, unnest(name_bigrams(base_last_name)) as gram
+            FROM (SELECT DISTINCT base_last_name FROM krs_pkw_wiki)
+        ) k
+        JOIN (
+            SELECT koryta_row, last_name, unnest(name_bigrams(last_name)) as gram
+            FROM koryta_numbered
+        ) ko USING (gram)
+        WHERE jaro_winkler_similarity(k.base_last_name, ko.last_name) > 0.95
+    ),
     all_sources AS (
         SELECT
             kpw.*,
             ko.full_name as koryta_name,
         FROM krs_pkw_wiki kpw
-        LEFT JOIN koryta_people ko
-            ON jaro_winkler_similarity(kpw.base_last_name, ko.last_name) > 0.95
+        LEFT JOIN (
+            koryta_candidates c JOIN koryta_numbered ko USING (koryta_row)
+        ) ON kpw.base_last_name = c.base_last_name
             AND jaro_winkler_similarity(kpw.base_first_name, ko.first_name) > 0.95
     ),
     scored AS (
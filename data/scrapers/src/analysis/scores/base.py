@@ -20,8 +20,11 @@ generously would otherwise win every tie.
 """
 
 import dataclasses
+import functools
+import threading
 import typing
 
+import numpy as np
 import pandas as pd
 
 from analysis.payloads.person import PeoplePayloads
@@ -29,6 +32,7 @@ from entities.composite import PersonScore
 from scrapers.koryta.download import KorytaPeople, KorytaVotes
 from scrapers.krs.list import CompaniesKRS
 from scrapers.stores import Context, Pipeline
+from scrapers.stores.manifest import code_version
 
 #: How strongly a published page counts as "we already decided this one is
 #: interesting". A page gets published after a human wrote it up, so it is
@@ -46,6 +50,15 @@ SCORE_BANDS: tuple[tuple[float, int], ...] = (
     (0.0, 1),
 )
 
+#: The columns of `Population.posts` and `Population.elections`.
+POST_COLUMNS = ["name", "krs", "role", "start", "end", "current"]
+ELECTION_COLUMNS = ["name", "year", "teryt", "party", "committee"]
+
+#: The population the last model built, and the source versions it was built
+#: from. See `PeopleScoreModel.shared_population`.
+_shared_population: tuple[tuple, "Population"] | None = None
+_population_lock = threading.Lock()
+
 
 def iter_dicts(value: typing.Any) -> typing.Iterator[dict]:
     """The dict entries of a payload list column, whatever pandas made of it.
@@ -63,6 +76,60 @@ def iter_dicts(value: typing.Any) -> typing.Iterator[dict]:
             yield item
 
 
+def column(df: pd.DataFrame, name: str) -> pd.Series:
+    """`df[name]`, or None for every row of a frame that has no such column."""
+    if name in df:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def payload_entries(
+    people: pd.DataFrame, list_column: str, fields: dict[str, str]
+) -> pd.DataFrame:
+    """Every dict of a payload list column as a row of its own.
+
+    `fields` maps the payload key to the column it lands in, and `row` is the
+    position of the payload row it came from. A key the dict lacks comes out
+    as None, the way `dict.get` had it, not as NaN.
+    """
+    entries = pd.Series(
+        [list(iter_dicts(value)) for value in column(people, list_column)],
+        dtype=object,
+    )
+    entries = entries.explode().dropna()
+    table = pd.DataFrame.from_records(entries.tolist(), columns=list(fields))
+    table = table.rename(columns=fields).astype(object)
+    table = table.where(table.notna(), None)
+    table.insert(0, "row", entries.index.to_numpy(dtype=int))
+    return table
+
+
+def source_version(ctx: Context, source: Pipeline) -> typing.Any:
+    """What `source` reads as in this run, or None if that is not settled yet.
+
+    An output on disk goes by `output_version`, and is not settled while this
+    run is still going to refresh it. `PeoplePayloads` and `Extract` keep no
+    output - they are worked out again by every model that reads them - so
+    they go by their code, their arguments and, recursively, their own
+    sources: the same inputs put through the same code give the same payloads.
+    """
+    policy = ctx.refresh_policy
+    if source.filename is not None:
+        name = source.pipeline_name
+        refresh, _ = policy.execution_decisions.get(name, (False, ""))
+        if refresh and name not in policy.refreshed_pipelines:
+            return None
+        return source.output_version(ctx)
+
+    inputs = []
+    for dep in source.dependencies.values():
+        version = source_version(ctx, dep)
+        if version is None:
+            return None
+        inputs.append((dep.pipeline_name, version))
+    return (code_version(type(source)), source.run_arguments(), tuple(inputs))
+
+
 @dataclasses.dataclass
 class Employment:
     krs: str
@@ -107,12 +174,14 @@ class Population:
     #: Person name -> koryta node id. Only people the site already has a node
     #: for; a model cannot vote on anybody else.
     node_ids: dict[str, str]
-    #: Person name -> posts held, in payload order.
-    employments: dict[str, list[Employment]]
-    #: Person name -> candidacies stood.
-    candidacies: dict[str, list[Candidacy]]
-    #: KRS -> everybody the payloads put in that company.
-    roster: dict[str, list[str]]
+    #: Every person name in the payloads, in payload order, repeats included.
+    names: np.ndarray
+    #: One row per post in the payloads, `POST_COLUMNS`, in payload order.
+    #: `current` marks the posts of a name's last payload row, which are the
+    #: ones it is taken to hold; every row puts it on a roster.
+    posts: pd.DataFrame
+    #: One row per candidacy of a name's last payload row, `ELECTION_COLUMNS`.
+    elections: pd.DataFrame
     #: KRS -> what the KRS register says about the company.
     companies: dict[str, CompanyFacts]
     #: Person name -> how firmly the site has already judged them. Positive for
@@ -126,6 +195,46 @@ class Population:
     #: something they already know.
     shortlist: list[str]
 
+    # The tables are what is kept and shared between the models; the per-name
+    # dicts the models walk are built from them on first use.
+
+    @functools.cached_property
+    def employments(self) -> dict[str, list[Employment]]:
+        """Person name -> posts held, in payload order."""
+        held: dict[str, list[Employment]] = {str(name): [] for name in self.names}
+        current = self.posts[self.posts["current"].astype(bool)]
+        for name, krs, role, start, end in zip(
+            current["name"],
+            current["krs"],
+            current["role"],
+            current["start"],
+            current["end"],
+        ):
+            held[name].append(Employment(krs, role, start, end))
+        return held
+
+    @functools.cached_property
+    def candidacies(self) -> dict[str, list[Candidacy]]:
+        """Person name -> candidacies stood."""
+        stood: dict[str, list[Candidacy]] = {str(name): [] for name in self.names}
+        for name, year, teryt, party, committee in zip(
+            self.elections["name"],
+            self.elections["year"],
+            self.elections["teryt"],
+            self.elections["party"],
+            self.elections["committee"],
+        ):
+            stood[name].append(Candidacy(year, teryt, party, committee))
+        return stood
+
+    @functools.cached_property
+    def roster(self) -> dict[str, list[str]]:
+        """KRS -> everybody the payloads put in that company."""
+        return {
+            str(krs): list(people)
+            for krs, people in self.posts.groupby("krs", sort=False)["name"]
+        }
+
     def seeds(self, sign: int = 1) -> dict[str, float]:
         """Confirmed people whose judgement went the given way, weight positive."""
         return {
@@ -174,6 +283,7 @@ class PeopleScoreModel(Pipeline):
     #: "pipeline" reads as non-human to the frontend; the tag after it is what
     #: tells two models apart in `stats.votes.models`.
     model_tag: str = "pipeline"
+    format = "parquet"
 
     people_payloads: PeoplePayloads
     people_koryta: KorytaPeople
@@ -189,7 +299,7 @@ class PeopleScoreModel(Pipeline):
         raise NotImplementedError
 
     def process(self, ctx: Context):
-        population = self.population(ctx)
+        population = self.shared_population(ctx)
         print(
             f"{type(self).__name__}: {len(population.people)} people, "
             f"{len(population.seeds())} positive seeds, "
@@ -224,6 +334,45 @@ class PeopleScoreModel(Pipeline):
         print(df["score"].value_counts().sort_index(ascending=False))
         return df.astype({"score": "int32"})
 
+    def shared_population(self, ctx: Context) -> Population:
+        """`population`, built once for every model that reads the same sources.
+
+        All the models read the same four sources, so in one run each of them
+        would otherwise unpack the same payloads into the same tables. The last
+        population built is kept with the output versions it was built from,
+        and a model that finds its sources at those versions takes it as is.
+        The models only read it; a caller that wants a variant, like the
+        cross-validation folds, builds one with `dataclasses.replace`.
+        """
+        global _shared_population
+        with _population_lock:
+            version = self.sources_version(ctx)
+            if version is not None and _shared_population is not None:
+                built_from, population = _shared_population
+                if built_from == version:
+                    print(f"{type(self).__name__}: reusing the population")
+                    return population
+
+            population = self.population(ctx)
+            version = self.sources_version(ctx)
+            _shared_population = None if version is None else (version, population)
+            return population
+
+    def sources_version(self, ctx: Context) -> tuple | None:
+        """The outputs `population` reads, or None if they are not settled."""
+        versions = []
+        for source in (
+            self.people_payloads,
+            self.people_koryta,
+            self.people_votes,
+            self.companies_krs,
+        ):
+            version = source_version(ctx, source)
+            if version is None:
+                return None
+            versions.append((source.pipeline_name, version))
+        return tuple(versions)
+
     def population(self, ctx: Context) -> Population:
         people = self.people_payloads.read_or_process(ctx)
         koryta = self.people_koryta.read_or_process(ctx)
@@ -233,58 +382,59 @@ class PeopleScoreModel(Pipeline):
         node_ids = dict(zip(koryta["full_name"], koryta["id"]))
         human_votes = self.human_votes(votes, koryta)
 
-        employments: dict[str, list[Employment]] = {}
-        candidacies: dict[str, list[Candidacy]] = {}
-        roster: dict[str, list[str]] = {}
-
-        for _, row in people.iterrows():
-            name = str(row.get("name"))
-            posts = [
-                Employment(
-                    krs=str(company["krs"]),
-                    role=company.get("role"),
-                    start=company.get("start"),
-                    end=company.get("end"),
-                )
-                for company in iter_dicts(row.get("companies"))
-                if company.get("krs")
-            ]
-            employments[name] = posts
-            for post in posts:
-                roster.setdefault(post.krs, []).append(name)
-
-            candidacies[name] = [
-                Candidacy(
-                    year=election.get("election_year"),
-                    teryt=election.get("teryt"),
-                    party=election.get("party"),
-                    committee=election.get("committee"),
-                )
-                for election in iter_dicts(row.get("elections"))
-            ]
+        # A name on several payload rows keeps the posts and candidacies of its
+        # last row, while every row adds to the rosters.
+        names = column(people, "name").map(str).to_numpy()
+        last_row = ~pd.Series(names).duplicated(keep="last").to_numpy()
+
+        posts = payload_entries(
+            people,
+            "companies",
+            {"krs": "krs", "role": "role", "start": "start", "end": "end"},
+        )
+        posts = posts[posts["krs"].map(bool).astype(bool)]
+        posts["krs"] = posts["krs"].map(str)
+        posts["name"] = names[posts["row"]]
+        posts["current"] = last_row[posts["row"]]
+
+        elections = payload_entries(
+            people,
+            "elections",
+            {
+                "election_year": "year",
+                "teryt": "teryt",
+                "party": "party",
+                "committee": "committee",
+            },
+        )
+        elections = elections[last_row[elections["row"]]]
+        elections["name"] = names[elections["row"]]
+        in_payloads = set(names)
 
         seed_weights: dict[str, float] = {}
         shortlist: list[str] = []
-        for _, entry in koryta.iterrows():
-            name = str(entry.get("full_name"))
-            is_public = entry.get("is_public", False)
-            if pd.isna(is_public):
+        for name, is_public, node_id in zip(
+            koryta["full_name"].map(str),
+            column(koryta, "is_public"),
+            koryta["id"].map(str),
+        ):
+            if is_public is None or pd.isna(is_public):
                 is_public = False
 
-            vote = human_votes.get(str(entry.get("id")), 0.0)
+            vote = human_votes.get(node_id, 0.0)
             if is_public:
                 seed_weights[name] = max(seed_weights.get(name, 0.0), IS_PUBLIC_SCORE)
             elif vote:
                 seed_weights[name] = vote
-            elif name in employments:
+            elif name in in_payloads:
                 shortlist.append(name)
 
         return Population(
             people=people,
             node_ids=node_ids,
-            employments=employments,
-            candidacies=candidacies,
-            roster=roster,
+            names=names,
+            posts=posts[POST_COLUMNS].reset_index(drop=True),
+            elections=elections[ELECTION_COLUMNS].reset_index(drop=True),
             companies=self.company_facts(companies),
             seed_weights=seed_weights,
             shortlist=shortlist,
@@ -302,34 +452,34 @@ class PeopleScoreModel(Pipeline):
         """
         if votes.empty or "person_koryta_id" not in votes:
             return {}
-        totals: dict[str, float] = {}
-        for _, row in votes.iterrows():
-            target = row.get("person_koryta_id")
-            interesting = row.get("interesting")
-            # NaN rather than a blank is what a vote with no node on it looks
-            # like once pandas has been through it, and NaN is truthy - see
-            # `KorytaVotes.process`, which is where those get dropped now.
-            if pd.isna(target) or interesting is None or pd.isna(interesting):
-                continue
-            node_id = str(target).strip()
-            if not node_id:
-                continue
-            totals[node_id] = totals.get(node_id, 0.0) + float(interesting)
-        return totals
+        target = votes["person_koryta_id"]
+        interesting = column(votes, "interesting")
+        # NaN rather than a blank is what a vote with no node on it looks
+        # like once pandas has been through it, and NaN is truthy - see
+        # `KorytaVotes.process`, which is where those get dropped now.
+        voted = target.notna() & interesting.notna()
+        node_ids = target[voted].map(lambda node_id: str(node_id).strip())
+        points = interesting[voted].astype(float)
+        named = node_ids != ""
+        totals = points[named].groupby(node_ids[named], sort=False).sum()
+        return {str(node_id): float(total) for node_id, total in totals.items()}
 
     @staticmethod
     def company_facts(companies: pd.DataFrame) -> dict[str, CompanyFacts]:
         if companies.empty or "krs" not in companies:
             return {}
         facts = {}
-        for _, row in companies.iterrows():
-            krs = row.get("krs")
+        for krs, name, teryt, is_public in zip(
+            companies["krs"],
+            column(companies, "name"),
+            column(companies, "teryt_code"),
+            column(companies, "is_public"),
+        ):
             if not krs or pd.isna(krs):
                 continue
-            is_public = row.get("is_public", False)
             facts[str(krs)] = CompanyFacts(
-                name=row.get("name"),
-                teryt=str(row["teryt_code"]) if row.get("teryt_code") else None,
+                name=name,
+                teryt=str(teryt) if teryt else None,
                 is_public=bool(is_public) if not pd.isna(is_public) else False,
             )
         return facts
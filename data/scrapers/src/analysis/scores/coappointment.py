@@ -14,7 +14,8 @@ repeat counts, and a candidate's score is the weight of the confirmed people
 they travel with rather than the number of doors they have been through.
 """
 
-import collections
+import numpy as np
+import scipy.sparse as sp
 
 from analysis.scores.base import PeopleScoreModel, Population
 from scrapers.stores import Context
@@ -29,16 +30,57 @@ MIN_SHARED_COMPANIES = 2
 MAX_ROSTER = 200
 
 
+def incidence(pairs: list[tuple[int, int]], shape: tuple[int, int]) -> sp.csr_array:
+    """A 0/1 matrix with a one at each (row, column), or more where repeated."""
+    rows = np.array([row for row, _ in pairs], dtype=np.int64)
+    columns = np.array([column for _, column in pairs], dtype=np.int64)
+    return sp.csr_array((np.ones(len(pairs)), (rows, columns)), shape=shape)
+
+
 def shared_company_counts(
-    population: Population, name: str, rosters: dict[str, list[str]]
-) -> collections.Counter:
-    """How many companies this person shares with each other person."""
-    shared: collections.Counter = collections.Counter()
-    for post in population.employments.get(name, []):
-        for colleague in rosters.get(post.krs, []):
-            if colleague != name:
-                shared[colleague] += 1
-    return shared
+    population: Population,
+    names: list[str],
+    colleagues: list[str],
+    rosters: dict[str, list[str]],
+) -> sp.csr_array:
+    """How many companies each of `names` shares with each of `colleagues`.
+
+    Names down, colleagues across: the posts each name holds times the rosters
+    each colleague is on, so only the pairs that share something are ever
+    touched, however big the rosters. A post held twice, or a roster listing
+    somebody twice, counts as many times as it appears. Nobody is their own
+    colleague.
+    """
+    companies = {krs: column for column, krs in enumerate(rosters)}
+    held = incidence(
+        [
+            (row, companies[post.krs])
+            for row, name in enumerate(names)
+            for post in population.employments.get(name, [])
+            if post.krs in companies
+        ],
+        (len(names), len(companies)),
+    )
+    column_of = {name: column for column, name in enumerate(colleagues)}
+    seated = incidence(
+        [
+            (column_of[person], companies[krs])
+            for krs, people in rosters.items()
+            for person in people
+            if person in column_of
+        ],
+        (len(colleagues), len(companies)),
+    )
+
+    shared = (held @ seated.T).tocoo()
+    apart = (
+        np.array(names, dtype=object)[shared.row]
+        != np.array(colleagues, dtype=object)[shared.col]
+    )
+    return sp.csr_array(
+        (shared.data[apart], (shared.row[apart], shared.col[apart])),
+        shape=shared.shape,
+    )
 
 
 class PeopleScoresCoappointment(PeopleScoreModel):
@@ -57,20 +99,21 @@ class PeopleScoresCoappointment(PeopleScoreModel):
         )
 
         seeds = population.seeds()
-        scores: dict[str, float] = {}
-        for name in population.shortlist:
-            companions = 0.0
-            for colleague, count in shared_company_counts(
-                population, name, rosters
-            ).items():
-                weight = seeds.get(colleague)
-                if weight and count >= MIN_SHARED_COMPANIES:
-                    # Weighted by how firm the confirmation is, not by how many
-                    # companies they shared: the second shared board is what
-                    # makes the case, the fourth adds little.
-                    companions += weight
-            if companions:
-                scores[name] = companions
+        colleagues = list(seeds)
+        counts = shared_company_counts(
+            population, population.shortlist, colleagues, rosters
+        )
+        # Weighted by how firm the confirmation is, not by how many companies
+        # they shared: the second shared board is what makes the case, the
+        # fourth adds little.
+        repeated = (counts >= MIN_SHARED_COMPANIES).astype(np.float64)
+        companions = repeated @ np.array([seeds[name] for name in colleagues])
+
+        scores: dict[str, float] = {
+            name: float(weight)
+            for name, weight in zip(population.shortlist, companions)
+            if weight
+        }
 
         print(f"{len(scores)} people travel with somebody already confirmed")
         return scores
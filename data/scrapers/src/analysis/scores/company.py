@@ -49,6 +49,7 @@ def normalized_scores(scores: pd.DataFrame, n: NormalizationFactors) -> pd.Serie
 
 class CompanyScores(Pipeline):
     filename = "company_scores"
+    format = "parquet"
     # Written zero-padded and only meaningful zero-padded. Without the pin a
     # restore from the shared cache re-infers the column as an integer and the
     # leading zeros are gone -- see scrapers/krs/columns.py for the two read
@@ -22,8 +22,12 @@ passed through) attract both walks, and the difference is what is left after
 that cancels out.
 """
 
-import networkx as nx
+import dataclasses
 
+import numpy as np
+import scipy.sparse as sp
+
+from analysis.ppr import adjacency, personalized_pagerank
 from analysis.scores.base import PeopleScoreModel, Population
 from scrapers.stores import Context
 
@@ -62,14 +66,43 @@ def political_node(group: str) -> str:
     return f"g:{group}"
 
 
-def build_graph(population: Population) -> nx.DiGraph:
+@dataclasses.dataclass
+class EmploymentGraph:
+    """People, companies and committees numbered in the order they were met.
+
+    `nodes` maps the `person_node`, `company_node` and `political_node` keys to
+    rows of `adjacency`, which holds every edge in both directions.
+    """
+
+    nodes: dict[str, int]
+    adjacency: sp.csr_array
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def edges(self) -> int:
+        return self.adjacency.nnz
+
+
+def build_graph(population: Population) -> EmploymentGraph:
     """The graph the walk runs on: people joined by employers and committees.
 
-    Directed with both directions present rather than undirected, because
-    `nx.pagerank` needs to be able to walk back out of a company and the two
-    directions do not have to carry the same weight if that ever changes.
+    Directed with both directions present rather than undirected, because the
+    walk has to be able to leave a company again and the two directions do not
+    have to carry the same weight if that ever changes.
     """
-    graph: nx.DiGraph = nx.DiGraph()
+    nodes: dict[str, int] = {}
+    sources: list[int] = []
+    targets: list[int] = []
+    weights: list[float] = []
+
+    def connect(a: str, b: str, weight: float) -> None:
+        i = nodes.setdefault(a, len(nodes))
+        j = nodes.setdefault(b, len(nodes))
+        sources.extend((i, j))
+        targets.extend((j, i))
+        weights.extend((weight, weight))
 
     oversized = {
         krs for krs, people in population.roster.items() if len(people) > MAX_ROSTER
@@ -82,9 +115,7 @@ def build_graph(population: Population) -> nx.DiGraph:
         for post in posts:
             if post.krs in oversized:
                 continue
-            company = company_node(post.krs)
-            graph.add_edge(person, company, weight=EMPLOYMENT_EDGE_WEIGHT)
-            graph.add_edge(company, person, weight=EMPLOYMENT_EDGE_WEIGHT)
+            connect(person, company_node(post.krs), EMPLOYMENT_EDGE_WEIGHT)
 
     for name, candidacies in population.candidacies.items():
         person = person_node(name)
@@ -92,34 +123,28 @@ def build_graph(population: Population) -> nx.DiGraph:
             group = candidacy.committee or candidacy.party
             if not group:
                 continue
-            node = political_node(group)
-            graph.add_edge(person, node, weight=POLITICAL_EDGE_WEIGHT)
-            graph.add_edge(node, person, weight=POLITICAL_EDGE_WEIGHT)
+            connect(person, political_node(group), POLITICAL_EDGE_WEIGHT)
 
-    return graph
+    return EmploymentGraph(
+        nodes=nodes, adjacency=adjacency(sources, targets, weights, len(nodes))
+    )
 
 
-def walk_from(graph: nx.DiGraph, seeds: dict[str, float]) -> dict[str, float]:
-    """Personalised PageRank teleporting back to `seeds`, or nothing if none.
+def walk_from(graph: EmploymentGraph, *seed_sets: dict[str, float]) -> np.ndarray:
+    """Personalised PageRank teleporting back to each of `seed_sets`.
 
-    Seeds the graph does not contain are dropped: the payload run this model
-    sees may not cover everybody the site has published.
+    One column per seed set, all walked together. Seeds the graph does not
+    contain are dropped: the payload run this model sees may not cover
+    everybody the site has published. A set with nobody left gets zeros.
     """
-    personalization = {
-        person_node(name): weight
-        for name, weight in seeds.items()
-        if graph.has_node(person_node(name))
-    }
-    if not personalization:
-        return {}
-
-    return nx.pagerank(
-        graph,
-        alpha=ALPHA,
-        personalization=personalization,
-        nstart=personalization,
-        weight="weight",
-    )
+    personalization = np.zeros((len(graph), len(seed_sets)))
+    for column, seeds in enumerate(seed_sets):
+        for name, weight in seeds.items():
+            node = graph.nodes.get(person_node(name))
+            if node is not None:
+                personalization[node, column] = weight
+
+    return personalized_pagerank(graph.adjacency, personalization, alpha=ALPHA)
 
 
 class PeopleScoresPageRank(PeopleScoreModel):
@@ -128,21 +153,19 @@ class PeopleScoresPageRank(PeopleScoreModel):
 
     def raw_scores(self, ctx: Context, population: Population) -> dict[str, float]:
         graph = build_graph(population)
-        print(
-            f"Graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges"
-        )
+        print(f"Graph: {len(graph)} nodes, {graph.edges} edges")
 
-        confirmed = walk_from(graph, population.seeds())
-        if not confirmed:
+        downvoted = population.seeds(-1)
+        confirmed, rejected = walk_from(graph, population.seeds(), downvoted).T
+        if not confirmed.any():
             print("No confirmed person is in the graph, so there is nothing to walk")
             return {}
-
-        rejected = walk_from(graph, population.seeds(-1))
-        if rejected:
-            print(f"Subtracting proximity to {len(population.seeds(-1))} downvoted")
-
-        return {
-            name: confirmed.get(person_node(name), 0.0)
-            - NEGATIVE_WEIGHT * rejected.get(person_node(name), 0.0)
-            for name in population.shortlist
-        }
+        if rejected.any():
+            print(f"Subtracting proximity to {len(downvoted)} downvoted")
+
+        proximity = confirmed - NEGATIVE_WEIGHT * rejected
+        scores = {}
+        for name in population.shortlist:
+            node = graph.nodes.get(person_node(name))
+            scores[name] = 0.0 if node is None else float(proximity[node])
+        return scores
@@ -6,11 +6,13 @@ from dataclasses import asdict
 import pytest
 
 from analysis.article_person_mentions import (
+    _SCANNED_COLUMNS,
     PersonProfile,
     PersonProfileIndex,
     _confirm_mentions,
     _context_window,
     _employed_krs,
+    _judge_request,
     _org_match_terms,
     _parse_multi_verdict,
     _parse_verdict,
@@ -18,9 +20,14 @@ from analysis.article_person_mentions import (
     _rejestr_io_id,
     _stem,
 )
-from entities.article import ArticlePersonMentioned, ProofSignal
+from entities.article import (
+    ArticlePersonMentioned,
+    ParsedArticleRecord,
+    ProofSignal,
+)
 from scrapers.article.pipelines.common import ascii_lower
 from scrapers.koryta.download import _teryt_from_edges
+from scrapers.stores import batches
 
 
 @pytest.fixture
@@ -282,6 +289,21 @@ def test_context_window_centers_on_name():
     assert _context_window(short, "Jan Kowalski") == short
 
 
+def test_judge_requests_for_one_name_share_affinity():
+    content = "Radny Bogusław Kmieć z PSL został prezesem spółki w Sanoku."
+    psl, pis = PersonProfile(), PersonProfile()
+    psl.parties, pis.parties = {"psl"}, {"pis"}
+    first, second = (
+        _judge_request("Bogusław Kmieć", profile, [], content, "m", same_name_count=2)
+        for profile in (psl, pis)
+    )
+
+    assert first.affinity == second.affinity == content
+    assert first.prompt != second.prompt
+    article_end = first.prompt.index(content) + len(content)
+    assert first.prompt[:article_end] == second.prompt[:article_end]
+
+
 def test_parse_verdict_bare_label_fallback():
     verdict, _ = _parse_verdict("Artykuł wyraźnie opisuje posła PiS z Podlasia. TAK")
     assert verdict == "yes"
@@ -305,3 +327,61 @@ def test_parse_multi_verdict_picks_candidate():
     )
     assert verdict == "no"
     assert matched == ""
+
+
+def test_the_scan_reads_parsed_articles_as_typed_columns(tmp_path, monkeypatch):
+    rows = [
+        ParsedArticleRecord(
+            uid=str(i),
+            url=f"https://a.pl/{i}",
+            domain="a.pl",
+            storage_path="",
+            selector=None,
+            parse_status="ok",
+            selector_matched=True,
+            title="Tytuł",
+            publication_date=None,
+            ld_json={"keywords": ["psl"], "n": i} if i % 2 else None,
+            article_content="Jan Kmieć, prezes spółki.",
+            article_content_hash="",
+            html_sha256=None,
+            parser_version=1,
+            outbound_urls=["https://b.pl/outbound"],
+        )
+        for i in range(4)
+    ]
+    path = tmp_path / "article_parsed.jsonl"
+    path.write_text(
+        "".join(json.dumps(asdict(row), ensure_ascii=False) + "\n" for row in rows),
+        encoding="utf-8",
+    )
+
+    def line_by_line(*args):
+        raise AssertionError("parsed line by line")
+
+    decoded: list = []
+
+    class Recording(json.JSONDecoder):
+        def raw_decode(self, s, idx=0):
+            value, end = super().raw_decode(s, idx)
+            decoded.append(value)
+            return value, end
+
+    monkeypatch.setattr(batches, "_parse_lines", line_by_line)
+    monkeypatch.setattr(batches, "_DECODER", Recording())
+
+    found = [
+        row
+        for batch in batches.jsonl_batches(
+            str(path), ParsedArticleRecord, _SCANNED_COLUMNS
+        )
+        for row in batch.to_pylist()
+    ]
+
+    assert [row["url"] for row in found] == [row.url for row in rows]
+    assert [
+        None if row["ld_json"] is None else json.loads(row["ld_json"]) for row in found
+    ] == [row.ld_json for row in rows]
+    assert found[0]["article_content"] == "Jan Kmieć, prezes spółki."
+    assert ["https://b.pl/outbound"] not in decoded
+    assert "Jan Kmieć, prezes spółki." not in decoded
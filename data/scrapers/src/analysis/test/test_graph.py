@@ -1,6 +1,9 @@
+import networkx as nx
+import numpy as np
 import pandas as pd
 import pytest
 
+from analysis import graph
 from analysis.graph import calculate_ppr_scores, flatten_parties
 
 
@@ -75,3 +78,53 @@ def test_calculate_ppr_scores_disconnected():
     # P3 should have high score (1.0 or close), P2 should have 0
     assert scores.loc["P2", "G1"] == 0.0
     assert scores.loc["P3", "G1"] > 0.9
+
+
+def networkx_ppr_scores(df_people_subgroups, df_subgroups_groups, measured_id):
+    """The scores as one `nx.pagerank` per group over string-keyed nodes."""
+    network = nx.DiGraph()
+    for subgroup, group in df_subgroups_groups[["subgroup_id", "group_id"]].values:
+        network.add_edge(f"g_{group}", f"s_{subgroup}")
+    for person, subgroup in df_people_subgroups[["person_id", "subgroup_id"]].values:
+        network.add_edge(f"s_{subgroup}", f"p_{person}")
+        network.add_edge(f"p_{person}", f"s_{subgroup}")
+
+    prefix = "p_" if measured_id == "person_id" else "s_"
+    measured = df_people_subgroups[measured_id].unique()
+    scores = {}
+    for group in df_subgroups_groups["group_id"].unique():
+        seed = {f"g_{group}": 1}
+        ranks = nx.pagerank(network, personalization=seed, nstart=seed)
+        scores[group] = {m: ranks[f"{prefix}{m}"] for m in measured}
+    return pd.DataFrame(scores)
+
+
+@pytest.mark.parametrize("measured_id", ["person_id", "subgroup_id"])
+def test_calculate_ppr_scores_matches_one_networkx_walk_per_group(
+    measured_id, monkeypatch
+):
+    rng = np.random.default_rng(7)
+    df_people_subgroups = pd.DataFrame(
+        {
+            "person_id": [f"P{i}" for i in rng.integers(0, 40, 120)],
+            "subgroup_id": [f"s{i}" for i in rng.integers(0, 15, 120)],
+        }
+    ).drop_duplicates()
+    df_subgroups_groups = pd.DataFrame(
+        {
+            "subgroup_id": [f"s{i}" for i in rng.integers(0, 18, 12)],
+            "group_id": [f"G{i}" for i in rng.integers(0, 5, 12)],
+        }
+    )
+    # Small batches, so that walking the groups in several goes is covered.
+    monkeypatch.setattr(graph, "PPR_GROUP_BATCH", 2)
+
+    scores = calculate_ppr_scores(
+        df_people_subgroups, df_subgroups_groups, measured_id, normalize_rows=False
+    ).set_index(measured_id)
+
+    raw = networkx_ppr_scores(df_people_subgroups, df_subgroups_groups, measured_id)
+    expected = raw.div(raw.sum(axis=1).replace(0, 1), axis=0)
+    assert list(scores.index) == list(expected.index)
+    assert list(scores.columns) == list(expected.columns)
+    np.testing.assert_allclose(scores.to_numpy(), expected.to_numpy(), atol=1e-5)
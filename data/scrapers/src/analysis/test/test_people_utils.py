@@ -1,4 +1,16 @@
-from analysis.people import unique_probability
+import math
+
+import duckdb
+import numpy as np
+import pytest
+from duckdb.sqltypes import BOOLEAN, DOUBLE
+
+from analysis.people import (
+    MISSING_NAME_COUNT,
+    _unique_probability_arrow,
+    unique_probabilities,
+    unique_probability,
+)
 
 
 def test_unique_probability_defaults():
@@ -36,3 +48,61 @@ def test_unique_probability_second_name_mismatch():
     # pow(0.9, 10) = 0.348678
     prob = unique_probability(0.1, 0.001, False, 400)
     assert 0.34 < prob < 0.35
+
+
+def test_unique_probabilities_matches_one_pair_at_a_time():
+    p1 = np.array([np.nan, 0.001, 0.5, 0.1, 0.2])
+    p2 = np.array([np.nan, 0.001, np.nan, 0.001, 0.3])
+    match = np.array([False, True, False, False, True])
+    n = np.array([50000, 4000, 40, 400, 100000])
+
+    many = unique_probabilities(p1, p2, match, n)
+
+    one_by_one = [
+        unique_probability(
+            None if np.isnan(a) else a,
+            None if np.isnan(b) else b,
+            m,
+            c,
+        )
+        for a, b, m, c in zip(p1, p2, match, n)
+    ]
+    assert many.tolist() == one_by_one
+    assert one_by_one[:3] == [0, pytest.approx(0.9999, abs=1e-4), 0.5]
+
+
+def test_a_missing_count_is_assumed_but_a_nan_one_is_not():
+    assumed = unique_probability(0.1, None, False, MISSING_NAME_COUNT)
+
+    assert unique_probability(0.1, None, False, None) == assumed
+    assert math.isnan(unique_probability(0.1, None, False, math.nan))
+
+
+def test_unique_probability_runs_in_duckdb_with_nulls():
+    con = duckdb.connect()
+    con.create_function(
+        "unique_probability",
+        _unique_probability_arrow,
+        [DOUBLE, DOUBLE, BOOLEAN, DOUBLE],  # type: ignore
+        DOUBLE,  # type: ignore
+        type="arrow",  # type: ignore
+        null_handling="special",  # type: ignore
+    )
+
+    rows = con.sql(
+        """
+        SELECT unique_probability(p1, p2, m, n) FROM (VALUES
+            (NULL, NULL, NULL, NULL),
+            (0.5, NULL, false, 40),
+            (0.1, 0.001, NULL, 400),
+            (0.1, NULL, false, NULL)
+        ) t(p1, p2, m, n)
+        """
+    ).fetchall()
+
+    assert [value for (value,) in rows] == [
+        0,
+        0.5,
+        unique_probability(0.1, None, False, 400),
+        unique_probability(0.1, None, False, None),
+    ]
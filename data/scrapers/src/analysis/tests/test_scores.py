@@ -1,5 +1,9 @@
 """The scoring models, and the shared rules about who is worth scoring."""
 
+import types
+
+import networkx as nx
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -9,6 +13,8 @@ from analysis.scores import (
     PeopleScoresCoappointment,
     PeopleScoresPageRank,
     PeopleScoresTurnover,
+    base,
+    coappointment,
 )
 from analysis.scores.base import (
     Candidacy,
@@ -18,9 +24,11 @@ from analysis.scores.base import (
     Population,
     banded_scores,
 )
+from analysis.scores.coappointment import shared_company_counts
 from analysis.scores.turnover import same_region, year_of
 from entities.person import is_pipeline_uid
-from scrapers.stores import Pipeline
+from scrapers.stores import Pipeline, ProcessPolicy
+from scrapers.tests.mocks import MockFile, MockIO
 
 
 def population(
@@ -31,29 +39,36 @@ def population(
     companies: dict[str, CompanyFacts] | None = None,
 ) -> Population:
     """A population built from `{name: [(krs, start), ...]}` and its seeds."""
-    posts = {
-        name: [
-            Employment(krs=krs, role=None, start=start, end=None) for krs, start in v
-        ]
-        for name, v in employments.items()
-    }
-    roster: dict[str, list[str]] = {}
-    for name, people_posts in posts.items():
-        for post in people_posts:
-            roster.setdefault(post.krs, []).append(name)
+    posts = pd.DataFrame.from_records(
+        [
+            (name, krs, None, start, None, True)
+            for name, held in employments.items()
+            for krs, start in held
+        ],
+        columns=base.POST_COLUMNS,
+    )
+    elections = pd.DataFrame.from_records(
+        [
+            (name, c.year, c.teryt, c.party, c.committee)
+            for name, stood in (candidacies or {}).items()
+            if name in employments
+            for c in stood
+        ],
+        columns=base.ELECTION_COLUMNS,
+    )
 
     seeds = seeds or {}
     return Population(
         people=pd.DataFrame(),
-        node_ids={name: f"node-{name}" for name in posts},
-        employments=posts,
-        candidacies={name: (candidacies or {}).get(name, []) for name in posts},
-        roster=roster,
+        node_ids={name: f"node-{name}" for name in employments},
+        names=np.array(list(employments), dtype=object),
+        posts=posts,
+        elections=elections,
         companies=companies or {},
         seed_weights=seeds,
         shortlist=shortlist
         if shortlist is not None
-        else [name for name in posts if name not in seeds],
+        else [name for name in employments if name not in seeds],
     )
 
 
@@ -179,6 +194,135 @@ class TestPopulation:
 
         assert result.shortlist == []
 
+    def test_posts_and_candidacies_are_unpacked_from_the_payload_lists(self):
+        result = self.build(
+            [{"id": "n1", "full_name": "Anna", "is_public": False, "parties": []}],
+            payload_rows=[
+                {
+                    "name": "Anna",
+                    "companies": [{"krs": "1", "role": "prezes"}, {"krs": ""}],
+                    "elections": [{"election_year": "2018", "party": "X"}],
+                },
+                {"name": "Piotr", "companies": float("nan"), "elections": None},
+                {"name": "Anna", "companies": [{"krs": 2, "start": "2020"}]},
+            ],
+        )
+
+        # A name on two rows keeps the last row's posts, but both rows put it
+        # on a roster.
+        assert result.employments == {
+            "Anna": [Employment(krs="2", role=None, start="2020", end=None)],
+            "Piotr": [],
+        }
+        assert result.roster == {"1": ["Anna"], "2": ["Anna"]}
+        assert result.candidacies == {"Anna": [], "Piotr": []}
+
+        anna = self.build(
+            [{"id": "n1", "full_name": "Anna", "is_public": False, "parties": []}],
+            payload_rows=[
+                {
+                    "name": "Anna",
+                    "companies": [],
+                    "elections": [{"election_year": "2018", "party": "X"}],
+                }
+            ],
+        )
+        assert anna.candidacies["Anna"] == [
+            Candidacy(year="2018", teryt=None, party="X", committee=None)
+        ]
+
+
+class TestSharedPopulation:
+    """One population for every model that reads the same source outputs."""
+
+    def scorer(self, model_type, reads):
+        scorer = model(model_type)
+        payloads = pd.DataFrame.from_records(
+            [{"name": "Anna", "companies": [{"krs": "1"}], "elections": []}]
+        )
+
+        def read_payloads(ctx):
+            reads.append(model_type.__name__)
+            return payloads
+
+        scorer.people_payloads.read_or_process = read_payloads
+        scorer.people_koryta.read_or_process = lambda ctx: pd.DataFrame.from_records(
+            [{"id": "n1", "full_name": "Anna", "is_public": False}]
+        )
+        scorer.people_votes.read_or_process = lambda ctx: pd.DataFrame()
+        scorer.companies_krs.read_or_process = lambda ctx: pd.DataFrame()
+        return scorer
+
+    @staticmethod
+    def on_disk(io: MockIO, pipeline: Pipeline, mtime: float = 1.0) -> None:
+        """Every output under `pipeline` written, at `mtime`."""
+        if pipeline.filename is not None:
+            io.files[pipeline.output_path()] = MockFile("", mtime=mtime)
+        for dep in pipeline.dependencies.values():
+            TestSharedPopulation.on_disk(io, dep, mtime)
+
+    @pytest.fixture
+    def ctx(self, monkeypatch):
+        monkeypatch.setattr(base, "_shared_population", None)
+        return types.SimpleNamespace(
+            refresh_policy=ProcessPolicy.with_default(), io=MockIO()
+        )
+
+    def test_the_second_model_reuses_what_the_first_built(self, ctx):
+        reads: list[str] = []
+        first = self.scorer(PeopleScoresPageRank, reads)
+        second = self.scorer(PeopleScoresCapture, reads)
+        self.on_disk(ctx.io, first)
+
+        assert first.shared_population(ctx) is second.shared_population(ctx)
+        assert reads == ["PeopleScoresPageRank"]
+
+    def test_payloads_with_no_output_are_versioned_by_what_they_read(self, ctx):
+        # PeoplePayloads and Extract keep no file, so there is no output
+        # version to go by; what is under them on disk stands in for one.
+        scorer = self.scorer(PeopleScoresPageRank, [])
+        self.on_disk(ctx.io, scorer)
+        assert scorer.people_payloads.output_version(ctx) is None
+
+        version = base.source_version(ctx, scorer.people_payloads)
+        assert version is not None
+        assert base.source_version(ctx, scorer.people_payloads) == version
+
+        self.on_disk(ctx.io, scorer.people_payloads.people.people, mtime=2.0)
+        assert base.source_version(ctx, scorer.people_payloads) != version
+
+    def test_a_changed_source_builds_it_again(self, ctx):
+        reads: list[str] = []
+        scorer = self.scorer(PeopleScoresPageRank, reads)
+        self.on_disk(ctx.io, scorer)
+        scorer.shared_population(ctx)
+
+        self.on_disk(ctx.io, scorer.people_votes, mtime=2.0)
+        scorer.shared_population(ctx)
+
+        assert len(reads) == 2
+
+    def test_a_source_this_run_still_refreshes_is_not_trusted(self, ctx):
+        reads: list[str] = []
+        scorer = self.scorer(PeopleScoresPageRank, reads)
+        self.on_disk(ctx.io, scorer)
+        scorer.shared_population(ctx)
+
+        ctx.refresh_policy.execution_decisions["KorytaVotes"] = (True, "policy")
+        scorer.shared_population(ctx)
+
+        assert len(reads) == 2
+
+    def test_the_views_come_from_the_tables(self):
+        pop = population({"Anna": [("1", None)], "Piotr": []})
+
+        assert pop.employments == {
+            "Anna": [Employment(krs="1", role=None, start=None, end=None)],
+            "Piotr": [],
+        }
+        assert pop.roster == {"1": ["Anna"]}
+        assert pop.candidacies == {"Anna": [], "Piotr": []}
+
 
 class TestCompanyScores:
     """The votes half of the model the site started with."""
@@ -278,6 +422,43 @@ class TestPageRank:
 
         assert model(PeopleScoresPageRank).raw_scores(None, pop) == {}
 
+    def test_scores_match_two_networkx_walks(self):
+        committee = [Candidacy(year="2018", teryt="14", party=None, committee="K")]
+        pop = population(
+            {
+                "Seed": [("1", None), ("2", None), ("1", None)],
+                "Colleague": [("1", None), ("3", None)],
+                "Further": [("3", None)],
+                "Rejected": [("2", None)],
+                "Voter": [("4", None)],
+                "Stranger": [("5", None)],
+            },
+            candidacies={"Seed": committee, "Voter": committee},
+            seeds={"Seed": 3, "Rejected": -2},
+        )
+        graph = nx.DiGraph()
+        for name, posts in pop.employments.items():
+            for post in posts:
+                graph.add_edge(f"p:{name}", f"c:{post.krs}", weight=1.0)
+                graph.add_edge(f"c:{post.krs}", f"p:{name}", weight=1.0)
+        for name in ("Seed", "Voter"):
+            graph.add_edge(f"p:{name}", "g:K", weight=0.25)
+            graph.add_edge("g:K", f"p:{name}", weight=0.25)
+        confirmed = nx.pagerank(graph, personalization={"p:Seed": 3})
+        rejected = nx.pagerank(graph, personalization={"p:Rejected": 2})
+
+        scores = model(PeopleScoresPageRank).raw_scores(None, pop)
+
+        # Both stop once a step moves the scores by less than a millionth per
+        # node, so they agree to about that, not exactly.
+        assert scores == pytest.approx(
+            {
+                name: confirmed[f"p:{name}"] - 0.5 * rejected[f"p:{name}"]
+                for name in pop.shortlist
+            },
+            abs=graph.number_of_nodes() * 1e-6,
+        )
+
 
 class TestCoappointment:
     def test_one_shared_board_is_a_coincidence(self):
@@ -324,6 +505,38 @@ class TestCoappointment:
         assert scores["Both"] == 6
         assert "One" not in scores
 
+    def test_counts_are_the_posts_held_times_the_roster_seats(self):
+        pop = population(
+            {
+                "Seed": [("1", None), ("2", None)],
+                "Double": [("1", None), ("1", None)],
+                "Big": [("big", None)],
+            },
+            seeds={"Seed": 3},
+            shortlist=["Double", "Big", "Seed"],
+        )
+
+        counts = shared_company_counts(
+            pop, pop.shortlist, ["Seed", "Double"], {"1": pop.roster["1"]}
+        )
+
+        # Two posts at one company count twice; the roster left out is not
+        # counted at all; and nobody shares a company with themselves.
+        assert counts.toarray().tolist() == [[2, 0], [0, 0], [0, 2]]
+
+    def test_an_oversized_board_is_no_evidence(self, monkeypatch):
+        monkeypatch.setattr(coappointment, "MAX_ROSTER", 2)
+        pop = population(
+            {
+                "Seed": [("1", None), ("2", None)],
+                "Twice": [("1", None), ("2", None)],
+                "Third": [("2", None)],
+            },
+            seeds={"Seed": 3},
+        )
+
+        assert model(PeopleScoresCoappointment).raw_scores(None, pop) == {}
+
 
 class TestTurnover:
     def test_reads_a_year_out_of_either_shape_it_arrives_in(self):
@@ -1,8 +1,11 @@
+import copy
+import hashlib
 import io
 import logging
 import os
 import typing
 from functools import cached_property
+from pathlib import Path
 
 import duckdb
 from duckdb.sqltypes import VARCHAR
@@ -31,8 +34,8 @@ from scrapers.stores.file import (
     VersionedBackup,
 )
 from stores import file
-from stores.config import PROJECT_ROOT
-from stores.download import CompressedMirror, FileSource
+from stores.config import DOWNLOADED_DIR, PROJECT_ROOT
+from stores.download import CompressedMirror, FileSource, prefetch
 from stores.duckdb import EntityDumper
 from stores.firestore import FirestoreIO
 from stores.llm import OpenAICompatibleConfig, OpenAICompatibleMultiPortLLM
@@ -160,8 +163,16 @@ class Conductor(IO):
                     yield url, file.FromBytesIO(data, url)
                 return
 
-        for ref in self.list_files(path):
-            yield getattr(ref, "url", str(ref)), self.read_data(ref)
+        for ref, contents in self.read_each(self.list_files(path)):
+            yield getattr(ref, "url", str(ref)), contents
+
+    def read_each[R: DataRef](
+        self, refs: typing.Iterable[R]
+    ) -> typing.Iterator[tuple[R, File]]:
+        # Downloaded a window ahead on a pool, then read from the local cache
+        # here, in order, by the same read_data as one at a time.
+        for ref in prefetch(refs):
+            yield ref, self.read_data(ref)
 
     def output_entity(self, entity, sort_by=[]):
         try:
@@ -218,6 +229,28 @@ class Conductor(IO):
             return None
         return None
 
+    def get_digest(self, fs: DataRef) -> str | None:
+        if not isinstance(fs, LocalFile):
+            return None
+        p = os.path.join(PROJECT_ROOT, fs.folder, fs.filename)
+        if not os.path.exists(p):
+            return None
+        digest = hashlib.sha256()
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def read_range(self, fs: DataRef, start: int, length: int | None) -> bytes:
+        if not isinstance(fs, GCSBlob):
+            return super().read_range(fs, start, length)
+        dfs = FileSource(self.storage.cached_storage(fs.blob_name, binary=True))
+        if not dfs.downloaded():
+            return self.storage.read_range(fs.blob_name, start, length)
+        with open(dfs.downloaded_path, "rb") as f:
+            f.seek(start, os.SEEK_SET if start >= 0 else os.SEEK_END)
+            return f.read() if length is None else f.read(length)
+
     def get_output(self, entity_type: type) -> list[typing.Any] | None:
         mod = entity_type.__module__.removeprefix("entities.")
         n = mod + "." + entity_type.__name__
@@ -230,6 +263,15 @@ class Conductor(IO):
     def upload_backup_from_path(self, filename: str, src_path: str) -> None:
         self.storage.upload_backup_from_path(filename, src_path)
 
+    def fork(self) -> "Conductor":
+        # A shallow copy: the forks share the GCS client, Firestore and the
+        # mirror (once built), and get their own dumper and progress bar.
+        forked = copy.copy(self)
+        forked.dumper = EntityDumper()
+        forked.progress_bar = None
+        forked.continous_download = False
+        return forked
+
 
 def setup_context(
     requires: typing.Iterable[type[ContextResource]] = (),
@@ -295,18 +337,24 @@ def _build_llm() -> OpenAICompatibleMultiPortLLM:
     """
     from scrapers.article.pipelines import pipeline_utils as a  # noqa: PLC0415
 
+    cache_path = None
+    if not a.llm_cache_disabled():
+        cache_path = Path(a.llm_cache() or Path(DOWNLOADED_DIR) / "llm_cache.sqlite")
     return OpenAICompatibleMultiPortLLM(
         OpenAICompatibleConfig(
             model=a.llm_model(),
             ports=tuple(a.llm_ports() or list(range(6000, 6016))),
             per_port_concurrency=a.llm_per_port_concurrency(),
             request_timeout_seconds=a.llm_request_timeout_seconds(),
+            port_token_budget=a.llm_port_token_budget(),
             base_url=a.llm_base_url(),
             api_key=(
                 a.llm_api_key()
                 or os.environ.get("OPENROUTER_APIKEY")
                 or os.environ.get("OPENAI_API_KEY")
             ),
+            cache_path=cache_path,
+            cache_max_bytes=a.llm_cache_max_bytes(),
         )
     )
 
@@ -20,7 +20,11 @@ from scrapers.article.crawler import (
     run_crawler,
 )
 from scrapers.article.postgres_queue import PostgresClient, PostgresCrawlQueue
-from scrapers.article.scoring import SCORING_FUNCTIONS, get_scoring_function
+from scrapers.article.scoring import (
+    SCORING_FUNCTIONS,
+    QueuePriority,
+    get_scoring_function,
+)
 from scrapers.article.url_store_queue import UrlStoreQueue
 from scrapers.stores import BlockedDomain, CrawlQueue, NewUrl
 
@@ -84,6 +88,39 @@ def _build_parser() -> ArgumentParser:
         default=64,
         help="Number of URLs to claim from Postgres and flush back per queue write.",
     )
+    parser.add_argument(
+        "--engine",
+        choices=["threads", "async"],
+        default="threads",
+        help="Fetch on --worker-threads blocking threads, or on one asyncio "
+        "event loop with up to --max-in-flight requests at once.",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=512,
+        help="Most requests the async engine keeps going at once, each with "
+        "a thread of its own for the robots check and storing the page.",
+    )
+    parser.add_argument(
+        "--seen-urls",
+        type=Path,
+        default=Path("seen_urls.bloom"),
+        metavar="PATH",
+        help="Bloom filter of URLs already queued, kept between runs; discovered "
+        "links it has seen are not sent to Postgres again.",
+    )
+    parser.add_argument(
+        "--no-seen-urls",
+        action="store_true",
+        help="Put every discovered link, without the seen-URL filter.",
+    )
+    parser.add_argument(
+        "--seen-urls-capacity",
+        type=int,
+        default=20_000_000,
+        help="URLs the seen-URL filter is sized for at 0.1%% false positives.",
+    )
     parser.add_argument(
         "--reprioritize",
         action="store_true",
@@ -134,6 +171,10 @@ def _build_options(args: argparse.Namespace, seed_urls: list[str]) -> CrawlOptio
         domains_of_interest=frozenset(seed_urls),
         worker_threads=max(1, args.worker_threads),
         queue_flush_size=max(1, args.queue_flush_size),
+        engine=args.engine,
+        max_in_flight=max(1, args.max_in_flight),
+        seen_urls_path=None if args.no_seen_urls else args.seen_urls,
+        seen_urls_capacity=max(1, args.seen_urls_capacity),
     )
 
 
@@ -268,8 +309,9 @@ def main() -> None:  # noqa: PLR0915
     options = _build_options(args, seed_urls)
     logging.info("Running crawler with options: %s", options)
 
-    # Crawl mode uses one coordinator for DB operations; --worker-threads only
-    # controls HTTP fetch concurrency behind that coordinator.
+    # Crawl mode uses one coordinator for DB operations; --worker-threads (or
+    # --max-in-flight with --engine async) only controls HTTP fetch concurrency
+    # behind that coordinator.
     pg_client = PostgresClient.from_env(max_size=1)
 
     logging.info("Initializing crawling queue")
@@ -286,6 +328,8 @@ def main() -> None:  # noqa: PLR0915
             logging.info("Reset cancelled.")
             return
         queue.reset()
+        # The filter remembers URLs of the queue that is gone now.
+        args.seen_urls.unlink(missing_ok=True)
         logging.info("Crawl DB reset complete.")
         return
 
@@ -320,7 +364,7 @@ def main() -> None:  # noqa: PLR0915
 def reprioritize(args):
     seed_urls = _load_seed_urls(args.seed) if args.seed else []
     scorer = get_scoring_function(args.url_scoring_function, frozenset(seed_urls))
-    priority_fn = lambda url: max(0, min(100, 100 - scorer(url)))  # noqa: E731
+    priority_fn = QueuePriority(scorer)
     pg_client = PostgresClient.from_env(max_size=1)
     queue = PostgresCrawlQueue(pg_client)
     try:
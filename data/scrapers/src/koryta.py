@@ -16,6 +16,7 @@ from scrapers.stores import (
     iterate_pipeline_dict,
     required_resources,
 )
+from scrapers.stores.schedule import run_pipelines
 from scrapers.wiki import dump as wiki_dump_args
 
 
@@ -91,6 +92,15 @@ def get_args():
         help="Pipeline name to skip running. Repeatable, and applies to "
         "--all-pipelines.",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Run up to N pipelines at once, each as soon as its sources are "
+        "done. 1 (the default) runs them one after another.",
+    )
     parser.add_argument(
         "pipeline",
         help="Pipeline to be run - available are "
@@ -181,6 +191,14 @@ def main():
 
     printer = Printer(args)
     try:
+        if args.jobs > 1:
+            results = run_pipelines(
+                ctx, [p for p in PIPELINES if p.__name__ in selected], args.jobs
+            )
+            for res in results.values():
+                printer.print_results(res)
+            return
+
         for p_type in PIPELINES:
             if p_type.__name__ in selected:
                 print(f"Processing {p_type.__name__}")
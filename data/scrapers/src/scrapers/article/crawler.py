@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import hashlib
+import heapq
 import logging
 import mimetypes
 import queue as _queue
 import threading
 import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -20,7 +25,8 @@ from curl_cffi import requests
 from uuid_extensions import uuid7str  # type: ignore
 
 from entities.util import NormalizedParse
-from scrapers.article.scoring import get_scoring_function
+from scrapers.article.scoring import QueuePriority, get_scoring_function
+from scrapers.article.seen_urls import SeenUrls, open_seen_urls
 from scrapers.stores import (
     Context,
     CrawlQueue,
@@ -55,6 +61,14 @@ class CrawlOptions:
     request_timeout_seconds: float = 10
     worker_threads: int = 1
     queue_flush_size: int = 64
+    # "threads" fetches on `worker_threads` blocking threads, "async" keeps up
+    # to `max_in_flight` requests going on one event loop.
+    engine: Literal["threads", "async"] = "threads"
+    max_in_flight: int = 512
+    # Where the seen-URL filter is kept between runs; None keeps no filter
+    # and puts every discovered link.
+    seen_urls_path: Path | None = None
+    seen_urls_capacity: int = 20_000_000
 
 
 @dataclass
@@ -93,16 +107,21 @@ _next_req_lock = threading.Lock()
 _token_buckets: dict[str, tuple[float, float]] = {}
 
 
+def _refilled(domain: str, rate_limit: float, now: float) -> tuple[float, float]:
+    """(tokens, capacity) of `domain`'s bucket at `now`; hold `_next_req_lock`."""
+    refill_per_s = 1.0 / rate_limit
+    capacity = max(1.0, _BURST_WINDOW_S * refill_per_s)
+    tokens, last = _token_buckets.get(domain, (capacity, now))
+    return min(capacity, tokens + (now - last) * refill_per_s), capacity
+
+
 def _can_crawl(parsed: NormalizedParse, rate_limit: float) -> bool:
     if rate_limit <= 0:
         return True
-    refill_per_s = 1.0 / rate_limit
-    capacity = max(1.0, _BURST_WINDOW_S * refill_per_s)
     with _next_req_lock:
         domain = parsed.hostname_normalized
         now = time.monotonic()
-        tokens, last = _token_buckets.get(domain, (capacity, now))
-        tokens = min(capacity, tokens + (now - last) * refill_per_s)
+        tokens, _ = _refilled(domain, rate_limit, now)
         if tokens >= 1.0:
             _token_buckets[domain] = (tokens - 1.0, now)
             return True
@@ -110,6 +129,75 @@ def _can_crawl(parsed: NormalizedParse, rate_limit: float) -> bool:
         return False
 
 
+def _wait_for_tokens(domain: str, rate_limit: float, count: int) -> float:
+    """Seconds until `domain`'s bucket will have given out `count` more tokens."""
+    if rate_limit <= 0:
+        return 0.0
+    with _next_req_lock:
+        tokens, _ = _refilled(domain, rate_limit, time.monotonic())
+    return max(0.0, count - tokens) * rate_limit
+
+
+class HostScheduler:
+    """Claimed URLs waiting in-process for their host's token bucket.
+
+    Each host has a FIFO of its claimed URLs and one entry in a heap keyed by
+    when its bucket next has a token, so `pop_ready` only looks at hosts that
+    can go now, and a URL for a busy host waits here instead of being released
+    to the queue store and claimed again. The token is taken when the URL is
+    popped; the fetch itself does not check the bucket again.
+
+    A claimed URL is only ours until its lock times out, so `add` refuses one
+    that would wait longer than `horizon_s`; the caller releases it instead.
+    """
+
+    def __init__(self, rate_limit: float, horizon_s: float) -> None:
+        self.rate_limit = rate_limit
+        self.horizon_s = horizon_s
+        self._hosts: dict[str, deque[tuple[CrawlQueueItem, NormalizedParse]]] = {}
+        self._ready_at: list[tuple[float, str]] = []
+        self.waiting = 0
+
+    def add(self, entry: CrawlQueueItem) -> bool:
+        """Queue `entry` behind its host's; False if it would wait too long."""
+        parsed = NormalizedParse.parse(entry.url)
+        host = parsed.hostname_normalized
+        queued = self._hosts.get(host)
+        position = len(queued) if queued is not None else 0
+        if _wait_for_tokens(host, self.rate_limit, position + 1) > self.horizon_s:
+            return False
+        if queued is None:
+            queued = self._hosts[host] = deque()
+            wait = _wait_for_tokens(host, self.rate_limit, 1)
+            heapq.heappush(self._ready_at, (time.monotonic() + wait, host))
+        queued.append((entry, parsed))
+        self.waiting += 1
+        return True
+
+    def pop_ready(self, limit: int) -> list[tuple[CrawlQueueItem, NormalizedParse]]:
+        """Up to `limit` URLs whose host has a token now, oldest first per host."""
+        ready: list[tuple[CrawlQueueItem, NormalizedParse]] = []
+        now = time.monotonic()
+        while self._ready_at and self._ready_at[0][0] <= now and len(ready) < limit:
+            _, host = heapq.heappop(self._ready_at)
+            queued = self._hosts[host]
+            if _can_crawl(queued[0][1], self.rate_limit):
+                ready.append(queued.popleft())
+                self.waiting -= 1
+            if queued:
+                wait = _wait_for_tokens(host, self.rate_limit, 1)
+                heapq.heappush(self._ready_at, (now + wait, host))
+            else:
+                del self._hosts[host]
+        return ready
+
+    def next_ready_in(self) -> float | None:
+        """Seconds until some host has a token, None when nothing waits."""
+        if not self._ready_at:
+            return None
+        return max(0.0, self._ready_at[0][0] - time.monotonic())
+
+
 _HASH_SUFFIX_LEN = 10  # chars taken from md5 hexdigest
 
 
@@ -185,47 +273,37 @@ def _upload_response(
     return path
 
 
-def crawl_url(
-    ctx: Context,
-    parsed_url: NormalizedParse,
-    options: CrawlOptions,
-) -> CrawlResult:
-    start_time = time.time()
-    if not ctx.web.robot_txt_allowed(
+def _disallowed(ctx: Context, parsed_url: NormalizedParse) -> bool:
+    return not ctx.web.robot_txt_allowed(
         ctx,
         parsed_url.full_url,
         parsed_url,
         KORYTA_UA,
-    ):
-        return CrawlResult(error="disallowed by robots")
+    )
 
-    if not _can_crawl(parsed_url, options.per_domain_wait_between_requests_s):
-        return CrawlResult(hit_rate_limit=True)
 
-    with stopwatch() as t_request:
-        try:
-            response = requests.get(
-                parsed_url.full_url,
-                impersonate="chrome136",
-                headers={"User-Agent": KORYTA_UA},
-                timeout=options.request_timeout_seconds,
-                allow_redirects=True,
-            )
-        except requests.RequestsError as exc:
-            return CrawlResult(
-                error=str(exc),
-                request_duration_s=t_request.duration,
-            )
-        except Exception as exc:
-            return CrawlResult(
-                error=f"unexpected: {exc}",
-                request_duration_s=t_request.duration,
-            )
+def _fetch_failed(exc: Exception, request_duration_s: float) -> CrawlResult:
+    if isinstance(exc, requests.RequestsError):
+        return CrawlResult(error=str(exc), request_duration_s=request_duration_s)
+    return CrawlResult(
+        error=f"unexpected: {exc}",
+        request_duration_s=request_duration_s,
+    )
+
 
+def _handle_response(
+    ctx: Context,
+    parsed_url: NormalizedParse,
+    response: requests.Response,
+    options: CrawlOptions,
+    timing: tuple[float, float],
+) -> CrawlResult:
+    """Store a fetched page and find its links; `timing` is (start, request)."""
+    start_time, request_duration_s = timing
     if response.status_code != 200:
         return CrawlResult(
             error=f"http {response.status_code}",
-            request_duration_s=t_request.duration,
+            request_duration_s=request_duration_s,
         )
 
     if not _is_html_response(response):
@@ -236,7 +314,7 @@ def crawl_url(
         return CrawlResult(
             storage_path=None,
             discovered_urls=[],
-            request_duration_s=t_request.duration,
+            request_duration_s=request_duration_s,
             total_duration_s=time.time() - start_time,
             media_type=_content_type_from_response(response),
         )
@@ -250,7 +328,7 @@ def crawl_url(
     return CrawlResult(
         storage_path=storage_path,
         discovered_urls=list(discovered_urls),
-        request_duration_s=t_request.duration,
+        request_duration_s=request_duration_s,
         parse_duration_s=t_parsed.duration,
         upload_duration_s=t_upload.duration,
         total_duration_s=time.time() - start_time,
@@ -258,10 +336,87 @@ def crawl_url(
     )
 
 
+def crawl_url(
+    ctx: Context,
+    parsed_url: NormalizedParse,
+    options: CrawlOptions,
+) -> CrawlResult:
+    """Fetch, store and parse one URL whose host's token was already taken."""
+    start_time = time.time()
+    if _disallowed(ctx, parsed_url):
+        return CrawlResult(error="disallowed by robots")
+
+    with stopwatch() as t_request:
+        try:
+            response = requests.get(
+                parsed_url.full_url,
+                impersonate="chrome136",
+                headers={"User-Agent": KORYTA_UA},
+                timeout=options.request_timeout_seconds,
+                allow_redirects=True,
+            )
+        except Exception as exc:
+            return _fetch_failed(exc, t_request.duration)
+
+    return _handle_response(
+        ctx, parsed_url, response, options, (start_time, t_request.duration)
+    )
+
+
+async def crawl_url_async(
+    ctx: Context,
+    parsed_url: NormalizedParse,
+    options: CrawlOptions,
+    session: requests.AsyncSession,
+    executor: Executor | None = None,
+) -> CrawlResult:
+    """`crawl_url` with the request awaited on `session`.
+
+    Only the request is on the event loop. The robots check can fetch
+    robots.txt, and storing and parsing the page is CPU and I/O that would
+    stall every other request in flight, so both run on `executor`, or the
+    loop's default one if none is given.
+    """
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    if await loop.run_in_executor(
+        executor, functools.partial(_disallowed, ctx, parsed_url)
+    ):
+        return CrawlResult(error="disallowed by robots")
+
+    with stopwatch() as t_request:
+        try:
+            response = await session.get(
+                parsed_url.full_url,
+                impersonate="chrome136",
+                headers={"User-Agent": KORYTA_UA},
+                timeout=options.request_timeout_seconds,
+                allow_redirects=True,
+            )
+        except Exception as exc:
+            return _fetch_failed(exc, t_request.duration)
+
+    return await loop.run_in_executor(
+        executor,
+        functools.partial(
+            _handle_response,
+            ctx,
+            parsed_url,
+            response,
+            options,
+            (start_time, t_request.duration),
+        ),
+    )
+
+
 def extract_urls_from_html(html: str, base_url: str) -> set[str]:
     """Extract and normalise all absolute URLs from anchor tags in HTML."""
+    return urls_from_soup(BeautifulSoup(html, "lxml"), base_url)
+
+
+def urls_from_soup(soup: BeautifulSoup, base_url: str) -> set[str]:
+    """`extract_urls_from_html` over a page that is already parsed."""
     discovered: set[str] = set()
-    soup = BeautifulSoup(html, "lxml")
 
     base_tag = soup.find("base", href=True)
     if isinstance(base_tag, Tag):
@@ -306,14 +461,19 @@ def _extract_urls(
 
 _FLUSH_INTERVAL_S = 30.0  # also flush after this many seconds of inactivity
 _LOG_INTERVAL_S = 30.0  # how often to log queue stats
+_ASYNC_WAIT_S = 1.0  # longest the async coordinator waits on its requests
+# How many claimed URLs may wait on their host's token, per URL the workers
+# can have queued; past that the coordinator stops claiming.
+_WAITING_PER_SLOT = 8
 
 
-def _priority_for_url(options: CrawlOptions, url: str) -> Priority:
+def _new_urls(options: CrawlOptions, urls: list[str]) -> list[NewUrl]:
+    """`urls` with their queue priority, all scored in one batch."""
     scorer = get_scoring_function(
         options.url_scoring_function, options.domains_of_interest
     )
-    score = scorer(url)
-    return Priority(max(0, min(100, 100 - score)))
+    scored = QueuePriority(scorer).many(urls).tolist()
+    return [NewUrl(url, Priority(priority)) for url, priority in zip(urls, scored)]
 
 
 def _normalize_blocked(blocked: set[str]) -> set[str]:
@@ -355,12 +515,17 @@ def _flush_batch(
     options: CrawlOptions,
     blocked_normalized: set[str],
     worker_name: str,
+    seen: SeenUrls | None = None,
 ) -> None:
-    """Write a batch of crawl results to the DB in as few transactions as possible."""
+    """Write a batch of crawl results to the DB in as few transactions as possible.
+
+    Discovered links `seen` already has are not put at all, and the rest are
+    only added to it once the put has gone through.
+    """
     done_items: list[tuple[str, str | None, dict]] = []
     error_items: list[tuple[str, str]] = []
     release_items: list[str] = []
-    all_discovered: list[NewUrl] = []
+    all_discovered: list[str] = []
 
     for entry, result in pending:
         priority = entry.priority
@@ -398,9 +563,7 @@ def _flush_batch(
                     },
                 )
             )
-            all_discovered.extend(
-                NewUrl(u, _priority_for_url(options, u)) for u in result.discovered_urls
-            )
+            all_discovered.extend(result.discovered_urls)
 
     if done_items:
         queue_store.mark_done_batch(done_items)
@@ -408,8 +571,48 @@ def _flush_batch(
         queue_store.mark_error_batch(error_items)
     if release_items:
         queue_store.release_batch(release_items)
+    if seen is not None:
+        all_discovered = seen.unseen(all_discovered)
     if all_discovered:
-        queue_store.put(all_discovered)
+        queue_store.put(_new_urls(options, all_discovered))
+    if seen is not None:
+        seen.remember(all_discovered)
+        seen.checkpoint()
+
+
+def _scheduler(options: CrawlOptions) -> HostScheduler:
+    # Half the lock timeout leaves a URL that waited its longest time enough
+    # to be fetched before another worker may claim it.
+    return HostScheduler(
+        options.per_domain_wait_between_requests_s,
+        horizon_s=options.lock_timeout_seconds / 2,
+    )
+
+
+def _claim(
+    queue_store: CrawlQueue,
+    scheduler: HostScheduler,
+    options: CrawlOptions,
+    worker_name: str,
+) -> tuple[int, list[tuple[CrawlQueueItem, CrawlResult]]]:
+    """Claim a batch into `scheduler`: (how many, those to release at once).
+
+    A URL that would wait past the scheduler's horizon comes back as a
+    rate-limited result, released with the next flush. No URLs claimed means
+    the queue is exhausted.
+    """
+    entries = queue_store.get_batch(
+        worker_name,
+        batch_size=options.queue_flush_size,
+        max_retries=options.per_url_max_retries,
+        timeout_seconds=options.lock_timeout_seconds,
+    )
+    too_late = [
+        (entry, CrawlResult(hit_rate_limit=True))
+        for entry in entries
+        if not scheduler.add(entry)
+    ]
+    return len(entries), too_late
 
 
 def _coordinator(
@@ -418,11 +621,14 @@ def _coordinator(
     queue_store: CrawlQueue,
     ctx: Context,
     blocked_normalized: set[str],
+    seen: SeenUrls | None = None,
 ) -> None:
     """Coordinate DB batches and HTTP workers for one crawler process.
 
     Architecture:
     - coordinator owns queue_store and performs all DB reads/writes;
+    - claimed URLs wait in a HostScheduler until their host has a token, and
+      only then go to the workers;
     - --worker-threads controls how many _http_worker threads fetch pages;
     - --queue-flush-size controls how many URLs are claimed/flushed per queue write.
     """
@@ -448,6 +654,8 @@ def _coordinator(
     done_q: _queue.Queue[tuple[CrawlQueueItem, CrawlResult]] = _queue.Queue(
         maxsize=options.worker_threads * 2
     )
+    scheduler = _scheduler(options)
+    max_waiting = work_q.maxsize * _WAITING_PER_SLOT
 
     http_threads = [
         threading.Thread(
@@ -466,19 +674,22 @@ def _coordinator(
     total_received = 0
 
     while True:
-        # Refill work queue when it runs low.
-        if not db_exhausted and work_q.qsize() < refill_watermark:
-            entries = queue_store.get_batch(
-                worker_name,
-                batch_size=options.queue_flush_size,
-                max_retries=options.per_url_max_retries,
-                timeout_seconds=options.lock_timeout_seconds,
-            )
-            if entries:
-                for e in entries:
-                    work_q.put(e)
-                total_sent += len(entries)
-            else:
+        # Hand the workers whatever has a token now.
+        for entry, _ in scheduler.pop_ready(work_q.maxsize - work_q.qsize()):
+            work_q.put(entry)
+
+        # Claim more only when that left the workers short, not because URLs
+        # of rate-limited hosts are waiting.
+        if (
+            not db_exhausted
+            and work_q.qsize() < refill_watermark
+            and scheduler.waiting < max_waiting
+        ):
+            claimed, too_late = _claim(queue_store, scheduler, options, worker_name)
+            pending.extend(too_late)
+            total_sent += claimed
+            total_received += len(too_late)
+            if not claimed:
                 db_exhausted = True
                 logging.info("[%s] DB queue exhausted.", worker_name)
 
@@ -494,8 +705,9 @@ def _coordinator(
         now = time.monotonic()
         if now - last_log >= _LOG_INTERVAL_S:
             logging.info(
-                "[%s] work_q=%d done_q=%d pending=%d sent=%d received=%d",
+                "[%s] waiting=%d work_q=%d done_q=%d pending=%d sent=%d received=%d",
                 worker_name,
+                scheduler.waiting,
                 work_q.qsize(),
                 done_q.qsize(),
                 len(pending),
@@ -506,7 +718,9 @@ def _coordinator(
         if len(pending) >= queue_flush_size or (
             pending and now - last_flush >= _FLUSH_INTERVAL_S
         ):
-            _flush_batch(pending, queue_store, options, blocked_normalized, worker_name)
+            _flush_batch(
+                pending, queue_store, options, blocked_normalized, worker_name, seen
+            )
             pending.clear()
             last_flush = now
 
@@ -514,7 +728,12 @@ def _coordinator(
         if db_exhausted and total_sent == total_received:
             if pending:
                 _flush_batch(
-                    pending, queue_store, options, blocked_normalized, worker_name
+                    pending,
+                    queue_store,
+                    options,
+                    blocked_normalized,
+                    worker_name,
+                    seen,
                 )
                 pending.clear()
             for _ in http_threads:
@@ -528,6 +747,138 @@ def _coordinator(
         time.sleep(0.005)
 
 
+async def _async_coordinator(
+    thread_index: int,
+    options: CrawlOptions,
+    queue_store: CrawlQueue,
+    ctx: Context,
+    blocked_normalized: set[str],
+    seen: SeenUrls | None = None,
+) -> None:
+    """`_coordinator` with the HTTP workers replaced by one event loop.
+
+    Each claimed URL becomes a task awaiting its request on a shared
+    `AsyncSession`, so how many are in flight is bounded by `max_in_flight`
+    rather than by a thread per request. Claiming and flushing are the same
+    `get_batch` and `_flush_batch` calls, run off the loop one at a time so
+    the queue store still sees a single caller and requests keep going while
+    it writes.
+
+    Every request in flight also has a robots check and a response to handle
+    off the loop. The default executor stops at 32 threads, which would cap
+    the crawl well below `max_in_flight`, so those run on a pool of their own
+    with a thread per request.
+    """
+    worker_name = f"{options.worker_id}_{thread_index}"
+    max_in_flight = max(options.max_in_flight, options.queue_flush_size)
+    logging.info(
+        "Starting async crawler coordinator: %s with %d requests in flight "
+        "and queue flush size %d",
+        worker_name,
+        max_in_flight,
+        options.queue_flush_size,
+    )
+
+    async def crawl(
+        entry: CrawlQueueItem,
+        parsed_url: NormalizedParse,
+        session: requests.AsyncSession,
+        offload: Executor,
+    ):
+        try:
+            result = await crawl_url_async(ctx, parsed_url, options, session, offload)
+        except Exception as exc:
+            result = CrawlResult(error=f"unexpected: {exc}")
+        return entry, result
+
+    scheduler = _scheduler(options)
+    in_flight: set[asyncio.Task[tuple[CrawlQueueItem, CrawlResult]]] = set()
+    pending: list[tuple[CrawlQueueItem, CrawlResult]] = []
+    last_flush = time.monotonic()
+    last_log = time.monotonic()
+    db_exhausted = False
+    total_sent = 0
+    total_received = 0
+
+    with ThreadPoolExecutor(max_in_flight, thread_name_prefix=worker_name) as offload:
+        async with requests.AsyncSession(max_clients=max_in_flight) as session:
+            while True:
+                # Claim another chunk whenever a whole one fits under the bound
+                # and the URLs already claimed are not mostly waiting on tokens.
+                if (
+                    not db_exhausted
+                    and len(in_flight) + options.queue_flush_size <= max_in_flight
+                    and scheduler.waiting < max_in_flight
+                ):
+                    claimed, too_late = await asyncio.to_thread(
+                        _claim, queue_store, scheduler, options, worker_name
+                    )
+                    pending.extend(too_late)
+                    total_sent += claimed
+                    total_received += len(too_late)
+                    if not claimed:
+                        db_exhausted = True
+                        logging.info("[%s] DB queue exhausted.", worker_name)
+
+                for entry, parsed_url in scheduler.pop_ready(
+                    max_in_flight - len(in_flight)
+                ):
+                    in_flight.add(
+                        asyncio.create_task(crawl(entry, parsed_url, session, offload))
+                    )
+
+                # Wake up for the first finished request or, if there is room for
+                # it, the next host's token.
+                next_ready = scheduler.next_ready_in()
+                wait_s = _ASYNC_WAIT_S
+                if next_ready is not None and len(in_flight) < max_in_flight:
+                    wait_s = min(next_ready, _ASYNC_WAIT_S)
+                if in_flight:
+                    done, in_flight = await asyncio.wait(
+                        in_flight,
+                        timeout=wait_s,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    pending.extend(task.result() for task in done)
+                    total_received += len(done)
+                elif next_ready is not None:
+                    await asyncio.sleep(wait_s)
+
+                now = time.monotonic()
+                if now - last_log >= _LOG_INTERVAL_S:
+                    logging.info(
+                        "[%s] waiting=%d in_flight=%d pending=%d sent=%d received=%d",
+                        worker_name,
+                        scheduler.waiting,
+                        len(in_flight),
+                        len(pending),
+                        total_sent,
+                        total_received,
+                    )
+                    last_log = now
+                finished = db_exhausted and not in_flight and not scheduler.waiting
+                if pending and (
+                    finished
+                    or len(pending) >= options.queue_flush_size
+                    or now - last_flush >= _FLUSH_INTERVAL_S
+                ):
+                    await asyncio.to_thread(
+                        _flush_batch,
+                        pending,
+                        queue_store,
+                        options,
+                        blocked_normalized,
+                        worker_name,
+                        seen,
+                    )
+                    pending = []
+                    last_flush = now
+
+                if finished:
+                    logging.info("[%s] Pipeline complete.", worker_name)
+                    return
+
+
 def run_crawler(ctx: Context, options: CrawlOptions) -> None:
     queue_store = ctx.crawl_queue
     if queue_store is None:
@@ -536,4 +887,19 @@ def run_crawler(ctx: Context, options: CrawlOptions) -> None:
     blocked = queue_store.get_blocked_domains()
     blocked_normalized = _normalize_blocked(blocked)
 
-    _coordinator(0, options, queue_store, ctx, blocked_normalized)
+    seen = None
+    if options.seen_urls_path is not None:
+        seen = open_seen_urls(
+            queue_store, options.seen_urls_path, options.seen_urls_capacity
+        )
+
+    if options.engine == "async":
+        asyncio.run(
+            _async_coordinator(0, options, queue_store, ctx, blocked_normalized, seen)
+        )
+    else:
+        _coordinator(0, options, queue_store, ctx, blocked_normalized, seen)
+
+    if seen is not None and seen.path is not None:
+        seen.save(seen.path)
+        logging.info("Seen-URL filter: %s", seen.stats())
@@ -179,14 +179,38 @@ def title_from_ld_json(ld_json: Any) -> str | None:
     return None
 
 
+def parse_html(html_bytes: bytes) -> BeautifulSoup:
+    """The tree everything about a stored page is read from.
+
+    Built once per page: it is most of the cost of parsing one, and the
+    content, the metadata and the outbound links all come out of the same
+    tree (see `article_content_from_soup` and `crawler.urls_from_soup`).
+    """
+    return BeautifulSoup(html_bytes, "lxml")
+
+
+def decoded_as_utf8(soup: BeautifulSoup, html_bytes: bytes) -> bool:
+    """Whether `soup` holds the text `html_bytes.decode("utf-8", "replace")` is.
+
+    Bytes are decoded by what the page declares, so a page in ISO-8859-2 is
+    read as such; UTF-8 with its bad bytes replaced is what BeautifulSoup falls
+    back to, as `decode` does.
+    """
+    return soup.original_encoding in ("utf-8", "ascii") or html_bytes.isascii()
+
+
 def extract_article_content(
     html_bytes: bytes, selector: str, url: str = ""
 ) -> dict[str, Any]:
+    return article_content_from_soup(parse_html(html_bytes), selector)
+
+
+def article_content_from_soup(soup: BeautifulSoup, selector: str) -> dict[str, Any]:
+    """`extract_article_content` over a page already parsed by `parse_html`."""
     selector = selector.strip()
     if not selector:
         raise ValueError("selector is required")
 
-    soup = BeautifulSoup(html_bytes, "lxml")
     ld_json_items = _iter_ld_json_items(_iter_ld_json_documents(soup))
     ld_json = _pick_ld_json_metadata_from_items(ld_json_items)
 
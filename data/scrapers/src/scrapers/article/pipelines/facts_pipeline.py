@@ -5,12 +5,19 @@ import re
 import unicodedata
 from collections import defaultdict
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from tqdm import tqdm
 
-from entities.article import ArticleFacts
+from entities.article import (
+    ArticleFacts,
+    ArticlePersonMentioned,
+    KoryciarskiScore,
+    ParsedArticleRecord,
+)
 from entities.facts import (
     AffairInvolvementFact,
     ArticleFact,
@@ -31,6 +38,7 @@ from scrapers.article.pipelines.pipeline_utils import (
     llm_model,
 )
 from scrapers.stores import LLM, VERSIONED_DIR, Context, LLMRequest
+from scrapers.stores.batches import jsonl_batches
 
 PROMPT_VERSION = 26
 TEXT_LIMIT = 100000
@@ -52,6 +60,7 @@ _TEMP_OUTPUT_FILE = Path(VERSIONED_DIR) / "article_facts" / "article_facts.jsonl
 _MENTIONS_FILE = (
     Path(VERSIONED_DIR) / "article_person_mentions" / "article_person_mentions.jsonl"
 )
+_PARSED_COLUMNS = ["url", "parse_status", "article_content_hash", "article_content"]
 _THINK_BLOCK_RE = re.compile(r"<think>(.*?)</think>", flags=re.DOTALL)
 _RUN_RESPONSE_THINK_CHARS = 0
 _RUN_RESPONSE_THINK_BLOCKS = 0
@@ -365,32 +374,28 @@ def _mentioned_people_by_url(path: Path) -> dict[str, list[tuple[str, str]]]:
     people rather than name-coincidence false hits.
     """
     by_url: dict[str, list[tuple[str, str]]] = {}
-    with path.open("r", encoding="utf-8") as handle:
-        for line in tqdm(handle, desc="Reading person mentions", unit="row"):
-            raw = line.strip()
-            if not raw:
-                continue
-            try:
-                row = json.loads(raw)
-            except Exception:
-                continue
-            if row.get("verdict") != "yes":
-                continue
-            url = row.get("url")
-            person = row.get("person")
-            if (
-                not isinstance(url, str)
-                or not url
-                or not isinstance(person, str)
-                or not person.strip()
-            ):
-                continue
-            by_url.setdefault(url, []).append(
-                (person.strip(), str(row.get("person_id") or ""))
-            )
+    batches = jsonl_batches(
+        str(path),
+        ArticlePersonMentioned,
+        columns=["url", "person", "person_id", "verdict"],
+        where=pc.field("verdict") == "yes",
+    )
+    for row in _rows(batches, "Reading person mentions"):
+        url = row["url"]
+        person = row["person"]
+        if not url or not isinstance(person, str) or not person.strip():
+            continue
+        by_url.setdefault(url, []).append((person.strip(), str(row["person_id"] or "")))
     return by_url
 
 
+def _rows(batches: Iterable[pa.RecordBatch], desc: str) -> Iterator[dict[str, Any]]:
+    with tqdm(desc=desc, unit="row") as bar:
+        for batch in batches:
+            bar.update(batch.num_rows)
+            yield from batch.to_pylist()
+
+
 def _filter_to_mentioned(
     records: list[dict[str, Any]],
     mentioned: dict[str, list[tuple[str, str]]],
@@ -406,58 +411,51 @@ def _extractable_records(
 ) -> list[dict[str, Any]]:
     article_scores = _article_scores_by_url(scores_path)
     latest: dict[str, dict[str, Any]] = {}
-    with parsed_path.open("r", encoding="utf-8") as handle:
-        for line in tqdm(handle, desc="Reading parsed articles", unit="row"):
-            raw = line.strip()
-            if not raw:
-                continue
-            try:
-                row = json.loads(raw)
-            except Exception:
-                continue
-            url = row.get("url")
-            if not isinstance(url, str) or url not in article_scores:
-                continue
-            if row.get("parse_status") != "ok":
-                continue
-            content_hash = row.get("article_content_hash")
-            content = row.get("article_content")
-            if (
-                isinstance(content_hash, str)
-                and isinstance(content, str)
-                and content.strip()
-            ):
-                # Keep only the fields fact extraction needs — dropping
-                # outbound_urls (63% of the row) and other columns keeps memory
-                # bounded on the 20GB parsed file. people_mentioned is an
-                # optional hint, empty when the url has no confirmed mentions.
-                latest[url] = {
-                    "url": url,
-                    "article_content_hash": content_hash,
-                    "article_content": content,
-                    "koryciarski_llm_score": article_scores[url],
-                    "people_mentioned": [name for name, _ in mentioned.get(url, [])],
-                }
+    # Only the fields fact extraction needs -- dropping outbound_urls (63% of
+    # the row) and the other columns keeps memory bounded on the 20GB parsed
+    # file.
+    batches = jsonl_batches(
+        str(parsed_path),
+        ParsedArticleRecord,
+        columns=_PARSED_COLUMNS,
+        where=pc.field("parse_status") == "ok",
+    )
+    for row in _rows(batches, "Reading parsed articles"):
+        url = row["url"]
+        if url not in article_scores:
+            continue
+        content_hash = row["article_content_hash"]
+        content = row["article_content"]
+        if (
+            isinstance(content_hash, str)
+            and isinstance(content, str)
+            and content.strip()
+        ):
+            # people_mentioned is an optional hint, empty when the url has no
+            # confirmed mentions.
+            latest[url] = {
+                "url": url,
+                "article_content_hash": content_hash,
+                "article_content": content,
+                "koryciarski_llm_score": article_scores[url],
+                "people_mentioned": [name for name, _ in mentioned.get(url, [])],
+            }
     return list(latest.values())
 
 
 def _article_scores_by_url(path: Path) -> dict[str, int]:
     scores: dict[str, int] = {}
-    with path.open("r", encoding="utf-8") as handle:
-        for line in tqdm(handle, desc="Reading scores", unit="row"):
-            raw = line.strip()
-            if not raw:
-                continue
-            try:
-                row = json.loads(raw)
-            except Exception:
-                continue
-            if row.get("llm_is_article") is not True:
-                continue
-            url = row.get("url")
-            score = _score_from_row(row)
-            if isinstance(url, str) and score is not None:
-                scores[url] = score
+    batches = jsonl_batches(
+        str(path),
+        KoryciarskiScore,
+        columns=["url", "llm_is_article", "koryciarski_llm_score"],
+        where=pc.field("llm_is_article"),
+    )
+    for row in _rows(batches, "Reading scores"):
+        url = row["url"]
+        score = _score_from_row(row)
+        if isinstance(url, str) and score is not None:
+            scores[url] = score
     return scores
 
 
@@ -511,6 +509,7 @@ async def _extract_records(
                         model,
                     )
                     bar.update(1)
+                    bar.set_postfix(pool.stats(), refresh=False)
 
                 request_id = await pool.put_request(_fact_request(record, model, ctx))
                 pending[request_id] = record
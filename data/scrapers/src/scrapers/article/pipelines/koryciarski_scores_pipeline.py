@@ -2,9 +2,11 @@ import asyncio
 import json
 import re
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from tqdm import tqdm
 
 from entities.article import KoryciarskiScore
@@ -18,7 +20,7 @@ TEXT_LIMIT = 100000
 MAX_TOKENS = 512
 TEMPERATURE = 0.1
 
-_PARSED_FILE = Path(VERSIONED_DIR) / "article_parsed" / "article_parsed.jsonl"
+_PARSED_COLUMNS = ["url", "parse_status", "article_content_hash", "article_content"]
 _FINAL_OUTPUT_FILE = (
     Path(VERSIONED_DIR)
     / "article_koryciarski_scores"
@@ -64,16 +66,21 @@ class ArticleKoryciarskiScores(IncrementalJsonlPipeline[KoryciarskiScore]):
         return KoryciarskiScore
 
     def process(self, ctx: Context):
-        if not _PARSED_FILE.exists():
-            raise FileNotFoundError(_PARSED_FILE)
-
+        # Only the fields scoring needs -- outbound_urls alone is 63% of the
+        # row -- and only the rows that parsed. A missing article_parsed is a
+        # FileNotFoundError here, before the temp output is touched.
+        parsed = self.article_parsed.read_batches(
+            ctx,
+            columns=_PARSED_COLUMNS,
+            where=pc.field("parse_status") == "ok",
+        )
         existing = _existing_score_cache_from_files(
             _FINAL_OUTPUT_FILE,
             _TEMP_OUTPUT_FILE,
         )
         self.prepare_temp_output()
         model = llm_model()
-        records = _latest_ok_parsed_records(_PARSED_FILE)
+        records = _latest_ok_parsed_records(parsed)
         asyncio.run(_score_records(ctx, records, existing, model=model))
         _print_llm_usage(ctx)
         return pd.DataFrame()
@@ -104,35 +111,28 @@ def _existing_score_cache_from_files(*paths: Path) -> dict[str, dict[str, Any]]:
     return cache
 
 
-def _latest_ok_parsed_records(path: Path) -> list[dict[str, Any]]:
+def _latest_ok_parsed_records(
+    batches: Iterable[pa.RecordBatch],
+) -> list[dict[str, Any]]:
     latest: dict[str, dict[str, Any]] = {}
-    with path.open("r", encoding="utf-8") as handle:
-        for line in tqdm(handle, desc="Reading parsed articles", unit="row"):
-            raw = line.strip()
-            if not raw:
-                continue
-            try:
-                row = json.loads(raw)
-            except Exception:
-                continue
-            if row.get("parse_status") != "ok":
-                continue
-            url = row.get("url")
-            content_hash = row.get("article_content_hash")
-            content = row.get("article_content")
-            if (
-                isinstance(url, str)
-                and isinstance(content_hash, str)
-                and isinstance(content, str)
-                and content.strip()
-            ):
-                # Keep only the fields scoring needs — dropping outbound_urls
-                # (63% of the row) and other columns keeps memory bounded.
-                latest[url] = {
-                    "url": url,
-                    "article_content_hash": content_hash,
-                    "article_content": content,
-                }
+    with tqdm(desc="Reading parsed articles", unit="row") as bar:
+        for batch in batches:
+            bar.update(batch.num_rows)
+            for row in batch.to_pylist():
+                url = row["url"]
+                content_hash = row["article_content_hash"]
+                content = row["article_content"]
+                if (
+                    isinstance(url, str)
+                    and isinstance(content_hash, str)
+                    and isinstance(content, str)
+                    and content.strip()
+                ):
+                    latest[url] = {
+                        "url": url,
+                        "article_content_hash": content_hash,
+                        "article_content": content,
+                    }
     return list(latest.values())
 
 
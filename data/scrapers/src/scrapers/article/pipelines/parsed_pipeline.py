@@ -6,15 +6,19 @@ from collections import defaultdict
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import pandas as pd
 from tqdm import tqdm
 
 from entities.article import ParsedArticleRecord
 from entities.util import NormalizedParse
-from scrapers.article.crawler import extract_urls_from_html
-from scrapers.article.parse import extract_article_content
+from scrapers.article.crawler import extract_urls_from_html, urls_from_soup
+from scrapers.article.parse import (
+    article_content_from_soup,
+    decoded_as_utf8,
+    parse_html,
+)
 from scrapers.article.pipelines.common import (
     PARSER_VERSION,
     build_parse_status_record,
@@ -35,6 +39,7 @@ from scrapers.article.pipelines.pipeline_utils import (
     iter_done_urls,
 )
 from scrapers.stores import DOWNLOADED_DIR, VERSIONED_DIR, Context, DoneUrl
+from scrapers.stores.batch_archive import BatchArchive
 
 _FINAL_OUTPUT_FILE = Path(VERSIONED_DIR) / "article_parsed" / "article_parsed.jsonl"
 _TEMP_OUTPUT_FILE = (
@@ -262,12 +267,22 @@ def _status_row_for_task(
 def _parse_task(task: ParseTask, html_bytes: bytes) -> dict[str, Any]:
     done = DoneUrl(task.uid, task.url, task.storage_path)
     try:
-        result = extract_article_content(html_bytes, task.selector, task.url)
+        # One tree for the content, the metadata and the links: building it is
+        # most of what parsing a page costs.
+        soup = parse_html(html_bytes)
+        result = article_content_from_soup(soup, task.selector)
         base_url = (
             task.url if task.url.startswith("http") else f"https://{task.url}"
         )
-        html_text = html_bytes.decode("utf-8", errors="replace")
-        outbound_urls = sorted(extract_urls_from_html(html_text, base_url))
+        if decoded_as_utf8(soup, html_bytes):
+            outbound = urls_from_soup(soup, base_url)
+        else:
+            # Links have always been read from the page decoded as UTF-8, and
+            # the tree above decoded it as declared; the few pages where the
+            # two differ are parsed again rather than have their links change.
+            html_text = html_bytes.decode("utf-8", errors="replace")
+            outbound = extract_urls_from_html(html_text, base_url)
+        outbound_urls = sorted(outbound)
         article_content = result.get("article_content", "") or ""
         selector_matched = bool(result.get("selector_matched"))
         extraction_method = result.get("extraction_method")
@@ -327,16 +342,9 @@ def _parse_storage_batch_in_process(
     remaining = {t.url: t for t in tasks}
     results: list[dict[str, Any]] = []
     try:
-        with tarfile.open(local_path, mode="r:gz") as tar:
-            members = {m.name: m for m in tar.getmembers()}
-            for task in tasks:
-                member = members.get(_member_path_from_url(task.url))
-                if member is None:
-                    continue
-                f = tar.extractfile(member)
-                if f is not None:
-                    results.append(_parse_task(task, f.read()))
-                    remaining.pop(task.url, None)
+        for task, html in _iter_task_pages(local_path, tasks):
+            results.append(_parse_task(task, html))
+            remaining.pop(task.url, None)
     except Exception as exc:
         return [_status_row_for_task(t, "error", error=str(exc)) for t in tasks]
     for task in remaining.values():
@@ -344,6 +352,35 @@ def _parse_storage_batch_in_process(
     return results
 
 
+def _iter_task_pages(
+    local_path: Path, tasks: list[ParseTask]
+) -> Iterator[tuple[ParseTask, bytes]]:
+    """Each task's page out of the batch, decompressing only those pages.
+
+    Batches written before `BatchArchive` existed have no member index; those
+    are listed and extracted with tarfile, as all of them used to be.
+    """
+    by_member: dict[str, list[ParseTask]] = defaultdict(list)
+    for task in tasks:
+        by_member[_member_path_from_url(task.url)].append(task)
+    with local_path.open("rb") as raw:
+        archive = BatchArchive.open(raw)
+        if archive.members() is not None:
+            for name, html in archive.pages(by_member):
+                for task in by_member[name]:
+                    yield task, html
+            return
+    with tarfile.open(local_path, mode="r:gz") as tar:
+        members = {m.name: m for m in tar.getmembers()}
+        for task in tasks:
+            member = members.get(_member_path_from_url(task.url))
+            if member is None:
+                continue
+            f = tar.extractfile(member)
+            if f is not None:
+                yield task, f.read()
+
+
 def _member_path_from_url(url: str) -> str:
     try:
         parsed = NormalizedParse.parse(url)
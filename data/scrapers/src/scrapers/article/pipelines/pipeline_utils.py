@@ -9,6 +9,7 @@ import pandas as pd
 
 from entities.util import NormalizedParse
 from scrapers.stores import Context, DoneUrl
+from scrapers.stores.batch_archive import BatchArchive
 from scrapers.stores.file import GCSBlob
 
 _GCS_PREFIX = "gs://koryta-pl-crawled/"
@@ -53,22 +54,8 @@ def iter_html_by_tar(
             by_path[done.storage_path].append(done)
 
     for storage_path, urls in by_path.items():
-        blob_name = storage_path.removeprefix(_GCS_PREFIX)
         try:
-            raw = ctx.io.read_data(GCSBlob(blob_name=blob_name)).read_bytes()
-        except Exception:
-            continue
-        html_by_url: dict[str, bytes] = {}
-        try:
-            with tarfile.open(fileobj=io.BytesIO(raw), mode="r:gz") as tar:
-                members = {m.name: m for m in tar.getmembers()}
-                for done in urls:
-                    member = members.get(_member_path(done.url))
-                    if member is None:
-                        continue
-                    f = tar.extractfile(member)
-                    if f is not None:
-                        html_by_url[done.url] = f.read()
+            html_by_url = _read_html_from_tar(ctx, storage_path, urls)
         except Exception:
             continue
         if html_by_url:
@@ -79,30 +66,40 @@ def iter_html_from_storage(
     ctx: Context, done_urls: list[DoneUrl]
 ) -> "Generator[tuple[str, bytes], None, None]":
     """Yield (url, html_bytes) one tar.gz at a time for incremental processing."""
-    by_path: dict[str, list[DoneUrl]] = defaultdict(list)
-    for done in done_urls:
-        if done.storage_path:
-            by_path[done.storage_path].append(done)
+    for _, html_by_url in iter_html_by_tar(ctx, done_urls):
+        yield from html_by_url.items()
 
-    for storage_path, urls in by_path.items():
-        blob_name = storage_path.removeprefix(_GCS_PREFIX)
-        try:
-            raw = ctx.io.read_data(GCSBlob(blob_name=blob_name)).read_bytes()
-        except Exception:
-            continue
-        try:
-            with tarfile.open(fileobj=io.BytesIO(raw), mode="r:gz") as tar:
-                members = {m.name: m for m in tar.getmembers()}
-                for done in urls:
-                    member_name = _member_path(done.url)
-                    member = members.get(member_name)
-                    if member is None:
-                        continue
-                    f = tar.extractfile(member)
-                    if f is not None:
-                        yield done.url, f.read()
-        except Exception:
-            continue
+
+def _read_html_from_tar(
+    ctx: Context, storage_path: str, urls: list[DoneUrl]
+) -> dict[str, bytes]:
+    """The pages of `urls` out of one crawl batch.
+
+    A batch with a member index is range-read for just those pages; one
+    written before the index existed is downloaded and listed whole.
+    """
+    blob = GCSBlob(blob_name=storage_path.removeprefix(_GCS_PREFIX))
+    archive = BatchArchive(lambda start, length: ctx.io.read_range(blob, start, length))
+    if archive.members() is not None:
+        pages = dict(archive.pages(_member_path(done.url) for done in urls))
+        return {
+            done.url: pages[name]
+            for done in urls
+            if (name := _member_path(done.url)) in pages
+        }
+
+    html_by_url: dict[str, bytes] = {}
+    raw = ctx.io.read_data(blob).read_bytes()
+    with tarfile.open(fileobj=io.BytesIO(raw), mode="r:gz") as tar:
+        members = {m.name: m for m in tar.getmembers()}
+        for done in urls:
+            member = members.get(_member_path(done.url))
+            if member is None:
+                continue
+            f = tar.extractfile(member)
+            if f is not None:
+                html_by_url[done.url] = f.read()
+    return html_by_url
 
 
 def domains_from_done_urls(done_df: pd.DataFrame) -> set[str]:
@@ -178,6 +175,34 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
         default=1800,
         help="HTTP timeout for each LLM request.",
     )
+    parser.add_argument(
+        "--llm-port-token-budget",
+        type=int,
+        default=None,
+        help="Tokens each LLM port may hold at once, counting a request as its "
+        "estimated prompt plus max tokens; requests past it wait. Size it to "
+        "the server's KV cache and raise --llm-per-port-concurrency with it. "
+        "Off by default.",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        default=None,
+        help="SQLite file of finished LLM responses, shared by every pipeline; "
+        "a repeated request is answered from it. Defaults to "
+        "downloaded/llm_cache.sqlite.",
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Send every LLM request to the servers, even a repeated one.",
+    )
+    parser.add_argument(
+        "--llm-cache-max-gb",
+        type=float,
+        default=4.0,
+        help="Size the LLM response cache is kept under, least recently used "
+        "responses evicted first.",
+    )
     parser.add_argument(
         "--article-workers",
         type=int,
@@ -273,6 +298,23 @@ def llm_api_key() -> str | None:
     return _args().llm_api_key
 
 
+def llm_port_token_budget() -> int | None:
+    return _args().llm_port_token_budget
+
+
+def llm_cache() -> str | None:
+    """The --llm-cache path as given; None leaves the default to the caller."""
+    return _args().llm_cache
+
+
+def llm_cache_disabled() -> bool:
+    return _args().no_llm_cache
+
+
+def llm_cache_max_bytes() -> int:
+    return int(_args().llm_cache_max_gb * (1 << 30))
+
+
 def article_workers() -> int:
     return _args().article_workers
 
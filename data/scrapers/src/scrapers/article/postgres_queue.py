@@ -3,13 +3,14 @@
 All direct psycopg access is encapsulated here.
 """
 
+import itertools
 import logging
 import os
 import time
 from collections import Counter, defaultdict, deque
 from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Callable
+from typing import Callable, Iterable, Iterator
 from uuid import uuid4
 from zoneinfo import ZoneInfo
 
@@ -18,6 +19,7 @@ from psycopg.types.json import Jsonb
 from psycopg_pool import ConnectionPool, PoolTimeout
 
 from entities.util import NormalizedParse
+from scrapers.article.scoring import QueuePriority
 from scrapers.stores import BlockedDomain, CrawlQueue, CrawlQueueItem, DoneUrl, NewUrl
 
 logger = logging.getLogger(__name__)
@@ -39,6 +41,12 @@ _HOST_BUCKET_INDEX = "idx_wi_host_bucket_prio"
 # insert. Kept well under the hard limit for UTF-8 headroom.
 _MAX_URL_BYTES = 2000
 
+# Batches at least this big are written with COPY into a temporary staging
+# table and one set-based statement, instead of a statement per row. Smaller
+# ones -- the crawler's flushes -- stay on executemany: a temp table per flush
+# would churn the system catalogs for little gain.
+_COPY_MIN_ROWS = 1000
+
 
 def _bucket_expr(url_sql: str) -> str:
     """SQL expression mapping a URL column/param to its host bucket.
@@ -146,6 +154,40 @@ class PostgresClient:
             cursor.execute(sql, params)
             return cursor.fetchall()
 
+    def stream(
+        self, sql: str, params=None, batch_size: int = 10_000
+    ) -> Iterator[tuple]:
+        """Rows of `sql` through a server-side cursor, `batch_size` at a time."""
+        with self._pool.connection() as conn:
+            with conn.cursor(name=f"stream_{uuid4().hex}") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(sql, params)
+                yield from cursor
+
+    def copy_apply(
+        self,
+        staging: str,
+        rows: Iterable[tuple],
+        apply_sql: str,
+        params=None,
+    ) -> int:
+        """COPY `rows` into a temporary table and run `apply_sql` against it.
+
+        `staging` is the temp table's name and column list, e.g.
+        `"staged (id text, priority integer)"`, and `apply_sql` the statement
+        reading from it. Both run in one transaction, which drops the table;
+        returns the rows `apply_sql` affected.
+        """
+        name = staging.split("(", 1)[0].strip()
+        with self._pool.connection() as conn:
+            with conn.transaction(), conn.cursor() as cursor:
+                cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP")
+                with cursor.copy(f"COPY {name} FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                cursor.execute(apply_sql, params)
+                return cursor.rowcount
+
     def close(self) -> None:
         self._pool.close()
 
@@ -379,10 +421,24 @@ class PostgresCrawlQueue(CrawlQueue):
         self,
         items: list[tuple[str, str | None, dict]],
     ) -> None:
-        """Batch-mark URLs done in a single executemany call."""
+        """Batch-mark URLs done in a single executemany call, or a COPY."""
         if not items:
             return
         now = datetime.now(warsaw_tz)
+        if len(items) >= _COPY_MIN_ROWS:
+            self.pg.copy_apply(
+                "staged_done (id text, storage_path text, metadata jsonb)",
+                (
+                    (uid, storage_path, Jsonb(metadata))
+                    for uid, storage_path, metadata in items
+                ),
+                "UPDATE website_index w SET done = TRUE, date_finished = %s, "
+                "locked_by_worker_id = NULL, locked_at = NULL, "
+                "storage_path = s.storage_path, metadata = s.metadata "
+                "FROM staged_done s WHERE w.id = s.id",
+                (now,),
+            )
+            return
         self.pg.executemany(
             "UPDATE website_index SET done = TRUE, date_finished = %s, "
             "locked_by_worker_id = NULL, locked_at = NULL, "
@@ -410,7 +466,8 @@ class PostgresCrawlQueue(CrawlQueue):
 
     def release_batch(self, uids: list[str]) -> None:
         """Keep current locks and let timeout-based retry semantics apply."""
-        # The crawler calls release_batch() for local rate-limit skips. For
+        # The crawler calls release_batch() for claimed URLs whose domain is
+        # too rate-limited to get to before their lock would run out. For
         # Postgres we intentionally keep locks so URLs cannot be reclaimed in a
         # tight loop; get()/get_batch() will expose them again after
         # lock_timeout_seconds.
@@ -463,17 +520,10 @@ class PostgresCrawlQueue(CrawlQueue):
             for url, priority, date_added in rows
             for normalized in (self._normalize_url(url),)
         ]
-        sql = (
-            "INSERT INTO website_index ("
-            "id, url, priority, done, errors, num_retries, "
-            "date_added, date_finished, mined_from_url, host_bucket) "
-            f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, {_bucket_expr('%s')}) "
-            "ON CONFLICT(url) DO NOTHING"
-        )
         max_attempts = 5
         for attempt in range(1, max_attempts + 1):
             try:
-                self.pg.executemany(sql, prepared)
+                self._write_urls(prepared)
                 return
             except psycopg.errors.DeadlockDetected as exc:
                 if attempt == max_attempts:
@@ -495,32 +545,76 @@ class PostgresCrawlQueue(CrawlQueue):
                 )
                 time.sleep(backoff)
 
-    def reprioritize(self, priority_fn: Callable[[str], int], batch_size: int = 5000):
-        """Recalculate priority for all pending URLs using priority function."""
-        rows = self.pg.fetchall("SELECT id, url FROM website_index WHERE done = FALSE;")
-        logger.info("Reprioritizing %d pending URLs...", len(rows))
-        updated = 0
-        batch: list[tuple[int, str]] = []
-        for uid, url in rows:
-            priority = priority_fn(url)
-            if not 0 <= priority <= 100:
-                raise ValueError(f"Priority must be 0-100, got {priority}")
-            batch.append((priority, uid))
-            if len(batch) >= batch_size:
-                self.pg.executemany(
-                    "UPDATE website_index SET priority = %s WHERE id = %s",
-                    batch,
-                )
-                updated += len(batch)
-                batch = []
-        if batch:
+    def _write_urls(self, prepared: list[tuple]) -> None:
+        if len(prepared) < _COPY_MIN_ROWS:
             self.pg.executemany(
-                "UPDATE website_index SET priority = %s WHERE id = %s",
-                batch,
+                "INSERT INTO website_index ("
+                "id, url, priority, done, errors, num_retries, "
+                "date_added, date_finished, mined_from_url, host_bucket) "
+                f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, {_bucket_expr('%s')}) "
+                "ON CONFLICT(url) DO NOTHING",
+                prepared,
             )
-            updated += len(batch)
+            return
+        # Inserting in url order keeps two workers' batches from taking the
+        # url index's locks in opposite orders.
+        self.pg.copy_apply(
+            "staged_urls (id text, url text, priority integer, date_added timestamptz)",
+            (
+                (uid, url, priority, date_added)
+                for uid, url, priority, _, _, _, date_added, *_ in prepared
+            ),
+            "INSERT INTO website_index ("
+            "id, url, priority, done, errors, num_retries, date_added, host_bucket) "
+            "SELECT id, url, priority, FALSE, '{}'::text[], 0, date_added, "
+            f"{_bucket_expr('url')} FROM staged_urls ORDER BY url "
+            "ON CONFLICT(url) DO NOTHING",
+        )
+
+    def reprioritize(self, priority_fn: Callable[[str], int], batch_size: int = 5000):
+        """Recalculate priority for all pending URLs using priority function.
+
+        The scores are computed while streaming the pending URLs, `batch_size`
+        at a time -- in one call per batch for a `QueuePriority` -- then
+        written with one COPY and one `UPDATE ... FROM`, which skips the rows
+        whose priority did not change.
+        """
+        scored: list[tuple[str, int]] = []
+        rows = self.pg.stream(
+            "SELECT id, url FROM website_index WHERE done = FALSE",
+            batch_size=batch_size,
+        )
+        for batch in itertools.batched(rows, batch_size):
+            uids, urls = zip(*batch)
+            if isinstance(priority_fn, QueuePriority):
+                batch_priorities = priority_fn.many(urls).tolist()
+            else:
+                batch_priorities = [priority_fn(url) for url in urls]
+            for uid, priority in zip(uids, batch_priorities):
+                if not 0 <= priority <= 100:
+                    raise ValueError(f"Priority must be 0-100, got {priority}")
+                scored.append((uid, priority))
+        logger.info("Reprioritizing %d pending URLs...", len(scored))
+        updated = self.pg.copy_apply(
+            "staged_priorities (id text, priority integer)",
+            scored,
+            "UPDATE website_index w SET priority = s.priority "
+            "FROM staged_priorities s "
+            "WHERE w.id = s.id AND w.priority IS DISTINCT FROM s.priority",
+        )
         logger.info("Reprioritized %d URLs.", updated)
 
+    def known_urls(self, since: datetime | None = None) -> Iterator[str]:
+        """Stored (normalized) URLs, streamed rather than fetched at once."""
+        if since is None:
+            rows = self.pg.stream("SELECT url FROM website_index")
+        else:
+            rows = self.pg.stream(
+                "SELECT url FROM website_index WHERE date_added >= %s", (since,)
+            )
+        for (url,) in rows:
+            yield url
+
     def get_done_urls(self, limit: int | None = None) -> list[DoneUrl]:
         """Fetch crawled pages that have a storage_path, for parsing."""
         _base = (
@@ -3,18 +3,29 @@
 Assigns priority scores to URLs based on keyword relevance.
 """
 
+import functools
+from collections import OrderedDict
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Any, Callable
 
+import numpy as np
+
 from entities.util import NormalizedParse
 from util.polish import remove_polish_diacritics
 
 # Internal type: all registered scorers accept domains_of_interest
 _RawScorer = Callable[[str, frozenset[str]], int]
-# Public type returned by get_scoring_function (domains already bound)
-ScoringFunction = Callable[[str], int]
+# A scorer that takes a whole batch of URLs at once, for the ML models whose
+# per-call overhead dwarfs scoring one URL.
+_RawBatchScorer = Callable[[Sequence[str], frozenset[str]], np.ndarray]
 
 SCORING_FUNCTIONS: dict[str, _RawScorer] = {}
+_BATCH_SCORING_FUNCTIONS: dict[str, _RawBatchScorer] = {}
+
+# URLs each scorer remembers the score of. A site links the same navigation
+# from every page, so a crawl flush is mostly URLs scored before.
+_CACHE_SIZE = 200_000
 
 
 def score_function(name: str):
@@ -25,18 +36,98 @@ def score_function(name: str):
     return decorator
 
 
+def batch_score_function(name: str):
+    """Register the batch form of the scorer `name`, used by `score_many`."""
+
+    def decorator(fn: _RawBatchScorer) -> _RawBatchScorer:
+        _BATCH_SCORING_FUNCTIONS[name] = fn
+        return fn
+
+    return decorator
+
+
+class ScoringFunction:
+    """A registered scorer with its domains bound, scoring one URL or many.
+
+    `score_many` scores a whole batch with one call of the batch form when the
+    scorer has one, and falls back to URL by URL otherwise. Either way the
+    last `cache_size` scores are kept, and only URLs not among them are scored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        domains_of_interest: frozenset[str] = frozenset(),
+        cache_size: int = _CACHE_SIZE,
+    ) -> None:
+        self.name = name
+        self.domains_of_interest = domains_of_interest
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    def __call__(self, url: str) -> int:
+        return int(self.score_many([url])[0])
+
+    def score_many(self, urls: Sequence[str]) -> np.ndarray:
+        """Scores of `urls`, in order, as an integer array."""
+        unique = list(dict.fromkeys(urls))
+        missing = [url for url in unique if url not in self._cache]
+        if missing:
+            for url, score in zip(missing, self._score(missing).tolist()):
+                self._cache[url] = int(score)
+        scores = np.fromiter(
+            (self._cache[url] for url in urls), dtype=np.int64, count=len(urls)
+        )
+        # Evict only after the lookups, so a batch bigger than the cache still
+        # finds all of its own scores.
+        for url in unique:
+            self._cache.move_to_end(url)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return scores
+
+    def _score(self, urls: list[str]) -> np.ndarray:
+        batch = _BATCH_SCORING_FUNCTIONS.get(self.name)
+        if batch is not None:
+            return batch(urls, self.domains_of_interest)
+        single = SCORING_FUNCTIONS[self.name]
+        return np.fromiter(
+            (single(url, self.domains_of_interest) for url in urls),
+            dtype=np.int64,
+            count=len(urls),
+        )
+
+
+@functools.cache
 def get_scoring_function(
     name: str, domains_of_interest: frozenset[str] = frozenset()
 ) -> ScoringFunction:
     """Look up a scoring function by name.
 
-    Available: {list(SCORING_FUNCTIONS.keys())}
+    The same name and domains give the same `ScoringFunction`, so its cache
+    outlives the caller. Available: {list(SCORING_FUNCTIONS.keys())}
     """
     if name not in SCORING_FUNCTIONS:
         available = ", ".join(SCORING_FUNCTIONS.keys())
         raise ValueError(f"Unknown scoring function: {name!r}. Available: {available}")
-    fn = SCORING_FUNCTIONS[name]
-    return lambda url: fn(url, domains_of_interest)
+    return ScoringFunction(name, domains_of_interest)
+
+
+class QueuePriority:
+    """The crawl-queue priority a scorer gives: 100 - score, within 0..100.
+
+    Lower goes first. Callable per URL like any priority function, and `many`
+    gives a whole batch from one `score_many`.
+    """
+
+    def __init__(self, scorer: ScoringFunction) -> None:
+        self.scorer = scorer
+
+    def __call__(self, url: str) -> int:
+        return int(self.many([url])[0])
+
+    def many(self, urls: Sequence[str]) -> np.ndarray:
+        return np.clip(100 - self.scorer.score_many(urls), 0, 100)
 
 
 def tag_in_url(tag: str, url: str) -> bool:
@@ -221,10 +312,10 @@ _ML_SCORE_SCALE = {
 }
 
 
-def _predict_raw(model_name: str, urls: list[str]) -> list[float]:
+def _predict_raw(model_name: str, urls: Sequence[str]) -> np.ndarray:
     """Raw float predictions. Keeping the sub-integer signal (0.4, not round→0)
     is what lets priorities actually spread out."""
-    return [float(p) for p in _load_url_model(model_name).predict(urls)]
+    return np.asarray(_load_url_model(model_name).predict(list(urls)), dtype=float)
 
 
 def _host_of_interest(url: str, domains: frozenset[str]) -> bool:
@@ -245,21 +336,51 @@ def _ml_priority_score(
     return max(0, min(100, round(raw * scale)))
 
 
+def _ml_priority_scores(
+    model_name: str, urls: Sequence[str], domains: frozenset[str]
+) -> np.ndarray:
+    """`_ml_priority_score` of a batch, with one `predict` call for all of it."""
+    scale = _ML_SCORE_SCALE.get(model_name, 1.0)
+    scores = np.clip(np.rint(_predict_raw(model_name, urls) * scale), 0, 100)
+    if domains:
+        of_interest = np.fromiter(
+            (_host_of_interest(url, domains) for url in urls),
+            dtype=bool,
+            count=len(urls),
+        )
+        scores[~of_interest] = 0
+    return scores.astype(np.int64)
+
+
 @score_function("koryciarski_ml")
 def url_score_koryciarski_ml(
     url: str, domains_of_interest: frozenset[str] = frozenset()
 ) -> int:
     """Predicted koryciarski score, scaled to 0..100 and seed-gated."""
-    raw = _predict_raw("koryciarski_url", [url])[0]
+    raw = float(_predict_raw("koryciarski_url", [url])[0])
     return _ml_priority_score("koryciarski_url", raw, url, domains_of_interest)
 
 
+@batch_score_function("koryciarski_ml")
+def url_scores_koryciarski_ml(
+    urls: Sequence[str], domains_of_interest: frozenset[str] = frozenset()
+) -> np.ndarray:
+    return _ml_priority_scores("koryciarski_url", urls, domains_of_interest)
+
+
 @score_function("article_hub_ml")
 def url_score_article_hub_ml(
     url: str, domains_of_interest: frozenset[str] = frozenset()
 ) -> int:
     """Predicted number of ok article links, scaled to 0..100 and seed-gated."""
-    raw = _predict_raw("ok_article_links_url", [url])[0]
+    raw = float(_predict_raw("ok_article_links_url", [url])[0])
     return _ml_priority_score(
         "ok_article_links_url", raw, url, domains_of_interest
     )
+
+
+@batch_score_function("article_hub_ml")
+def url_scores_article_hub_ml(
+    urls: Sequence[str], domains_of_interest: frozenset[str] = frozenset()
+) -> np.ndarray:
+    return _ml_priority_scores("ok_article_links_url", urls, domains_of_interest)
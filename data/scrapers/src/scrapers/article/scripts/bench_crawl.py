@@ -14,7 +14,7 @@ import sys
 import threading
 import time
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable, cast
@@ -40,6 +40,8 @@ class RunConfig:
     extra_args: list[str]
     profile_dir: Path
     workdir_suffix: str
+    # When set, the benchmark runs once per crawl engine and compares them.
+    engines: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -1138,6 +1140,14 @@ def _parse_args() -> RunConfig:
     parser.add_argument("--local-output", type=Path, default=Path("crawler_output"))
     parser.add_argument("--extra-arg", action="append", default=[])
     parser.add_argument("--workdir-suffix", type=str, default="")
+    parser.add_argument(
+        "--compare-engines",
+        type=lambda value: [e.strip() for e in value.split(",") if e.strip()],
+        default=[],
+        metavar="ENGINES",
+        help="Comma-separated crawl engines (threads,async) to run one after "
+        "another with the same settings, writing engine_comparison.json.",
+    )
     args = parser.parse_args()
     return RunConfig(
         workers=args.workers,
@@ -1150,11 +1160,29 @@ def _parse_args() -> RunConfig:
         extra_args=args.extra_arg,
         profile_dir=Path("../../../scripts"),
         workdir_suffix=args.workdir_suffix,
+        engines=args.compare_engines,
     )
 
 
-def main() -> int:
-    cfg = _parse_args()
+def _engine_summary(
+    engine: str, cfg: RunConfig, run_dir: Path, stats: dict[str, object]
+) -> dict[str, object]:
+    per_worker = cast(
+        dict[str, dict[str, float | int | str]], stats.get("per_worker", {})
+    )
+    rows = per_worker.values()
+    crawls = sum(_coerce_int(row.get("total_crawls")) for row in rows)
+    request_time = sum(_coerce_float(row.get("request_time_s")) for row in rows)
+    return {
+        "engine": engine,
+        "run_dir": str(run_dir),
+        "crawls": crawls,
+        "crawls_per_s": crawls / cfg.runtime_seconds if cfg.runtime_seconds else 0.0,
+        "mean_request_s": request_time / crawls if crawls else 0.0,
+    }
+
+
+def _run_benchmark(cfg: RunConfig) -> tuple[Path, dict[str, object]]:
     run_dir = ARTIFACTS_ROOT / (_now_stamp() + "__" + cfg.workdir_suffix)
     logs_dir = run_dir / "worker_logs"
     pg_dir = run_dir / "postgres"
@@ -1218,7 +1246,7 @@ def main() -> int:
     started_at = run_meta.get("started_at")
     if not isinstance(started_at, str):
         raise ValueError("run metadata missing started_at")
-    _collect_duration_stats(
+    stats = _collect_duration_stats(
         run_dir,
         started_at,
         pg_client,
@@ -1231,6 +1259,34 @@ def main() -> int:
         pg_dir / "pg_stat_statements_after.tsv",
         run_dir / "pg_summary.txt",
     )
+    return run_dir, stats
+
+
+def main() -> int:
+    cfg = _parse_args()
+    if not cfg.engines:
+        _run_benchmark(cfg)
+        return 0
+
+    comparison = []
+    for engine in cfg.engines:
+        engine_cfg = replace(
+            cfg,
+            extra_args=[*cfg.extra_args, "--engine", engine],
+            workdir_suffix=f"{cfg.workdir_suffix}__{engine}",
+        )
+        run_dir, stats = _run_benchmark(engine_cfg)
+        comparison.append(_engine_summary(engine, engine_cfg, run_dir, stats))
+    comparison_path = ARTIFACTS_ROOT / (
+        f"{_now_stamp()}__{cfg.workdir_suffix}__engine_comparison.json"
+    )
+    _write_json(comparison_path, {"engines": comparison})
+    for row in comparison:
+        print(
+            f"{row['engine']}: {row['crawls']} crawls, "
+            f"{row['crawls_per_s']:.2f}/s, mean request {row['mean_request_s']:.2f}s"
+        )
+    print(f"Engine comparison: {comparison_path}")
     return 0
 
 
@@ -0,0 +1,204 @@
+"""URLs the crawl queue already has, kept in a Bloom filter by the coordinator.
+
+Every crawled page hands all of its links to `CrawlQueue.put`, and nearly all
+of them are in `website_index` already: the insert is an `ON CONFLICT DO
+NOTHING` that costs an index probe and WAL for nothing. The coordinator asks
+this filter first and only puts what it has not seen, and remembers a URL only
+once the put has returned: one remembered before a put that failed would never
+be offered to the queue again, not even after a restart, as the filter is
+saved.
+
+A Bloom filter says "maybe seen" for a URL it never had with a small
+probability, the false-positive rate, and such a URL is dropped -- not crawled
+from this link, though any other worker or a later page may still add it. The
+rate grows as the filter fills, so it is sized for a capacity up front and
+`false_positive_rate` reports the estimate from how many bits are set.
+
+The filter is written to a file and loaded on the next start, topped up with
+what the queue gained since, so a restart does not re-read the whole table.
+"""
+
+import hashlib
+import logging
+import math
+import struct
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+from entities.util import NormalizedParse
+from scrapers.stores import CrawlQueue
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"KSEEN1"
+# magic, bits, hashes, set bits, seeded until (unix seconds)
+_HEADER = struct.Struct("<6sQIQd")
+# Seeding starts this long before the saved filter last caught up, for the
+# clocks of the workers that stamped `date_added`.
+_SEED_OVERLAP_S = 300.0
+# How often a filter with a path writes itself back, at most.
+_CHECKPOINT_INTERVAL_S = 300.0
+
+
+def seen_key(url: str) -> str:
+    """The URL as the queue stores it: normalized host and path, no scheme."""
+    parsed = NormalizedParse.parse(url.strip())
+    return f"{parsed.hostname_normalized}{parsed.path}"
+
+
+class SeenUrls:
+    """A Bloom filter of queue URLs, counting the inserts it saved."""
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001) -> None:
+        capacity = max(1, capacity)
+        bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self._init(bits, max(1, round(bits / capacity * math.log(2))))
+
+    def _init(self, bits: int, hashes: int) -> None:
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+        self._set = 0
+        # When the filter last caught up with the queue, for `seed`.
+        self.seeded_until: float | None = None
+        # Where `checkpoint` writes the filter, if anywhere.
+        self.path: Path | None = None
+        self._saved_at = time.monotonic()
+        self.skipped = 0
+        self.passed = 0
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Two 64-bit halves of one digest, combined as in Kirsch-Mitzenmacher.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+    def add(self, key: str) -> bool:
+        """Remember `key`; True if it was not in the filter before."""
+        new = False
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._array[byte] & mask:
+                self._array[byte] |= mask
+                self._set += 1
+                new = True
+        return new
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def false_positive_rate(self) -> float:
+        """The chance an unseen URL is taken for a seen one, as filled now."""
+        return (self._set / self.bits) ** self.hashes
+
+    def unseen(self, urls: Iterable[str]) -> list[str]:
+        """The `urls` not seen before, one per key; `remember` them once put."""
+        fresh = []
+        keys: set[str] = set()
+        for url in urls:
+            key = seen_key(url)
+            if key in keys or key in self:
+                self.skipped += 1
+            else:
+                keys.add(key)
+                fresh.append(url)
+        self.passed += len(fresh)
+        return fresh
+
+    def remember(self, urls: Iterable[str]) -> None:
+        """Take `urls` as seen, now that the queue has them."""
+        for url in urls:
+            self.add(seen_key(url))
+
+    def seed(self, urls: Iterable[str], until: float | None = None) -> int:
+        """Add URLs the queue already holds, up to `until` (now by default)."""
+        count = 0
+        for url in urls:
+            self.add(seen_key(url))
+            count += 1
+        self.seeded_until = time.time() if until is None else until
+        return count
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            "skipped": self.skipped,
+            "passed": self.passed,
+            "bits": self.bits,
+            "fill": self._set / self.bits,
+            "false_positive_rate": self.false_positive_rate(),
+        }
+
+    def save(self, path: Path) -> None:
+        header = _HEADER.pack(
+            _MAGIC, self.bits, self.hashes, self._set, self.seeded_until or 0.0
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        partial.write_bytes(header + self._array)
+        partial.replace(path)
+
+    def checkpoint(self) -> None:
+        """Save to `path` if there is one and the last save is a while ago."""
+        if self.path is None:
+            return
+        if time.monotonic() - self._saved_at < _CHECKPOINT_INTERVAL_S:
+            return
+        self.save(self.path)
+        self._saved_at = time.monotonic()
+        logger.info("Seen-URL filter saved: %s", self.stats())
+
+    @classmethod
+    def load(cls, path: Path) -> "SeenUrls | None":
+        """The filter saved at `path`, None if there is none or it is unreadable."""
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, bits, hashes, set_bits, seeded_until = _HEADER.unpack_from(data)
+        if magic != _MAGIC or len(data) - _HEADER.size != (bits + 7) // 8:
+            logger.warning("Ignoring unreadable seen-URL filter at %s", path)
+            return None
+        seen = cls.__new__(cls)
+        seen._init(bits, hashes)
+        seen._array = bytearray(data[_HEADER.size :])
+        seen._set = set_bits
+        seen.seeded_until = seeded_until or None
+        return seen
+
+
+def open_seen_urls(queue: CrawlQueue, path: Path | None, capacity: int) -> SeenUrls:
+    """The filter saved at `path`, caught up with `queue`, or a new one seeded.
+
+    Only the URLs added since the saved filter last caught up are read back,
+    so a restart costs what the queue gained in between. `seeded_until` is
+    taken before reading so nothing added meanwhile is missed next time.
+    """
+    seen = SeenUrls.load(path) if path is not None else None
+    since: datetime | None = None
+    if seen is None:
+        seen = SeenUrls(capacity)
+    elif seen.seeded_until is not None:
+        since = datetime.fromtimestamp(
+            seen.seeded_until - _SEED_OVERLAP_S, tz=timezone.utc
+        )
+    started = time.time()
+    count = seen.seed(queue.known_urls(since), until=started)
+    seen.path = path
+    logger.info(
+        "Seen-URL filter: %d URLs %s, %.2f%% of %d bits set, "
+        "estimated false-positive rate %.2e",
+        count,
+        "seeded" if since is None else f"added since {since.isoformat()}",
+        100 * seen.stats()["fill"],
+        seen.bits,
+        seen.false_positive_rate(),
+    )
+    return seen
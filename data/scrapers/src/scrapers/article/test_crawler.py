@@ -0,0 +1,276 @@
+"""The crawl coordinators, against a fake queue store and a fake network."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import Literal, cast
+
+import pytest
+
+from scrapers.article import crawler
+from scrapers.article.crawler import (
+    CrawlOptions,
+    CrawlResult,
+    HostScheduler,
+    run_crawler,
+)
+from scrapers.article.seen_urls import SeenUrls
+from scrapers.stores import Context, CrawlQueue, CrawlQueueItem, NewUrl
+
+
+def page(url: str) -> str:
+    return f'<html><body><a href="{url}/next">next</a></body></html>'
+
+
+class FakeQueue:
+    """Hands out `urls` in batches and records what comes back."""
+
+    def __init__(self, urls: list[str]) -> None:
+        self.todo = [CrawlQueueItem(f"uid-{i}", url, 50) for i, url in enumerate(urls)]
+        self.done: list[str] = []
+        self.errors: list[tuple[str, str]] = []
+        self.released: list[str] = []
+        self.added: list[NewUrl] = []
+
+    def get_blocked_domains(self) -> set[str]:
+        return set()
+
+    def get_batch(self, worker_id, batch_size, max_retries, timeout_seconds):
+        batch, self.todo = self.todo[:batch_size], self.todo[batch_size:]
+        return batch
+
+    def mark_done_batch(self, items):
+        self.done.extend(uid for uid, _, _ in items)
+
+    def mark_error_batch(self, items):
+        self.errors.extend(items)
+
+    def release_batch(self, uids):
+        self.released.extend(uids)
+
+    def put(self, urls):
+        self.added.extend(urls)
+
+
+def response(url: str) -> SimpleNamespace:
+    status = 404 if url.endswith("/missing") else 200
+    return SimpleNamespace(
+        status_code=status,
+        headers={"Content-Type": "text/html; charset=utf-8"},
+        content=page(url).encode(),
+        text=page(url),
+        url=url,
+    )
+
+
+class FakeSession:
+    """An `AsyncSession` that answers after a short wait, counting overlap."""
+
+    running = 0
+    most = 0
+
+    def __init__(self, max_clients: int = 10) -> None:
+        self.max_clients = max_clients
+
+    async def __aenter__(self) -> FakeSession:
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def get(self, url: str, **kwargs):
+        FakeSession.running += 1
+        FakeSession.most = max(FakeSession.most, FakeSession.running)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            FakeSession.running -= 1
+        return response(url)
+
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(monkeypatch):
+    monkeypatch.setattr(crawler, "_token_buckets", {})
+
+
+def run(
+    monkeypatch,
+    queue: FakeQueue,
+    engine: Literal["threads", "async"] = "async",
+    max_in_flight: int = 16,
+    rate_limit: float = 0,
+) -> list[str]:
+    FakeSession.running = FakeSession.most = 0
+    monkeypatch.setattr(crawler.requests, "AsyncSession", FakeSession)
+    monkeypatch.setattr(crawler.requests, "get", lambda url, **kwargs: response(url))
+    uploaded: list[str] = []
+
+    def batch_upload(url, content, content_type):
+        uploaded.append(url)
+        return f"gs://bucket/{len(uploaded)}"
+
+    ctx = SimpleNamespace(
+        io=SimpleNamespace(batch_upload=batch_upload),
+        web=SimpleNamespace(robot_txt_allowed=lambda *args: True),
+        crawl_queue=cast(CrawlQueue, queue),
+    )
+    options = crawl_options(
+        per_domain_wait_between_requests_s=rate_limit,
+        engine=engine,
+        max_in_flight=max_in_flight,
+    )
+    run_crawler(cast(Context, ctx), options)
+    return uploaded
+
+
+def crawl_options(**overrides) -> CrawlOptions:
+    fields = dict(
+        worker_id="test",
+        storage_type="gcs",
+        local_output=None,
+        per_url_max_retries=3,
+        lock_timeout_seconds=20,
+        per_domain_wait_between_requests_s=0,
+        url_scoring_function="default",
+        worker_threads=4,
+        queue_flush_size=8,
+    )
+    return CrawlOptions(**{**fields, **overrides})
+
+
+def test_every_url_is_answered_with_many_in_flight(monkeypatch):
+    urls = [f"https://example{i}.pl/a" for i in range(40)] + [
+        "https://example.pl/missing"
+    ]
+    queue = FakeQueue(urls)
+
+    uploaded = run(monkeypatch, queue)
+
+    assert sorted(uploaded) == sorted(urls[:-1])
+    assert len(queue.done) == 40
+    assert queue.errors == [("uid-40", "http 404")]
+    assert {u.url for u in queue.added} == {f"{url}/next" for url in urls[:-1]}
+    assert 8 < FakeSession.most <= 16
+
+
+def test_requests_in_flight_are_not_capped_by_the_default_executor(monkeypatch):
+    # The default executor has at most 32 threads; 40 robots checks that only
+    # return once all 40 are running need a thread each.
+    monkeypatch.setattr(crawler, "_ASYNC_WAIT_S", 0.01)
+    hosts = 40
+    all_running = threading.Barrier(hosts, timeout=5)
+    monkeypatch.setattr(
+        crawler, "_disallowed", lambda ctx, parsed_url: all_running.wait() < 0
+    )
+    urls = [f"https://example{i}.pl/a" for i in range(hosts)]
+    queue = FakeQueue(urls)
+
+    uploaded = run(monkeypatch, queue, max_in_flight=64)
+
+    assert sorted(uploaded) == sorted(urls)
+    assert queue.errors == []
+
+
+@pytest.mark.parametrize("engine", ["threads", "async"])
+def test_a_busy_host_waits_for_tokens_instead_of_being_released(monkeypatch, engine):
+    monkeypatch.setattr(crawler, "_BURST_WINDOW_S", 0)
+    urls = [f"https://a.pl/{i}" for i in range(4)]
+    queue = FakeQueue(urls)
+
+    uploaded = run(monkeypatch, queue, engine=engine, rate_limit=0.05)
+
+    assert uploaded == urls
+    assert queue.released == []
+    assert len(queue.done) == 4
+
+
+@pytest.mark.parametrize("engine", ["threads", "async"])
+def test_what_would_outwait_its_lock_is_released(monkeypatch, engine):
+    # 30s a request leaves a bucket of two: two URLs now, the third in 30s,
+    # past the 10s a claimed URL may wait under a 20s lock.
+    urls = ["https://a.pl/1", "https://a.pl/2", "https://a.pl/3", "https://b.pl/1"]
+    queue = FakeQueue(urls)
+
+    uploaded = run(monkeypatch, queue, engine=engine, rate_limit=30)
+
+    assert sorted(uploaded) == ["https://a.pl/1", "https://a.pl/2", "https://b.pl/1"]
+    assert queue.released == ["uid-2"]
+
+
+def entries(*urls: str) -> list[CrawlQueueItem]:
+    return [CrawlQueueItem(url, url, 50) for url in urls]
+
+
+def test_scheduler_hands_out_what_has_a_token_first_in_first_out():
+    scheduler = HostScheduler(rate_limit=30, horizon_s=60)
+    for entry in entries("https://a.pl/1", "https://a.pl/2", "https://a.pl/3"):
+        assert scheduler.add(entry)
+    assert scheduler.add(entries("https://www.b.pl/1")[0])
+
+    ready = [entry.url for entry, _ in scheduler.pop_ready(limit=10)]
+
+    assert sorted(ready) == ["https://a.pl/1", "https://a.pl/2", "https://www.b.pl/1"]
+    assert ready.index("https://a.pl/1") < ready.index("https://a.pl/2")
+    assert scheduler.waiting == 1
+    assert scheduler.pop_ready(limit=10) == []
+    assert 29 < (scheduler.next_ready_in() or 0) <= 30
+
+
+def test_scheduler_refuses_what_would_outwait_its_lock():
+    scheduler = HostScheduler(rate_limit=30, horizon_s=10)
+    added = [
+        scheduler.add(e) for e in entries(*(f"https://a.pl/{i}" for i in range(3)))
+    ]
+
+    assert added == [True, True, False]
+    assert scheduler.waiting == 2
+
+
+def test_scheduler_respects_the_limit():
+    scheduler = HostScheduler(rate_limit=0, horizon_s=10)
+    for entry in entries(*(f"https://a{i}.pl/" for i in range(5))):
+        scheduler.add(entry)
+
+    assert len(scheduler.pop_ready(limit=3)) == 3
+    assert len(scheduler.pop_ready(limit=3)) == 2
+    assert scheduler.next_ready_in() is None
+
+
+class FailingQueue(FakeQueue):
+    """A queue whose next `put` fails, as one out of deadlock retries does."""
+
+    fail = True
+
+    def put(self, urls):
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("deadlock detected")
+        super().put(urls)
+
+
+def test_links_a_failed_put_lost_are_offered_again():
+    queue = FailingQueue([])
+    seen = SeenUrls(capacity=1000)
+    [entry] = entries("https://a.pl/")
+    found = CrawlResult(
+        storage_path="gs://bucket/1", discovered_urls=["https://a.pl/next"]
+    )
+
+    def flush() -> None:
+        crawler._flush_batch(
+            [(entry, found)],
+            cast(CrawlQueue, queue),
+            crawl_options(),
+            set(),
+            "test",
+            seen,
+        )
+
+    with pytest.raises(RuntimeError):
+        flush()
+    flush()
+    flush()
+
+    assert [new.url for new in queue.added] == ["https://a.pl/next"]
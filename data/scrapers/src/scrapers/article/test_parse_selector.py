@@ -3,7 +3,11 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
+import pytest
+
+from scrapers.article.crawler import extract_urls_from_html
 from scrapers.article.parse import extract_article_content
+from scrapers.article.pipelines.parsed_pipeline import ParseTask, _parse_task
 from scrapers.article.selectors import load_selector_map
 
 
@@ -52,3 +56,45 @@ def test_load_selector_map_normalizes_domains(tmp_path: Path):
         "example.com": ".content",
         "example.org": "article",
     }
+
+
+PAGES = {
+    "utf8": """<html><head><meta charset="utf-8">
+        <script type="application/ld+json">
+          {"@graph": [{"@type": "WebSite", "name": "Gazeta"},
+                      {"@type": "NewsArticle", "headline": "Zażółć gęślą jaźń",
+                       "datePublished": "2024-03-05"}]}
+        </script></head>
+        <body><article><p>Prezes spółki&nbsp;odwołany.</p>
+        <a href="/kraj/żółw?x=1#y">żółw</a> <a href="https://Other.pl/a/">a</a>
+        <a href="mailto:x@y.pl">m</a> <a href="#top">t</a></article></body></html>
+    """.encode(),
+    "declared_iso_8859_2": """<html><head>
+        <meta http-equiv="Content-Type" content="text/html; charset=iso-8859-2">
+        </head><body><div class="tresc">Łódź</div>
+        <a href="/miasto/łódź">Łódź</a></body></html>
+    """.encode("iso-8859-2"),
+    "broken_bytes": b"<html><body><div class='tresc'>a\xff\xfeb</div>"
+    b"<a href='/x\xff'>x</a><base href='https://base.pl/dir/'>"
+    b"<a href='rel'>r</a></body></html>",
+    "no_match": b"<html><body><p>nothing</p><a href='/a'>a</a></body></html>",
+}
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_one_tree_reads_what_two_did(name):
+    """The single parse per page changes nothing in what a page yields."""
+    html = PAGES[name]
+    selector = "article, div.tresc"
+    url = "www.example.pl/strona"
+    record = _parse_task(ParseTask("uid", url, "path", "example.pl", selector), html)
+
+    before = extract_article_content(html, selector, url)
+    links = extract_urls_from_html(
+        html.decode("utf-8", errors="replace"), f"https://{url}"
+    )
+    assert record["article_content"] == before["article_content"]
+    assert record["selector_matched"] == before["selector_matched"]
+    assert record["title"] == before["title"]
+    assert record["ld_json"] == before["ld_json"]
+    assert record["outbound_urls"] == sorted(links)
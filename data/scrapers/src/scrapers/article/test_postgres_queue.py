@@ -8,6 +8,7 @@ from datetime import datetime
 import pytest
 from pytest_postgresql import factories  # type: ignore[import-not-found]
 
+from scrapers.article import postgres_queue
 from scrapers.article.postgres_queue import PostgresClient, PostgresCrawlQueue
 from scrapers.stores import BlockedDomain, DoneUrl, NewUrl
 
@@ -46,6 +47,15 @@ def test_put_populates_urls(db: PostgresCrawlQueue):
 
 
 
+def test_known_urls_streams_stored_urls_since(db: PostgresCrawlQueue):
+    db.put([NewUrl("https://www.example.com/a", 0)])
+    cutoff = datetime.now().astimezone()
+    db.put([NewUrl("https://example.org/b", 0)])
+
+    assert sorted(db.known_urls()) == ["example.com/a", "example.org/b"]
+    assert list(db.known_urls(since=cutoff)) == ["example.org/b"]
+
+
 def test_load_blocked_domains_upserts(db: PostgresCrawlQueue):
     db.add_blocked_domains([BlockedDomain("blocked.test", "first")])
     db.add_blocked_domains([BlockedDomain("blocked.test", "second")])
@@ -87,6 +97,59 @@ def test_insert_urls_and_reprioritize(db: PostgresCrawlQueue):
     assert [priority for _, priority in priorities] == [30, 30]
 
 
+@pytest.fixture
+def copy_always(monkeypatch):
+    monkeypatch.setattr(postgres_queue, "_COPY_MIN_ROWS", 1)
+
+
+def test_copy_insert_skips_known_urls(db: PostgresCrawlQueue, copy_always):
+    db.put([NewUrl("https://example.com/a", 7)])
+    db.put(
+        [
+            NewUrl("https://example.com/a", 0),
+            NewUrl("https://example.com/b", 5),
+            NewUrl("https://www.example.com/b", 9),
+        ]
+    )
+    rows = db.pg.fetchall(
+        "SELECT url, priority, done, num_retries, host_bucket IS NOT NULL"
+        " FROM website_index ORDER BY url;"
+    )
+    assert rows == [
+        ("example.com/a", 7, False, 0, True),
+        ("example.com/b", 5, False, 0, True),
+    ]
+    assert db.get("worker-1", max_retries=1) is not None
+
+
+def test_copy_mark_done_batch(db: PostgresCrawlQueue, copy_always):
+    db.put([NewUrl("https://example.com/a", 0), NewUrl("https://example.com/b", 0)])
+    uids = dict(db.pg.fetchall("SELECT url, id FROM website_index;"))
+    db.mark_done_batch(
+        [
+            (uids["example.com/a"], "s3://bucket/a", {"worker_id": "w1"}),
+            (uids["example.com/b"], None, {}),
+        ]
+    )
+    rows = db.pg.fetchall(
+        "SELECT url, done, storage_path, metadata, date_finished IS NOT NULL"
+        " FROM website_index ORDER BY url;"
+    )
+    assert rows == [
+        ("example.com/a", True, "s3://bucket/a", {"worker_id": "w1"}, True),
+        ("example.com/b", True, None, {}, True),
+    ]
+
+
+def test_reprioritize_writes_only_changed_rows(db: PostgresCrawlQueue, caplog):
+    db.put([NewUrl("https://example.com/a", 30), NewUrl("https://example.com/b", 0)])
+    with caplog.at_level("INFO"):
+        db.reprioritize(lambda url: 30)
+    assert "Reprioritized 1 URLs." in caplog.text
+    priorities = db.pg.fetchall("SELECT priority FROM website_index;")
+    assert priorities == [(30,), (30,)]
+
+
 @pytest.mark.skipif(not _env_flag("POSTGRES_STRESS"), reason="set POSTGRES_STRESS=1")
 def test_concurrent_get_and_lock(db: PostgresCrawlQueue):
     urls = [f"https://example.com/{i}" for i in range(200)]
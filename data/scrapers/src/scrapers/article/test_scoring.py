@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from scrapers.article import scoring
+from scrapers.article.scoring import (
+    SCORING_FUNCTIONS,
+    QueuePriority,
+    ScoringFunction,
+)
+
+URLS = [
+    "https://example.pl/wiadomosci/2024/radny-powolany-do-rady-nadzorczej",
+    "https://example.pl/tag/sport",
+    "https://example.pl/kuchnia/przepis.pdf",
+    "https://kalisz.pl/urzad/prezes-spolki-miejskiej",
+    "https://example.pl/",
+]
+
+
+class FakeModel:
+    """Predicts from the URL length, counting how many times it is asked."""
+
+    def __init__(self) -> None:
+        self.calls: list[int] = []
+
+    def predict(self, urls: list[str]) -> np.ndarray:
+        self.calls.append(len(urls))
+        return np.array([len(url) / 20 for url in urls])
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setitem(scoring._loaded_models, "koryciarski_url", fake)
+    return fake
+
+
+def test_score_many_matches_scoring_url_by_url():
+    scorer = ScoringFunction("default")
+
+    many = scorer.score_many(URLS)
+
+    assert many.tolist() == [
+        SCORING_FUNCTIONS["default"](url, frozenset()) for url in URLS
+    ]
+
+
+def test_ml_batch_matches_single_url_scoring_in_one_predict(model):
+    domains = frozenset({"kalisz.pl"})
+    scorer = ScoringFunction("koryciarski_ml", domains)
+
+    many = scorer.score_many(URLS)
+
+    assert model.calls == [len(URLS)]
+    single = [SCORING_FUNCTIONS["koryciarski_ml"](url, domains) for url in URLS]
+    assert many.tolist() == single
+
+
+def test_cached_urls_are_not_scored_again(model):
+    scorer = ScoringFunction("koryciarski_ml", cache_size=3)
+
+    first = scorer.score_many(URLS[:2])
+    second = scorer.score_many(URLS[:3] + URLS[:1])
+
+    assert model.calls == [2, 1]
+    assert second.tolist()[:2] == first.tolist()
+    assert second[3] == first[0]
+    assert len(scorer._cache) == 3
+
+
+def test_a_batch_bigger_than_the_cache_still_gets_all_scores(model):
+    scorer = ScoringFunction("koryciarski_ml", cache_size=2)
+    scorer.score_many(URLS[:2])
+
+    scores = scorer.score_many(URLS)
+
+    assert len(scores) == len(URLS)
+    assert len(scorer._cache) == 2
+
+
+def test_queue_priority_is_inverted_score():
+    priority = QueuePriority(ScoringFunction("default"))
+
+    many = priority.many(URLS)
+
+    assert many.tolist() == [priority(url) for url in URLS]
+    assert all(0 <= p <= 100 for p in many.tolist())
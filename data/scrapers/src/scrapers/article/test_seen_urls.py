@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import cast
+
+from scrapers.article.seen_urls import SeenUrls, open_seen_urls
+from scrapers.stores import CrawlQueue
+
+
+class KnownUrls:
+    """Just enough of a CrawlQueue for seeding: stored URLs and when added."""
+
+    def __init__(self, urls: dict[str, datetime]) -> None:
+        self.urls = urls
+        self.asked: list[datetime | None] = []
+
+    def known_urls(self, since: datetime | None = None):
+        self.asked.append(since)
+        return iter(
+            url for url, added in self.urls.items() if since is None or added >= since
+        )
+
+
+def as_queue(known: KnownUrls) -> CrawlQueue:
+    return cast(CrawlQueue, known)
+
+
+def test_only_unseen_links_pass_and_are_counted():
+    seen = SeenUrls(capacity=1000)
+    seen.seed(["example.pl/a"])
+
+    fresh = seen.unseen(
+        ["https://www.example.pl/a", "https://example.pl/b", "http://example.pl/b"]
+    )
+
+    assert fresh == ["https://example.pl/b"]
+    assert (seen.skipped, seen.passed) == (2, 1)
+
+
+def test_links_are_offered_until_remembered():
+    seen = SeenUrls(capacity=1000)
+
+    assert seen.unseen(["https://example.pl/a"]) == ["https://example.pl/a"]
+    assert seen.unseen(["https://example.pl/a"]) == ["https://example.pl/a"]
+
+    seen.remember(["https://example.pl/a"])
+
+    assert seen.unseen(["https://example.pl/a"]) == []
+
+
+def test_false_positive_rate_is_near_the_target_at_capacity():
+    seen = SeenUrls(capacity=20_000, false_positive_rate=0.01)
+    seen.seed(f"example.pl/{i}" for i in range(20_000))
+
+    misses = sum(f"other.pl/{i}" in seen for i in range(20_000))
+
+    assert 0.005 < seen.false_positive_rate() < 0.02
+    assert misses / 20_000 < 0.02
+
+
+def test_a_saved_filter_catches_up_only_with_what_is_new(tmp_path):
+    path = tmp_path / "seen.bloom"
+    queue = KnownUrls({"example.pl/old": datetime(2026, 1, 1).astimezone()})
+    first = open_seen_urls(as_queue(queue), path, capacity=1000)
+    first.save(path)
+    queue.urls["example.pl/new"] = datetime.now().astimezone()
+
+    second = open_seen_urls(as_queue(queue), path, capacity=1000)
+
+    assert queue.asked[0] is None
+    assert queue.asked[1] is not None
+    assert "example.pl/old" in second and "example.pl/new" in second
+    assert "example.pl/other" not in second
+
+
+def test_an_unreadable_filter_is_rebuilt(tmp_path):
+    path = tmp_path / "seen.bloom"
+    path.write_bytes(b"not a filter")
+    queue = KnownUrls({"example.pl/a": datetime.now().astimezone()})
+
+    seen = open_seen_urls(as_queue(queue), path, capacity=1000)
+
+    assert queue.asked == [None]
+    assert "example.pl/a" in seen
@@ -239,6 +239,7 @@ def is_owned_by_queried(item: dict) -> bool:
 
 class CompaniesKRS(Pipeline[KrsCompany]):
     filename = "company_krs"
+    format = "parquet"
     # These are written as strings and have to be read back as strings. Without
     # the pin pandas types the columns as floats, so a REGON of "010053589"
     # comes back as 10053589.0 -- the leading zero gone, and a ".0" appended to
@@ -328,8 +329,8 @@ class CompaniesKRS(Pipeline[KrsCompany]):
             # makes the same choice, for the same reason.
             if isinstance(blob_ref, DownloadableFile) and blob_ref.size != 0
         ]
-        for blob_ref in latest_crawls(listing, lambda ref: ref.url):
-            blob = ctx.io.read_data(blob_ref)
+        latest = latest_crawls(listing, lambda ref: ref.url)
+        for blob_ref, blob in ctx.io.read_each(latest):
             content = blob.read_string()
             if content == "":
                 # Still checked: a listing that carries no sizes cannot say.
@@ -1,5 +1,6 @@
 import argparse
 import json
+import posixpath
 import typing
 from dataclasses import asdict, dataclass, field
 from datetime import date, timedelta
@@ -28,7 +29,12 @@ from scrapers.stores import (
     Pipeline,
     iterate_pipeline_dict,
 )
-from scrapers.stores.file import DownloadableFile
+from scrapers.stores.file import (
+    DownloadableFile,
+    GCSBlob,
+    LocalFile,
+    split_crawl_date,
+)
 
 
 class QueryType(Enum):
@@ -199,12 +205,12 @@ API_KRS_METHODS = (
 )
 
 
-def _read_json(ctx: Context, blob_ref: DownloadableFile):
+def _read_json(ctx: Context, blob_ref: GCSBlob):
     """A stored response as parsed JSON, or None if there is nothing to read."""
     try:
         content = ctx.io.read_data(blob_ref).read_string()
     except Exception as e:
-        print(f"Could not read {blob_ref.url}: {e}")
+        print(f"Could not read {blob_ref.blob_name}: {e}")
         return None
     if not content:
         return None
@@ -214,6 +220,33 @@ def _read_json(ctx: Context, blob_ref: DownloadableFile):
         return None
 
 
+def _days_since(newest: str, today: date) -> list[str] | None:
+    """The days from `newest` through tomorrow, or None to list everything.
+
+    `newest` itself is listed again, since its crawl may have gone on after
+    the last run, and tomorrow too: the crawler names objects by the day in
+    Warsaw, which can be ahead of the machine's.
+
+    A newest day past tomorrow - clock skew, a hand upload, a misnamed object -
+    would leave no days to list until the calendar caught up with it, so it
+    lists everything instead, as a listing too old to catch up does.
+    """
+    if not newest:
+        return None
+    first = date.fromisoformat(newest)
+    last = today + timedelta(days=1)
+    if (today - first).days > MAX_INCREMENTAL_DAYS or first > last:
+        return None
+    return [
+        (first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)
+    ]
+
+
+def _any_of(values: list[str]) -> str:
+    """A `match_glob` alternative matching any one of `values`."""
+    return values[0] if len(values) == 1 else "{" + ",".join(values) + "}"
+
+
 # TODO spread the usage of this function
 def enum_dict_factory(data):
     """Converts enum fields to their underlying value."""
@@ -226,6 +259,30 @@ def enum_dict_factory(data):
     return dict(result)
 
 
+#: The two hosts whose crawls say which companies have been asked about.
+KRS_PREFIXES = ("hostname=rejestr.io", "hostname=api-krs.ms.gov.pl")
+
+#: Past this many days since the newest crawl in the saved listing, one
+#: listing of the whole prefix is cheaper than a listing per day.
+MAX_INCREMENTAL_DAYS = 31
+
+
+@dataclass
+class ListedBlob:
+    """One object of a listing, as `KRSAlreadyScraped` keeps it between runs."""
+
+    name: str
+    size: int | None
+    generation: int | None
+    updated: str | None
+
+    @staticmethod
+    def from_ref(ref: DownloadableFile) -> "ListedBlob":
+        # gs://bucket/name -> name
+        name = ref.url.split("/", 3)[3] if ref.url.startswith("gs://") else ref.url
+        return ListedBlob(name, ref.size, ref.generation, ref.updated)
+
+
 class KRSAlreadyScraped(Pipeline):
     filename = "krs_already_scraped"
     dtype = {"krs": str}
@@ -241,41 +298,130 @@ class KRSAlreadyScraped(Pipeline):
 
         Told apart by the size the listing already carries, so no body is read
         here. A reference whose size is unknown is kept: unknown is not empty.
+
+        The listing itself is kept next to the output (see `_listing`), and a
+        run only lists what was crawled since: both prefixes had to be walked
+        in full every time to rebuild a table that a day of crawling changes
+        by a few hundred rows.
         """
         output = []
         success, fail, empty = 0, 0, 0
         # The newest response for each (krs, register), which is the only one
         # whose answer still stands.
-        newest: dict[tuple[str, QueryType], tuple[KRSScraped, DownloadableFile]] = {}
+        newest: dict[tuple[str, QueryType], tuple[KRSScraped, ListedBlob]] = {}
 
-        for prefix in ("hostname=rejestr.io", "hostname=api-krs.ms.gov.pl"):
-            for blob_name in tqdm(ctx.io.list_files(CloudStorage(prefix=prefix))):
-                assert isinstance(blob_name, DownloadableFile)
-                if blob_name.size == 0:
+        listing = self._listing(ctx)
+        for prefix in KRS_PREFIXES:
+            for blob in listing[prefix]:
+                if blob.size == 0:
                     empty += 1
                     continue
-                r = KRSScraped.parse(blob_name.url)
+                r = KRSScraped.parse(blob.name)
                 if r:
                     success += 1
                     output.append(r)
                     if r.method in API_KRS_METHODS:
                         seen = newest.get((r.krs, r.method))
                         if seen is None or r.date >= seen[0].date:
-                            newest[(r.krs, r.method)] = (r, blob_name)
+                            newest[(r.krs, r.method)] = (r, blob)
                 else:
                     fail += 1
             print(f"{prefix}: success {success}, fail {fail}, failed crawls {empty}")
 
-        self._mark_not_found(ctx, newest)
+        self._mark_not_found(ctx, newest, self._previous_answers(ctx))
 
         return pd.DataFrame.from_records(
             [asdict(r, dict_factory=enum_dict_factory) for r in output]
         )
 
+    def listing_path(self) -> str:
+        assert self.filename
+        return posixpath.join(self.filename, self.filename + ".listing.jsonl")
+
+    def _listing(self, ctx: Context) -> dict[str, list[ListedBlob]]:
+        """Every object under `KRS_PREFIXES`, by prefix, brought up to date.
+
+        The bucket only grows - `Storage.upload` never overwrites - and every
+        crawl is named for the day it was taken, so what a run has not seen is
+        exactly what carries a date from the newest it has seen onwards. Those
+        days are listed together, one listing per prefix matched on a
+        ``date={d1,d2,...}`` glob wherever in the name the segment sits, and
+        merged into the saved listing by name. Listing by name offset would be
+        cheaper still, but the date stopped leading the name long ago and now
+        trails it, so new objects are spread across the whole prefix rather
+        than gathered at its end.
+
+        With no saved listing, or one too old to be worth catching up, the
+        prefixes are listed in full, as every run used to. Deleting the file
+        forces that.
+        """
+        ref = LocalFile(self.listing_path(), "versioned")
+        saved: dict[str, dict[str, ListedBlob]] = {p: {} for p in KRS_PREFIXES}
+        try:
+            for line in ctx.io.read_data(ref).read_string().splitlines():
+                if line.strip():
+                    blob = ListedBlob(**json.loads(line))
+                    prefix = blob.name.split("/", 1)[0]
+                    if prefix in saved:
+                        saved[prefix][blob.name] = blob
+        except FileNotFoundError:
+            pass
+
+        newest_day = max(
+            (split_crawl_date(name)[1] for blobs in saved.values() for name in blobs),
+            default="",
+        )
+        days = _days_since(newest_day, date.today())
+        for prefix in KRS_PREFIXES:
+            if days is None:
+                saved[prefix] = {}
+                listing = CloudStorage(prefix=prefix)
+            else:
+                # Each listing walks the whole prefix on the server, whatever
+                # it matches, so the days go in one glob rather than one each.
+                listing = CloudStorage(
+                    prefix=prefix, namespace_values={"date": _any_of(days)}
+                )
+            known = len(saved[prefix])
+            for blob_ref in tqdm(ctx.io.list_files(listing), desc=f"Listing {prefix}"):
+                assert isinstance(blob_ref, DownloadableFile)
+                blob = ListedBlob.from_ref(blob_ref)
+                saved[prefix][blob.name] = blob
+            print(f"{prefix}: {len(saved[prefix]) - known} new objects")
+
+        def writer(f: typing.Any) -> None:
+            for blobs in saved.values():
+                for blob in blobs.values():
+                    f.write((json.dumps(asdict(blob)) + "\n").encode("utf-8"))
+
+        ctx.io.write_file(ref, writer)
+        return {prefix: list(blobs.values()) for prefix, blobs in saved.items()}
+
+    def _previous_answers(self, ctx: Context) -> dict[tuple[str, str, str], bool]:
+        """`not_found` by (krs, method, date), as the last output recorded it.
+
+        A stored response never changes, so neither does what it said; only a
+        response this has not seen before needs opening.
+        """
+        if self.output_time(ctx) is None:
+            return {}
+        try:
+            df = self.read(ctx)
+        except FileNotFoundError:
+            return {}
+        if df is None or df.empty or "not_found" not in df.columns:
+            return {}
+        df = normalise(df, "date")
+        rows = df[["krs", "method", "date", "not_found"]].itertuples(index=False)
+        return {
+            (krs, method, day): bool(not_found) for krs, method, day, not_found in rows
+        }
+
     def _mark_not_found(
         self,
         ctx: Context,
-        newest: dict[tuple[str, QueryType], tuple[KRSScraped, "DownloadableFile"]],
+        newest: dict[tuple[str, QueryType], tuple[KRSScraped, ListedBlob]],
+        answered: dict[tuple[str, str, str], bool],
     ) -> None:
         """Flag the newest response per register that was a 404.
 
@@ -290,14 +436,18 @@ class KRSAlreadyScraped(Pipeline):
         but it is not big either, and only a listing that carries sizes can
         say which.
         """
-        candidates = [
-            (scraped, ref)
-            for scraped, ref in newest.values()
-            if ref.size is None or ref.size <= NOT_FOUND_SIZE_BOUND
-        ]
-        for scraped, ref in tqdm(candidates, desc="Reading the short api-krs bodies"):
-            scraped.not_found = is_not_found(_read_json(ctx, ref))
-        settled = sum(scraped.not_found for scraped, _ in candidates)
+        candidates = []
+        for scraped, blob in newest.values():
+            if blob.size is not None and blob.size > NOT_FOUND_SIZE_BOUND:
+                continue
+            key = (scraped.krs, scraped.method.value, scraped.date)
+            if key in answered:
+                scraped.not_found = answered[key]
+            else:
+                candidates.append((scraped, blob))
+        for scraped, blob in tqdm(candidates, desc="Reading the short api-krs bodies"):
+            scraped.not_found = is_not_found(_read_json(ctx, GCSBlob(blob.name)))
+        settled = sum(scraped.not_found for scraped, _ in newest.values())
         print(
             f"Registers that answered 404: {settled} "
             f"(read {len(candidates)} of {len(newest)} newest responses)"
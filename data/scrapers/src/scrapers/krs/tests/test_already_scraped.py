@@ -1,7 +1,12 @@
 """What counts as a company having been scraped."""
 
+import io
+import json
+from datetime import date
+
 import pandas as pd
 
+from scrapers.krs import scrape
 from scrapers.krs.scrape import (
     KRSAlreadyScraped,
     KRSScraped,
@@ -10,11 +15,12 @@ from scrapers.krs.scrape import (
     api_krs_register,
 )
 from scrapers.stores import Context, ProcessPolicy
-from scrapers.stores.file import DownloadableFile
+from scrapers.stores.file import CloudStorage, DownloadableFile, GCSBlob
 from scrapers.test_tree import MockIO, MockNLP, MockRejestrIO, MockUtils, MockWeb
 
 BUCKET = "gs://koryta-pl-crawled"
 KRS = "0000000110"
+NOT_FOUND = {"title": "Not Found", "status": 404}
 
 
 def odpis(register: str, day: str) -> str:
@@ -24,21 +30,59 @@ def odpis(register: str, day: str) -> str:
     )
 
 
+class Text:
+    def __init__(self, text: str):
+        self.text = text
+
+    def read_string(self) -> str:
+        return self.text
+
+    def read_dataframe(self, fmt, dtype=None) -> pd.DataFrame:
+        return pd.read_json(io.StringIO(self.text), lines=True, dtype=dtype)
+
+
 class ListingIO(MockIO):
-    """Serves a listing that knows each object's size, as GCS does."""
+    """Serves a listing that knows each object's size, as GCS does.
+
+    Keeps what is written to it, so a second run sees what the first left.
+    """
 
     def __init__(self, blobs: dict[str, int | None]):
         self.blobs = blobs
+        self.files: dict[str, str] = {}
+        self.listed: list[str] = []
+        self.listings: list[CloudStorage] = []
 
     def list_files(self, path):
+        self.listings.append(path)
+        # A single day, or a `{d1,d2}` glob alternative of several.
+        days = path.namespace_values.get("date", "").strip("{}")
+        wanted = [f"date={day}" for day in days.split(",")] if days else None
         for name, size in self.blobs.items():
-            if name.startswith(path.prefix):
+            if name.startswith(path.prefix) and (
+                wanted is None or any(w in name for w in wanted)
+            ):
+                self.listed.append(name)
                 yield DownloadableFile(f"{BUCKET}/{name}", size=size)
 
+    def read_data(self, fs):
+        key = fs.blob_name if isinstance(fs, GCSBlob) else fs.filename
+        if key not in self.files:
+            raise FileNotFoundError(key)
+        return Text(self.files[key])
 
-def scraped(blobs) -> pd.DataFrame:
-    ctx = Context(
-        io=ListingIO(blobs),
+    def write_file(self, fs, content):
+        out = io.BytesIO()
+        content(out)
+        self.files[fs.filename] = out.getvalue().decode()
+
+    def get_mtime(self, fs):
+        return 1.0 if getattr(fs, "filename", None) in self.files else None
+
+
+def context(listing: ListingIO) -> Context:
+    return Context(
+        io=listing,
         rejestr_io=MockRejestrIO(),
         con=None,  # type: ignore[arg-type]
         utils=MockUtils(),
@@ -46,7 +90,10 @@ def scraped(blobs) -> pd.DataFrame:
         nlp=MockNLP(),
         refresh_policy=ProcessPolicy.with_default(),
     )
-    return KRSAlreadyScraped().process(ctx)
+
+
+def scraped(blobs) -> pd.DataFrame:
+    return KRSAlreadyScraped().process(context(ListingIO(blobs)))
 
 
 # ─── which register was asked ─────────────────────────────
@@ -137,15 +184,7 @@ def rejestrio(krs: str, day: str, kind: str = "aktualne") -> str:
 
 
 def missing_register_entries(blobs) -> set[str]:
-    ctx = Context(
-        io=ListingIO(blobs),
-        rejestr_io=MockRejestrIO(),
-        con=None,  # type: ignore[arg-type]
-        utils=MockUtils(),
-        web=MockWeb(),
-        nlp=MockNLP(),
-        refresh_policy=ProcessPolicy.with_default(),
-    )
+    ctx = context(ListingIO(blobs))
     scraped = KRSAlreadyScraped().process(ctx)
     pipeline = ScrapeRejestrIO()
     already = pipeline.already_scraped
@@ -177,3 +216,88 @@ def test_a_company_whose_entry_query_only_ever_failed_is_asked_again():
 def test_a_company_with_only_a_register_entry_is_not_queued_for_a_paid_query():
     """That direction is 1,642 companies and 164 PLN - a decision, not a fix."""
     assert missing_register_entries({odpis("P", "2026-07-18"): 4096}) == set()
+
+
+# ─── the listing carried between runs ─────────────────────
+
+
+def today_is(monkeypatch, day: date) -> None:
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return day
+
+    monkeypatch.setattr(scrape, "date", Today)
+
+
+def run_again(listing: ListingIO, output: pd.DataFrame) -> pd.DataFrame:
+    pipeline = KRSAlreadyScraped()
+    listing.files[pipeline.output_path()] = output.to_json(orient="records", lines=True)
+    listing.listed.clear()
+    listing.listings.clear()
+    return pipeline.process(context(listing))
+
+
+def test_a_second_run_lists_only_the_days_since(monkeypatch):
+    today_is(monkeypatch, date(2026, 7, 20))
+    listing = ListingIO(
+        {odpis("P", "2026-07-01"): 4096, odpis("S", "2026-07-19"): 4096}
+    )
+    first = KRSAlreadyScraped().process(context(listing))
+
+    listing.blobs[odpis("P", "2026-07-20")] = 4096
+    second = run_again(listing, first)
+
+    assert listing.listed == [odpis("S", "2026-07-19"), odpis("P", "2026-07-20")]
+    assert sorted(second["date"]) == ["2026-07-01", "2026-07-19", "2026-07-20"]
+    # One listing per prefix, however many days it covers.
+    assert [path.namespace_values for path in listing.listings] == [
+        {"date": "{2026-07-19,2026-07-20,2026-07-21}"}
+    ] * len(scrape.KRS_PREFIXES)
+
+
+def test_an_answer_already_read_is_not_read_again(monkeypatch):
+    today_is(monkeypatch, date(2026, 7, 20))
+    listing = ListingIO({odpis("S", "2026-07-19"): 168})
+    listing.files[odpis("S", "2026-07-19")] = json.dumps(NOT_FOUND)
+    first = KRSAlreadyScraped().process(context(listing))
+    assert list(first["not_found"]) == [True]
+
+    del listing.files[odpis("S", "2026-07-19")]
+    assert list(run_again(listing, first)["not_found"]) == [True]
+
+
+def test_a_newer_answer_replaces_the_one_read_before(monkeypatch):
+    today_is(monkeypatch, date(2026, 7, 20))
+    listing = ListingIO({odpis("S", "2026-07-19"): 168})
+    listing.files[odpis("S", "2026-07-19")] = json.dumps(NOT_FOUND)
+    first = KRSAlreadyScraped().process(context(listing))
+
+    listing.blobs[odpis("S", "2026-07-20")] = 4096
+    second = run_again(listing, first).sort_values("date")
+
+    assert list(second["not_found"]) == [False, False]
+
+
+def test_an_old_listing_is_replaced_by_a_full_one(monkeypatch):
+    today_is(monkeypatch, date(2026, 7, 20))
+    listing = ListingIO({odpis("P", "2026-01-01"): 4096})
+    first = KRSAlreadyScraped().process(context(listing))
+
+    listing.blobs[odpis("S", "2026-03-01")] = 4096
+    run_again(listing, first)
+
+    assert sorted(listing.listed) == sorted(listing.blobs)
+
+
+def test_a_listing_dated_past_tomorrow_is_replaced_by_a_full_one(monkeypatch):
+    # Listing the days from 2026-08-30 on would list nothing new until then.
+    today_is(monkeypatch, date(2026, 7, 20))
+    listing = ListingIO({odpis("P", "2026-08-30"): 4096})
+    first = KRSAlreadyScraped().process(context(listing))
+
+    listing.blobs[odpis("S", "2026-07-20")] = 4096
+    second = run_again(listing, first)
+
+    assert sorted(listing.listed) == sorted(listing.blobs)
+    assert sorted(second["date"]) == ["2026-07-20", "2026-08-30"]
@@ -10,13 +10,14 @@ import posixpath
 import typing
 from abc import ABCMeta, abstractmethod
 from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from typing import TYPE_CHECKING, Any, Callable, List, NewType, Union, overload
 
-import numpy as np
 import pandas as pd
-from dacite import Config, from_dict  # type: ignore[import-not-found]
 
 from entities.ner import NEREntities
+from scrapers.stores.batches import BATCH_SIZE
+from scrapers.stores.batches import read_batches as read_output_batches
 from scrapers.stores.file import (
     CloudStorage,
     DataRef,
@@ -25,11 +26,19 @@ from scrapers.stores.file import (
     LocalFile,
     VersionedBackup,
 )
+from scrapers.stores.manifest import changes as manifest_changes
+from scrapers.stores.manifest import code_version
+from scrapers.stores.manifest import dumps as manifest_dumps
+from scrapers.stores.manifest import parse as parse_manifest
+from scrapers.stores.parquet import column_types, write_parquet
+from scrapers.stores.rows import column_values, iterate_rows
 from stores.config import DOWNLOADED_DIR as DOWNLOADED_DIR
 from stores.config import VERSIONED_DIR as VERSIONED_DIR
 from stores.config import backup_disabled
 
 if TYPE_CHECKING:
+    import pyarrow as pa
+    import pyarrow.compute as pc
     from duckdb import DuckDBPyConnection
 
 Priority = NewType("Priority", int)
@@ -138,6 +147,32 @@ class IO(metaclass=ABCMeta):
         """Returns the modification time of the data reference if aplicable."""
         raise NotImplementedError()
 
+    def get_digest(self, fs: DataRef) -> str | None:
+        """The sha256 of a local file's bytes, None where that means nothing."""
+        return None
+
+    def read_each[R: DataRef](
+        self, refs: typing.Iterable[R]
+    ) -> typing.Iterator[tuple[R, File]]:
+        """(ref, contents) for each of `refs`, in the order given.
+
+        `read_data` on each in turn, which is all this can do; an IO that can
+        fetch the next ones while the caller works on this one overrides it.
+        Prefer it over a loop of `read_data` whenever there are many refs.
+        """
+        for ref in refs:
+            yield ref, self.read_data(ref)
+
+    def read_range(self, fs: DataRef, start: int, length: int | None) -> bytes:
+        """`length` bytes of `fs` from `start`; a negative start counts from the
+        end and a length of None reads to it.
+
+        Reads the whole file and slices it, which is all an IO that cannot seek
+        can do; the ones that can override it.
+        """
+        data = self.read_data(fs).read_bytes()
+        return data[start:] if length is None else data[start:][:length]
+
     @abstractmethod
     def get_output(self, entity_type: type) -> list[Any] | None:
         """
@@ -155,6 +190,14 @@ class IO(metaclass=ABCMeta):
         """Uploads a local file as a versioned backup for a filename."""
         raise NotImplementedError()
 
+    def fork(self) -> "IO":
+        """An IO for a pipeline running concurrently with others.
+
+        Shares clients and caches with this one, but keeps per-run state --
+        the entity dumper -- apart. Stateless implementations return self.
+        """
+        return self
+
 
 class ContextResource(metaclass=ABCMeta):
     """A client the Context only carries when some pipeline asked for it.
@@ -276,6 +319,16 @@ class LLMRequest:
     temperature: float = 0
     model: str | None = None
     enable_thinking: bool = False
+    #: Requests with the same affinity start with the same long prefix, e.g.
+    #: one article's text. They go to one server when it is not much busier
+    #: than the rest, so its prefix cache skips the shared prefill. Not part
+    #: of what the answer depends on.
+    affinity: str | None = None
+    #: Give up on the answer once the model has thought for this many
+    #: characters, rather than let a runaway <think> hold a lane until the
+    #: timeout. The response is then streamed, and an abandoned one comes back
+    #: with finish_reason "aborted".
+    max_think_chars: int | None = None
 
 
 @dataclass(frozen=True)
@@ -290,13 +343,14 @@ class LLMResponse:
     #: it hit max_tokens and the content is whatever it had said so far. That
     #: prefix parses like any other answer, so without this a truncated
     #: completion is indistinguishable from a short one - and gets cached as a
-    #: good result for ever.
+    #: good result for ever. ``"aborted"`` means the client stopped reading
+    #: at the request's ``max_think_chars``.
     finish_reason: str | None = None
 
     @property
     def truncated(self) -> bool:
         """Whether the model ran out of budget rather than finishing."""
-        return self.finish_reason == "length"
+        return self.finish_reason in ("length", "aborted")
 
 
 class LLMResponsePool(metaclass=ABCMeta):
@@ -325,6 +379,10 @@ class LLMResponsePool(metaclass=ABCMeta):
         """Return the next completed response by id."""
         raise NotImplementedError()
 
+    def stats(self) -> dict[str, float]:
+        """Live figures on the pool's traffic, e.g. tokens per second."""
+        return {}
+
 
 class LLM(ContextResource, metaclass=ABCMeta):
     """Abstract interface for OpenAI-compatible chat completion clients."""
@@ -461,6 +519,14 @@ class CrawlQueue(ContextResource, metaclass=ABCMeta):
         for uid in uids:
             self.release(uid)
 
+    def known_urls(self, since: datetime | None = None) -> typing.Iterator[str]:
+        """URLs already in the queue, added at `since` or later if given.
+
+        The crawler seeds its seen-URL filter from these, so it can skip
+        putting links the queue has. A queue that cannot list them has none.
+        """
+        return iter(())
+
     @abstractmethod
     def add_blocked_domains(self, rows: list[BlockedDomain]) -> None:
         """Add or update blocked domains.
@@ -534,6 +600,28 @@ class ProcessPolicy:
     def add_refreshed_pipeline(self, pipeline_name: str):
         self.refreshed_pipelines.add(pipeline_name)
 
+    def fingerprint_decision(self, pipeline: Any, ctx: Any) -> tuple[bool, str] | None:
+        """Whether to run a pipeline with an output, going by its manifest.
+
+        None when there is no manifest to go by, or the pipeline is excluded
+        from refreshes; the caller falls back to comparing mtimes. A source
+        that is going to run makes this a run too, for now -- whether it
+        changed anything is only known once it has, and `read_or_process`
+        asks again then.
+        """
+        if pipeline.pipeline_name in self.exclude_refresh:
+            return None
+        manifest = pipeline.read_manifest(ctx)
+        if not isinstance(manifest, dict):
+            return None
+        for dep in getattr(pipeline, "dependencies", {}).values():
+            if not dep.volatile and self.execution_decisions[dep.pipeline_name][0]:
+                return (True, f"dependency {dep.pipeline_name} refreshed")
+        changed = manifest_changes(manifest["fingerprint"], pipeline.fingerprint(ctx))
+        if changed:
+            return (True, ", ".join(changed))
+        return (False, "inputs unchanged")
+
     def build_and_print_tree(self, root_pipeline: Any, ctx: Any):
         def evaluate(pipeline) -> tuple[bool, str]:
             if pipeline.pipeline_name in self.execution_decisions:
@@ -551,6 +639,8 @@ class ProcessPolicy:
                 mtime = pipeline.output_time(ctx)
                 if mtime is None:
                     decision = (True, "missing output")
+                elif fingerprinted := self.fingerprint_decision(pipeline, ctx):
+                    decision = fingerprinted
                 else:
                     decision = (False, "up to date")
                     for dep_name, dep in getattr(pipeline, "dependencies", {}).items():
@@ -690,6 +780,13 @@ class Pipeline(typing.Generic[Output]):
         """Subclasses must return the dataclass type here for runtime instantiation."""
         raise NotImplementedError("Subclasses must define output_class")
 
+    def declared_output_class(self) -> type | None:
+        """`output_class`, or None for a pipeline that never declared one."""
+        try:
+            return self.output_class
+        except NotImplementedError:
+            return None
+
     @staticmethod
     def create(pipeline_type, nested=0):
         result = pipeline_type()
@@ -722,9 +819,9 @@ class Pipeline(typing.Generic[Output]):
 
         if self.backup_to_shared_cache and not backup_disabled():
             try:
-                return ctx.io.read_data(VersionedBackup(self.filename)).read_dataframe(
-                    self.format, dtype=self.dtype
-                )
+                return ctx.io.read_data(
+                    VersionedBackup(self.backup_name())
+                ).read_dataframe(self.format, dtype=self.dtype)
             except Exception as e:
                 print("Versioned backup read failed, continuing: ", e)
                 filenotfound = e
@@ -738,6 +835,88 @@ class Pipeline(typing.Generic[Output]):
         self_ref = LocalFile(self.output_path(), "versioned") if self.filename else None
         return ctx.io.get_mtime(self_ref) if self_ref else None
 
+    def run_arguments(self) -> dict[str, Any]:
+        """The command-line settings this pipeline's output depends on.
+
+        Part of its fingerprint, so that a run over a different dump is not
+        taken for one that already happened. Most pipelines read none.
+        """
+        return {}
+
+    def manifest_path(self) -> str:
+        assert self.filename
+        return posixpath.join(self.filename, self.filename + ".manifest.json")
+
+    def read_manifest(self, ctx: Context) -> dict[str, Any] | None:
+        """The manifest written with the current output, if it has one."""
+        if self.filename is None:
+            return None
+        try:
+            raw = ctx.io.read_data(
+                LocalFile(self.manifest_path(), "versioned")
+            ).read_string()
+        except FileNotFoundError:
+            return None
+        manifest = parse_manifest(raw)
+        if manifest is None or manifest["output_mtime"] != self.output_time(ctx):
+            return None
+        return manifest
+
+    def output_version(self, ctx: Context) -> str | None:
+        """What a reader's fingerprint records for this output.
+
+        The content hash where the manifest has it, so rewriting the same bytes
+        changes nothing downstream; the mtime otherwise.
+        """
+        manifest = self.read_manifest(ctx)
+        if manifest is not None:
+            return manifest["output"]
+        mtime = self.output_time(ctx)
+        return None if mtime is None else f"mtime:{mtime}"
+
+    def fingerprint(self, ctx: Context) -> dict[str, Any]:
+        return {
+            "code": code_version(type(self)),
+            "arguments": self.run_arguments(),
+            "sources": {
+                dep.pipeline_name: dep.output_version(ctx)
+                for dep in self.dependencies.values()
+                if not dep.volatile
+            },
+        }
+
+    def write_manifest(self, ctx: Context) -> None:
+        output = ctx.io.get_digest(LocalFile(self.output_path(), "versioned"))
+        if not isinstance(output, str):
+            # An IO that cannot hash what it wrote cannot vouch for it either;
+            # the output is judged by its mtime, as before manifests.
+            return
+        ctx.io.write_file(
+            LocalFile(self.manifest_path(), "versioned"),
+            manifest_dumps(self.fingerprint(ctx), output, self.output_time(ctx)),
+        )
+
+    def recheck_after_sources(self, ctx: Context) -> None:
+        """Skip the run after all if the sources that re-ran changed nothing.
+
+        The execution tree has to decide before anything runs, so a pipeline
+        with a source due to run is marked to run too. Here, with the sources
+        done, the fingerprint is taken again; if it matches the manifest, the
+        output is still current and the decision is taken back.
+        """
+        policy = ctx.refresh_policy
+        run, reason = policy.execution_decisions.get(self.pipeline_name, (False, ""))
+        if not run or not reason.startswith("dependency "):
+            return
+        manifest = self.read_manifest(ctx)
+        if manifest is None:
+            return
+        self.preprocess_sources(ctx, policy)
+        if manifest_changes(manifest["fingerprint"], self.fingerprint(ctx)):
+            return
+        print(f"{self.pipeline_name}: sources re-ran to the same output, not running")
+        policy.execution_decisions[self.pipeline_name] = (False, "sources unchanged")
+
     @staticmethod
     def confirm_if_big(func):
         def wrapper(self, ctx: Context):
@@ -786,6 +965,7 @@ Should I run it? (y/n) [n]",
         if not ctx.refresh_policy.tree_printed:
             ctx.refresh_policy.build_and_print_tree(self, ctx)
 
+        self.recheck_after_sources(ctx)
         should_refresh = self.should_refresh_with_logic(ctx)
         if not should_refresh and self.filename is not None:
             try:
@@ -809,7 +989,7 @@ Should I run it? (y/n) [n]",
             ):
                 try:
                     df = ctx.io.read_data(
-                        VersionedBackup(self.filename)
+                        VersionedBackup(self.backup_name())
                     ).read_dataframe(self.format, dtype=self.dtype)
                     if df is not None:
                         self._cached_result = df
@@ -831,6 +1011,8 @@ Should I run it? (y/n) [n]",
         if df is not None and self.output_path != "":
             print(f"Writing to {self.output_path()}")
             self.write_dataframe(ctx, df)
+            if self.filename is not None:
+                self.write_manifest(ctx)
 
         if df is not None:
             ctx.refresh_policy.add_refreshed_pipeline(self.pipeline_name)
@@ -866,6 +1048,8 @@ Should I run it? (y/n) [n]",
                     df.to_json(f, orient="records", lines=True)
                 case "csv":
                     df.to_csv(f, index=False)
+                case "parquet":
+                    write_parquet(df, f, self.declared_output_class(), self.dtype)
                 case _:
                     raise ValueError(f"Not supported export format - {self.format}")
 
@@ -875,7 +1059,8 @@ Should I run it? (y/n) [n]",
         if not local_only and self._shared_cache_active(
             ctx, force_upload=True
         ):
-            ctx.io.write_file(VersionedBackup(filename), writer)
+            backup = VersionedBackup(self.backup_name(filename, format))
+            ctx.io.write_file(backup, writer)
 
     def _shared_cache_active(
         self, ctx: Context, force_download: bool = False, force_upload: bool = False
@@ -915,7 +1100,7 @@ Should I run it? (y/n) [n]",
 
         dest_path = os.path.join(VERSIONED_DIR, self.output_path())
         try:
-            ctx.io.restore_backup_to_path(self.filename, dest_path)
+            ctx.io.restore_backup_to_path(self.backup_name(), dest_path)
         except Exception as e:
             print(
                 f"Restore from shared cache failed for {self.pipeline_name}, "
@@ -955,7 +1140,7 @@ Should I run it? (y/n) [n]",
             )
             return False
 
-        ctx.io.upload_backup_from_path(self.filename, src_path)
+        ctx.io.upload_backup_from_path(self.backup_name(), src_path)
         return True
 
     def read_list(self, ctx: Context) -> typing.Iterable[Output]:
@@ -965,6 +1150,31 @@ Should I run it? (y/n) [n]",
         )
         return iterate_pipeline(df, self.output_class)
 
+    def read_batches(
+        self,
+        ctx: Context,
+        columns: list[str] | None = None,
+        batch_size: int = BATCH_SIZE,
+        where: "pc.Expression | None" = None,
+    ) -> typing.Iterator["pa.RecordBatch"]:
+        """Streams the local output as typed record batches.
+
+        Only `columns` are read, and only the rows `where` keeps, so memory
+        stays at one block of the file however large the output is. See
+        `scrapers.stores.batches`. The output is not computed here: a missing
+        one is restored from the shared cache where that is on, and is a
+        FileNotFoundError otherwise.
+        """
+        path = os.path.join(VERSIONED_DIR, self.output_path())
+        if not os.path.exists(path) and not self.restore_output_from_shared_cache(
+            ctx
+        ):
+            raise FileNotFoundError(path)
+        schema = column_types(self.declared_output_class(), self.dtype)
+        return read_output_batches(
+            path, self.format, schema, columns, where, batch_size
+        )
+
     def read_or_process_list(self, ctx: Context) -> typing.Iterable[Output]:
         return iterate_pipeline(self.read_or_process(ctx), self.output_class)
 
@@ -1064,6 +1274,25 @@ Should I run it? (y/n) [n]",
             return posixpath.join(filename, filename + "." + format)
         return ""
 
+    def backup_name(
+        self, filename: str | None = None, format: Formats | None = None
+    ) -> str:
+        """The name this pipeline's output is filed under in the shared cache.
+
+        The bare filename for the text formats, which is what every backup
+        already in the bucket sits under. Parquet gets its extension on top,
+        so switching a pipeline over starts a new series rather than handing
+        the last JSONL backup to the Parquet reader.
+        """
+        if filename is None:
+            filename = self.filename
+        if format is None:
+            format = self.format
+        assert filename is not None
+        if format == "parquet":
+            return f"{filename}.parquet"
+        return filename
+
     @property
     def pipeline_name(self) -> str:
         pipeline_type = type(self)
@@ -1071,21 +1300,12 @@ Should I run it? (y/n) [n]",
 
 
 def iterate_pipeline_dict(df: pd.DataFrame):
-    df = df.replace({np.nan: None})
-    for row in df.to_dict(orient="records"):
-        records = typing.cast(dict[str, typing.Any], row)
-        yield records
+    names = list(df.columns)
+    for values in zip(*(column_values(df[name]) for name in names)):
+        yield dict(zip(names, values))
 
 
 def iterate_pipeline[T](
     df: pd.DataFrame, constructor: typing.Type
 ) -> typing.Iterable[T]:  # TODO join T and constructor
-    df = df.replace({np.nan: None})
-    for row in df.to_dict(orient="records"):
-        records = typing.cast(dict[str, typing.Any], row)
-        yield from_dict(
-            data_class=constructor,
-            data=records,
-            # TODO - I don't think we need this, try to remove it.
-            config=Config(cast=[int, float, str, bool]),
-        )
+    return iterate_rows(df, constructor)
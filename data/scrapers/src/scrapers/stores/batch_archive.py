@@ -0,0 +1,229 @@
+"""Crawl batches a reader can take one page out of.
+
+`BatchClient` packs the pages it crawls into one `uid_*.tar.gz` per host and
+day, up to about 50 MB. Written as a single gzip stream, getting any page back
+means decompressing everything before it, and in practice everything: the
+readers list the whole archive to find their member.
+
+The archives written here are still ordinary tar.gz -- `tar xzf`, `tarfile`
+and the compressed mirror read them as before -- but every tar entry is a gzip
+member of its own, and a gzip stream of several members is one stream to any
+reader that does not care. One that does finds, at the very end of the file, a
+member of fixed size (`TAIL_SIZE`) holding tar's closing blocks, whose gzip
+header carries where `index.txt` sits. `index.txt` keeps its content, the list
+of member paths, and its member's gzip header comment carries the offsets of
+every page: `{path: [offset, length, header, size]}`, the byte range of the
+page's gzip member in the file, the length of its tar header and the length of
+the page.
+
+So one page costs three ranged reads -- the tail, the index, the page -- and
+decompressing only that page. `BatchArchive` does the reading, over any
+`read_range(start, length)`; a local file and a GCS blob both have one. An
+archive written before this has no tail, and `BatchArchive.members` says so
+with None, for the caller to read it the old way.
+"""
+
+import gzip
+import json
+import struct
+import tarfile
+import typing
+import zlib
+
+RangeReader = typing.Callable[[int, int | None], bytes]
+"""`(start, length)` -> bytes. A negative start counts from the end of the
+file, and a length of None reads to the end."""
+
+# Where a page's bytes are: its gzip member's offset and length in the archive,
+# and the length of its tar header and of the page itself, once decompressed.
+Member = tuple[int, int, int, int]
+
+_MAGIC = b"\x1f\x8b"
+_FEXTRA, _FNAME, _FCOMMENT = 4, 8, 16
+_INDEX_FIELD = b"KI"
+_INDEX_FIELD_LENGTH = 32
+_TAR_END = b"\0" * (2 * tarfile.BLOCKSIZE)
+
+# The closing member: a 10-byte gzip header, the extra field (its length, then
+# the subfield's id, length and 32 hex digits), tar's two end blocks as one
+# stored deflate block and the 8-byte trailer. Stored, not compressed, so that
+# its size does not depend on the zlib that wrote it.
+TAIL_SIZE = 10 + 2 + 4 + _INDEX_FIELD_LENGTH + 5 + len(_TAR_END) + 8
+
+# Ranges closer together than this are fetched as one read; a GCS request
+# costs more than the bytes in between.
+_COALESCE_GAP = 256 << 10
+
+
+def _member(
+    body: bytes,
+    compressed: bytes,
+    flags: int = 0,
+    extra: bytes = b"",
+    comment: bytes = b"",
+) -> bytes:
+    header = struct.pack("<BBBBIBB", 0x1F, 0x8B, 8, flags, 0, 0, 255)
+    if flags & _FEXTRA:
+        header += struct.pack("<H", len(extra)) + extra
+    if flags & _FCOMMENT:
+        header += comment + b"\0"
+    trailer = struct.pack("<II", zlib.crc32(body), len(body) & 0xFFFFFFFF)
+    return header + compressed + trailer
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _tar_entry(name: str, data: bytes, mtime: int) -> tuple[bytes, int]:
+    info = tarfile.TarInfo(name=name)
+    info.size = len(data)
+    info.mtime = mtime
+    header = info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+    padding = -len(data) % tarfile.BLOCKSIZE
+    return header + data + b"\0" * padding, len(header)
+
+
+class BatchArchiveWriter:
+    """Builds a seekable crawl batch in memory, one page at a time."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._offset = 0
+        self._names: list[str] = []
+        self._members: dict[str, Member] = {}
+
+    def add(self, name: str, data: bytes, mtime: int) -> None:
+        entry, header = _tar_entry(name, data, mtime)
+        self._append(_member(entry, _deflate(entry)))
+        length = len(self._chunks[-1])
+        # A page crawled twice is in twice; the later copy is what any tar
+        # reader hands back, and so what the index points at.
+        self._names.append(name)
+        self._members[name] = (self._offset - length, length, header, len(data))
+
+    def finish(self, mtime: int) -> bytes:
+        """The archive, closed with `index.txt` and the tail."""
+        index = "".join(f"{name}\n" for name in self._names).encode("utf-8")
+        entry, _ = _tar_entry("index.txt", index, mtime)
+        # ASCII, so nothing in it can be taken for the comment's closing NUL.
+        table = json.dumps(self._members, separators=(",", ":")).encode("ascii")
+        index_offset = self._offset
+        self._append(_member(entry, _deflate(entry), _FCOMMENT, comment=table))
+
+        where = f"{index_offset:016x}{self._offset - index_offset:016x}".encode()
+        extra = _INDEX_FIELD + struct.pack("<H", len(where)) + where
+        stored = b"\x01" + struct.pack("<HH", len(_TAR_END), 0xFFFF ^ len(_TAR_END))
+        self._append(_member(_TAR_END, stored + _TAR_END, _FEXTRA, extra=extra))
+        return b"".join(self._chunks)
+
+    def _append(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+        self._offset += len(chunk)
+
+
+def _header_fields(member: bytes) -> tuple[bytes, bytes] | None:
+    """The extra field and the comment of the gzip member `member` starts."""
+    if len(member) < 10 or member[:2] != _MAGIC or member[2] != 8:
+        return None
+    flags = member[3]
+    position = 10
+    extra = comment = b""
+    if flags & _FEXTRA:
+        (length,) = struct.unpack_from("<H", member, position)
+        extra = member[position + 2 : position + 2 + length]
+        position += 2 + length
+    if flags & _FNAME:
+        position = member.index(b"\0", position) + 1
+    if flags & _FCOMMENT:
+        end = member.index(b"\0", position)
+        comment = member[position:end]
+    return extra, comment
+
+
+def _index_location(tail: bytes) -> tuple[int, int] | None:
+    fields = _header_fields(tail) if len(tail) == TAIL_SIZE else None
+    if fields is None:
+        return None
+    extra, _ = fields
+    if extra[:2] != _INDEX_FIELD or len(extra) != 4 + _INDEX_FIELD_LENGTH:
+        return None
+    try:
+        return int(extra[4:20], 16), int(extra[20:36], 16)
+    except ValueError:
+        return None
+
+
+def _coalesce(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, length in sorted(ranges):
+        if merged and start - sum(merged[-1]) <= _COALESCE_GAP:
+            first, _ = merged[-1]
+            merged[-1] = (first, max(sum(merged[-1]), start + length) - first)
+        else:
+            merged.append((start, length))
+    return merged
+
+
+class BatchArchive:
+    """Pages out of a crawl batch, read a range at a time."""
+
+    def __init__(self, read_range: RangeReader) -> None:
+        self._read_range = read_range
+        self._members: dict[str, Member] | None = None
+        self._loaded = False
+
+    @classmethod
+    def open(cls, f: typing.BinaryIO) -> "BatchArchive":
+        """Over a seekable binary file, which has to stay open while in use."""
+
+        def read_range(start: int, length: int | None) -> bytes:
+            f.seek(start, 0 if start >= 0 else 2)
+            return f.read() if length is None else f.read(length)
+
+        return cls(read_range)
+
+    def members(self) -> dict[str, Member] | None:
+        """Path -> where its page is; None for an archive with no index."""
+        if not self._loaded:
+            self._loaded = True
+            self._members = self._read_index()
+        return self._members
+
+    def _read_index(self) -> dict[str, Member] | None:
+        try:
+            location = _index_location(self._read_range(-TAIL_SIZE, None))
+        except OSError:
+            # Shorter than the tail: not one of these.
+            return None
+        if location is None:
+            return None
+        fields = _header_fields(self._read_range(*location))
+        if fields is None:
+            return None
+        _, comment = fields
+        table = json.loads(comment)
+        return {name: (o, n, h, s) for name, (o, n, h, s) in table.items()}
+
+    def pages(self, names: typing.Iterable[str]) -> typing.Iterator[tuple[str, bytes]]:
+        """(path, page) for each of `names` the archive has, in archive order.
+
+        Needs `members()` not to be None. Pages close together are fetched in
+        one read, and only one such read is held at a time.
+        """
+        members = self.members()
+        if members is None:
+            raise ValueError("the archive has no member index")
+        wanted = sorted((members[name], name) for name in set(names) if name in members)
+        ranges = _coalesce([(offset, size) for (offset, size, _, _), _ in wanted])
+        position = 0
+        for start, length in ranges:
+            chunk = self._read_range(start, length)
+            while position < len(wanted):
+                (offset, size, header, page), name = wanted[position]
+                if offset >= start + length:
+                    break
+                entry = gzip.decompress(chunk[offset - start : offset - start + size])
+                yield name, entry[header : header + page]
+                position += 1
@@ -0,0 +1,286 @@
+"""Reading a pipeline output a record batch at a time.
+
+`Pipeline.read` builds the whole output as one DataFrame, which is fine for
+most outputs and not for `article_parsed`: twenty-odd gigabytes of JSONL, most
+of it the outbound links nobody downstream looks at. What is here streams an
+output instead, as Arrow record batches of the columns asked for, with the
+rows a filter rejects dropped before they ever become Python objects. Memory is
+one block of the file, whatever the file's size.
+
+The batches are typed from the pipeline's `output_class` and `dtype`, as the
+Parquet writer types its columns. JSONL keeps no types, and old rows do not
+always match the dataclass of today -- a score written as "3" or 3.0 -- so a
+JSONL block pyarrow will not parse against the declared schema is parsed again
+a line at a time: a line that is not JSON is skipped, as the readers this
+replaced skipped it, and a value that does not fit its column's type is
+converted when it can be and null when it cannot. A column the pipeline
+declares no type for (`ld_json: Any`) comes as the JSON text of each value:
+pyarrow reads the typed columns of the block, and each line is walked over its
+top-level keys only as far as the untyped ones, so the values after them --
+in `article_parsed` the article text and the outbound links -- are not decoded.
+
+A filter is a `pyarrow.compute` expression over the columns read, so the
+columns it looks at have to be among `columns`:
+
+    parsed.read_batches(
+        ctx,
+        columns=["url", "article_content"],
+        where=pc.field("parse_status") == "ok",
+    )
+
+is an error; list `parse_status` too.
+"""
+
+import json
+import math
+import re
+import typing
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.json as pj
+
+from scrapers.stores.parquet import column_types
+
+BATCH_SIZE = 8192
+
+# How much of a JSONL file is parsed at once. A block is cut at the first line
+# end past this many bytes, so no row is ever split between two of them.
+_BLOCK_BYTES = 64 << 20
+
+_DECODER = json.JSONDecoder()
+_SPACE = re.compile(r"[ \t\n\r]*")
+
+
+def read_batches(
+    path: str,
+    format: str,
+    schema: dict[str, pa.DataType],
+    columns: list[str] | None = None,
+    where: pc.Expression | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> typing.Iterator[pa.RecordBatch]:
+    """The rows of the output at `path`, `batch_size` at most at a time."""
+    match format:
+        case "jsonl":
+            yield from _jsonl_batches(path, schema, columns, where, batch_size)
+        case "parquet":
+            dataset = ds.dataset(path, format="parquet")
+            # The filter goes to the scanner, which skips the row groups whose
+            # statistics rule them out without reading them.
+            yield from dataset.to_batches(
+                columns=columns, filter=where, batch_size=batch_size
+            )
+        case _:
+            raise ValueError(f"Not supported batch read format - {format}")
+
+
+def jsonl_batches(
+    path: str,
+    output_class: type | None,
+    columns: list[str] | None = None,
+    where: pc.Expression | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> typing.Iterator[pa.RecordBatch]:
+    """`read_batches` over a JSONL file of `output_class` rows, by path.
+
+    For readers of an output they do not declare as a source.
+    """
+    yield from _jsonl_batches(
+        path, column_types(output_class, None), columns, where, batch_size
+    )
+
+
+def _jsonl_batches(
+    path: str,
+    declared: dict[str, pa.DataType],
+    columns: list[str] | None,
+    where: pc.Expression | None,
+    batch_size: int,
+) -> typing.Iterator[pa.RecordBatch]:
+    with open(path, "rb") as f:
+        while block := f.read(_BLOCK_BYTES):
+            block += f.readline()
+            table = _parse_block(block, declared, columns)
+            if where is not None:
+                table = table.filter(where)
+            yield from table.to_batches(max_chunksize=batch_size)
+
+
+def _parse_block(
+    block: bytes, declared: dict[str, pa.DataType], columns: list[str] | None
+) -> pa.Table:
+    if columns is not None:
+        table = _parse_typed(block, declared, columns)
+        if table is not None:
+            return table
+    return _parse_lines(block, declared, columns)
+
+
+def _parse_typed(
+    block: bytes, declared: dict[str, pa.DataType], columns: list[str]
+) -> pa.Table | None:
+    """`columns` of the block, or None if some line does not fit them."""
+    typed = [c for c in columns if c in declared]
+    options = pj.ParseOptions(
+        explicit_schema=pa.schema([(c, declared[c]) for c in typed]),
+        unexpected_field_behavior="ignore",
+    )
+    try:
+        table = pj.read_json(pa.BufferReader(block), parse_options=options)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    untyped = [c for c in columns if c not in declared]
+    if not untyped:
+        return table
+    texts: dict[str, list[str | None]] = {c: [] for c in untyped}
+    for line in block.split(b"\n"):
+        if not line.strip():
+            continue
+        found = _top_level_texts(line.decode("utf-8", "replace"), set(untyped))
+        if found is None:
+            return None
+        for c in untyped:
+            texts[c].append(found.get(c))
+    if any(len(values) != table.num_rows for values in texts.values()):
+        return None
+    return pa.table(
+        {c: texts[c] if c in texts else table.column(c) for c in columns},
+        schema=pa.schema(
+            [(c, pa.string() if c in texts else declared[c]) for c in columns]
+        ),
+    )
+
+
+def _top_level_texts(line: str, keys: set[str]) -> dict[str, str | None] | None:
+    """The JSON text of `keys` in the object on `line`, None if it is not one.
+
+    Keys are read in order and stop being read once all of `keys` are found, so
+    a value after the last of them is never decoded. A null comes as None.
+    """
+    found: dict[str, str | None] = {}
+    at = _skip_space(line, 0)
+    if line[at : at + 1] != "{":
+        return None
+    at = _skip_space(line, at + 1)
+    try:
+        while len(found) < len(keys) and line[at : at + 1] == '"':
+            key, at = _DECODER.raw_decode(line, at)
+            at = _skip_space(line, at)
+            if line[at : at + 1] != ":":
+                return None
+            start = _skip_space(line, at + 1)
+            _, end = _DECODER.raw_decode(line, start)
+            if key in keys:
+                text = line[start:end]
+                found[key] = None if text == "null" else text
+            at = _skip_space(line, end)
+            if line[at : at + 1] == ",":
+                at = _skip_space(line, at + 1)
+    except ValueError:
+        return None
+    return found
+
+
+def _skip_space(line: str, at: int) -> int:
+    return _SPACE.match(line, at).end()  # type: ignore[union-attr]
+
+
+def _parse_lines(
+    block: bytes, declared: dict[str, pa.DataType], columns: list[str] | None
+) -> pa.Table:
+    """The block a line at a time, for one pyarrow will not read as typed."""
+    wanted = columns if columns is not None else list(declared)
+    rows = []
+    for line in block.splitlines():
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(row, dict):
+            rows.append(row)
+    if columns is None:
+        # Every column any row has, the declared ones first.
+        seen = dict.fromkeys(wanted)
+        for row in rows:
+            seen.update(dict.fromkeys(row))
+        wanted = list(seen)
+    return pa.table(
+        {c: _column([row.get(c) for row in rows], declared.get(c)) for c in wanted}
+    )
+
+
+def _column(values: list[typing.Any], arrow: pa.DataType | None) -> pa.Array:
+    if arrow is None:
+        return pa.array(
+            [None if v is None else json.dumps(v, ensure_ascii=False) for v in values],
+            type=pa.string(),
+        )
+    try:
+        return pa.array(values, type=arrow)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        pass
+    if arrow in _SCALAR_COERCIONS:
+        coerce = _SCALAR_COERCIONS[arrow]
+        return pa.array([coerce(v) for v in values], type=arrow)
+    # A nested column some row breaks: keep the rows that fit.
+    return pa.array([_fits(v, arrow) for v in values], type=arrow)
+
+
+def _fits(value: typing.Any, arrow: pa.DataType) -> typing.Any:
+    try:
+        pa.array([value], type=arrow)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return None
+    return value
+
+
+def _as_int(value: typing.Any) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _as_float(value: typing.Any) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _as_string(value: typing.Any) -> str | None:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _as_bool(value: typing.Any) -> bool | None:
+    return value if isinstance(value, bool) else None
+
+
+_SCALAR_COERCIONS: dict[pa.DataType, typing.Callable[[typing.Any], typing.Any]] = {
+    pa.int64(): _as_int,
+    pa.float64(): _as_float,
+    pa.string(): _as_string,
+    pa.bool_(): _as_bool,
+}
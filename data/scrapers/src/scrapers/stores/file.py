@@ -113,6 +113,11 @@ class DownloadableFile(DataRef):
     #: it: a crawl that failed is stored as a zero-byte object, and telling
     #: those apart from real ones is otherwise a download each.
     size: int | None = None
+    #: The GCS generation and last-update time (ISO-8601) the listing gave, so
+    #: a reader keeping its own copy of a listing can tell a new object from
+    #: one it has seen. None when the reference did not come from a listing.
+    generation: int | None = None
+    updated: str | None = None
 
     @property
     def filename(self) -> str:
@@ -0,0 +1,103 @@
+"""What a pipeline's output was computed from.
+
+Next to every output a pipeline writes goes `<filename>.manifest.json`, which
+records the output's sha256 and its fingerprint: the versions of the source
+outputs it read, a hash of the module the pipeline is defined in, and the
+command-line settings it declared in `run_arguments`. A later run computes the
+fingerprint again, and if it comes out the same the output stands -- however
+old it is, and whatever upstream re-ran to get there. A source that re-ran and
+wrote the same bytes leaves its readers' fingerprints as they were, so only
+what is downstream of an actual change runs again.
+
+An output with no manifest -- written before manifests existed, or restored
+from the shared cache, whose copy says nothing about the inputs -- is judged by
+modification times, as every output used to be. It gets a manifest the next
+time it is computed.
+
+The code hash covers the pipeline's own module and nothing it imports. A change
+to a helper elsewhere still needs a `--refresh`.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import types
+import typing
+
+#: The fingerprint's parts, in the order a difference is reported.
+PARTS = ("code", "arguments", "sources")
+
+Fingerprint = dict[str, typing.Any]
+
+
+def code_version(pipeline_type: type) -> str:
+    """A hash of the source of the module `pipeline_type` is defined in."""
+    module = inspect.getmodule(pipeline_type)
+    if module is None:
+        return _hash(pipeline_type.__qualname__)
+    return _module_version(module)
+
+
+@functools.cache
+def _module_version(module: types.ModuleType) -> str:
+    try:
+        return _hash(inspect.getsource(module))
+    except (OSError, TypeError):
+        # No source to read; the name is all there is to go on.
+        return _hash(module.__name__)
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _canonical(value: typing.Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def changes(recorded: Fingerprint, current: Fingerprint) -> list[str]:
+    """What differs between two fingerprints, as words for the execution tree."""
+    found = []
+    for part in PARTS:
+        was, now = recorded.get(part), current.get(part)
+        if _canonical(was) == _canonical(now):
+            continue
+        if part != "sources" or not (isinstance(was, dict) and isinstance(now, dict)):
+            found.append(f"{part} changed")
+            continue
+        for name in sorted(set(was) | set(now)):
+            if name not in was:
+                found.append(f"source {name} added")
+            elif name not in now:
+                found.append(f"source {name} removed")
+            elif was[name] != now[name]:
+                found.append(f"source {name} changed")
+    return found
+
+
+def parse(raw: typing.Any) -> dict[str, typing.Any] | None:
+    """The manifest in `raw`, None when it is not one this module wrote."""
+    try:
+        manifest = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    if not isinstance(manifest.get("fingerprint"), dict):
+        return None
+    if not isinstance(manifest.get("output"), str):
+        return None
+    return manifest
+
+
+def dumps(fingerprint: Fingerprint, output: str, output_mtime: float | None) -> str:
+    manifest = {
+        "fingerprint": fingerprint,
+        "output": output,
+        # What the output's mtime was when this was written. A file that was
+        # replaced since -- restored from the shared cache, or by hand -- no
+        # longer matches, and the manifest no longer speaks for it.
+        "output_mtime": output_mtime,
+    }
+    return json.dumps(manifest, indent=2, sort_keys=True, default=str) + "\n"
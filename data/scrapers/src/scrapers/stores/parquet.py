@@ -0,0 +1,141 @@
+"""Parquet as a pipeline output format.
+
+JSONL keeps no types, so every reader re-infers them and gets some wrong: a
+REGON of "010053589" comes back as 10053589.0 unless the pipeline pins it in
+`dtype`. Parquet stores the types it was written with. Here they come from the
+pipeline's `output_class` where it has one -- the dataclass the rows are built
+from -- then from its `dtype` pins, and only then from what pyarrow infers off
+the values.
+
+Nested columns are read back as plain lists and dicts, which is what the JSONL
+reader hands out, so a pipeline can switch formats without its readers noticing.
+"""
+
+import dataclasses
+import math
+import types
+import typing
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+_SCALARS: dict[typing.Any, pa.DataType] = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+}
+
+
+def arrow_type(annotation: typing.Any) -> pa.DataType | None:
+    """The Arrow type a dataclass field annotation maps to, None if unsure.
+
+    Optional is dropped -- every Arrow column is nullable -- and any other
+    union is left to inference, as is `Any`.
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        concrete = [a for a in args if a is not type(None)]
+        return arrow_type(concrete[0]) if len(concrete) == 1 else None
+    if origin is typing.Literal:
+        return pa.string() if all(isinstance(a, str) for a in args) else None
+    if origin in (list, set, frozenset, tuple) and args:
+        if origin is tuple and not (len(args) == 2 and args[1] is Ellipsis):
+            return None
+        inner = arrow_type(args[0])
+        return pa.list_(inner) if inner is not None else None
+    if dataclasses.is_dataclass(annotation) and isinstance(annotation, type):
+        return struct_type(annotation)
+    return _SCALARS.get(annotation)
+
+
+def struct_type(cls: type) -> pa.StructType | None:
+    hints = typing.get_type_hints(cls)
+    fields = []
+    for f in dataclasses.fields(cls):
+        field_type = arrow_type(hints[f.name])
+        if field_type is None:
+            return None
+        fields.append(pa.field(f.name, field_type))
+    return pa.struct(fields)
+
+
+def column_types(
+    output_class: type | None, dtype: dict[str, typing.Any] | None
+) -> dict[str, pa.DataType]:
+    """Column -> Arrow type, for the columns the pipeline says anything about."""
+    types_by_column: dict[str, pa.DataType] = {}
+    if output_class is not None and dataclasses.is_dataclass(output_class):
+        hints = typing.get_type_hints(output_class)
+        for f in dataclasses.fields(output_class):
+            field_type = arrow_type(hints[f.name])
+            if field_type is not None:
+                types_by_column[f.name] = field_type
+    for column, pinned in (dtype or {}).items():
+        field_type = arrow_type(pinned)
+        if field_type is not None:
+            types_by_column[column] = field_type
+    return types_by_column
+
+
+def _as_string(value: typing.Any) -> typing.Any:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        # An integer column with a gap in it is float64 by the time it gets
+        # here; "10053589.0" is not the identifier anybody wrote.
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+
+def _column(series: pd.Series, arrow: pa.DataType | None) -> pa.Array:
+    if arrow is None:
+        return pa.array(series, from_pandas=True)
+    try:
+        return pa.array(series, type=arrow, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if arrow == pa.string():
+            # What dacite's cast=[str] does on the way back in, done once here.
+            return pa.array(series.map(_as_string), type=arrow, from_pandas=True)
+        # The declared type is a promise the rows do not keep -- a list field
+        # holding a bare string, say. Store what is there rather than fail.
+        return pa.array(series, from_pandas=True)
+
+
+def to_arrow(
+    df: pd.DataFrame,
+    output_class: type | None = None,
+    dtype: dict[str, typing.Any] | None = None,
+) -> pa.Table:
+    """The frame as an Arrow table, typed from the pipeline's declarations."""
+    declared = column_types(output_class, dtype)
+    return pa.table({str(c): _column(df[c], declared.get(str(c))) for c in df.columns})
+
+
+def from_arrow(table: pa.Table) -> pd.DataFrame:
+    """The table as pandas, with nested columns as lists and dicts.
+
+    `to_pandas` would turn a list column into numpy arrays, which the code
+    written against the JSONL reader tests with `isinstance(v, list)`.
+    """
+    nested = [f.name for f in table.schema if pa.types.is_nested(f.type)]
+    df = table.drop_columns(nested).to_pandas()
+    for name in nested:
+        df[name] = pd.Series(table.column(name).to_pylist(), dtype=object)
+    return df[table.column_names]
+
+
+def write_parquet(
+    df: pd.DataFrame,
+    sink: typing.Any,
+    output_class: type | None = None,
+    dtype: dict[str, typing.Any] | None = None,
+) -> None:
+    # zstd over snappy: a little slower to write, noticeably smaller, and these
+    # files are written once a run and read by everything after.
+    pq.write_table(to_arrow(df, output_class, dtype), sink, compression="zstd")
@@ -0,0 +1,241 @@
+"""Pipeline output rows as dataclass instances.
+
+`read_or_process_list` used to hand every row of the frame to dacite, which
+reads the dataclass's annotations again for each row and walks them with
+isinstance checks -- after a `df.replace({np.nan: None})` that copied the whole
+frame first. On `person_krs` that was most of the time the KRS scrapers spent
+before their first request.
+
+Here the annotations are read once per output class and column set and turned
+into a function that zips the columns and calls the class, with each field's
+conversion written into it. The conversions are the ones
+`Config(cast=[int, float, str, bool])` made dacite do, so a row comes out the
+same: a field annotated `str` gets `str(value)`, an `int | None` one gets None
+or `int(value)`, a nested dataclass is built from its dict, a field with no
+column takes its default. What is not kept is dacite's type check on the
+result; a value the casts cannot fix still fails, in the class or in the cast.
+
+`python -m scripts.bench_rows` compares the two on `person_krs`.
+"""
+
+import dataclasses
+import enum
+import functools
+import types
+import typing
+from collections.abc import Collection, Mapping
+
+import numpy as np
+import pandas as pd
+
+# What dacite's `cast` covered: a field whose type is one of these, or derives
+# from one, is built by calling the type on the value.
+_CASTS = (int, float, str, bool)
+
+Converter = typing.Callable[[typing.Any], typing.Any]
+
+
+def column_values(series: pd.Series) -> list[typing.Any]:
+    """The column as Python values, with NaN -- and pd.NA, NaT -- as None.
+
+    `tolist` boxes to the same natives `to_dict(orient="records")` does, and
+    the gaps are patched in that list, so the frame itself is never copied.
+    """
+    values = series.tolist()
+    # A numpy int or bool column has no gaps to patch. The nullable `Int64`
+    # and `boolean` share its kind but box theirs as pd.NA.
+    if series.dtype.kind in "biu" and not isinstance(
+        series.dtype, pd.api.extensions.ExtensionDtype
+    ):
+        return values
+    for i in np.flatnonzero(series.isna().to_numpy()):
+        values[i] = None
+    return values
+
+
+def _optional(annotation: typing.Any) -> tuple[bool, typing.Any]:
+    """Whether the annotation admits None, and what it is without it."""
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = typing.get_args(annotation)
+        concrete = [a for a in args if a is not type(None)]
+        if len(concrete) < len(args):
+            if len(concrete) == 1:
+                return True, concrete[0]
+            return True, typing.Union[tuple(concrete)]
+    return False, annotation
+
+
+@functools.cache
+def converter(annotation: typing.Any) -> Converter | None:
+    """The function a field's value goes through, None when it is kept as is."""
+    optional, inner = _optional(annotation)
+    convert = _converter(inner)
+    if convert is None or not optional:
+        return convert
+    return lambda value: None if value is None else convert(value)
+
+
+def _converter(annotation: typing.Any) -> Converter | None:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if isinstance(annotation, type):
+        if dataclasses.is_dataclass(annotation):
+            build = from_mapping(annotation)
+            return lambda value: build(value) if isinstance(value, Mapping) else value
+        if issubclass(annotation, _CASTS):
+            return annotation
+        if issubclass(annotation, enum.Enum):
+            return _enum(annotation)
+        return None
+    if origin in (list, set, frozenset) and args:
+        return _collection(origin, converter(args[0]))
+    if origin is tuple and len(args) == 2 and args[1] is Ellipsis:
+        return _collection(tuple, converter(args[0]))
+    if origin is dict and len(args) == 2:
+        value_converter = converter(args[1])
+        if value_converter is None:
+            return None
+        return lambda value: (
+            {k: value_converter(v) for k, v in value.items()}
+            if isinstance(value, Mapping)
+            else value
+        )
+    # Literal, Any, a bare `dict`, a union of several types: nothing the casts
+    # would have changed.
+    return None
+
+
+def _enum(cls: type[enum.Enum]) -> Converter:
+    return lambda value: value if isinstance(value, cls) else cls(value)
+
+
+def _collection(origin: type, item: Converter | None) -> Converter:
+    def convert(value: typing.Any) -> typing.Any:
+        if isinstance(value, (str, bytes, Mapping)) or not isinstance(
+            value, Collection
+        ):
+            return value
+        if item is None:
+            return origin(value)
+        return origin(item(v) for v in value)
+
+    return convert
+
+
+def _has_default(f: dataclasses.Field) -> bool:
+    return (
+        f.default is not dataclasses.MISSING
+        or f.default_factory is not dataclasses.MISSING
+    )
+
+
+def _value(
+    i: int, annotation: typing.Any, raw: str, namespace: dict[str, typing.Any]
+) -> str:
+    """The expression converting `raw` for field number `i`."""
+    convert = converter(annotation)
+    if convert is None:
+        return raw
+    namespace[f"convert_{i}"] = convert
+    return f"convert_{i}({raw})"
+
+
+def _compile(lines: list[str], namespace: dict[str, typing.Any], cls: type):
+    source = "\n".join(lines)
+    exec(compile(source, f"<rows of {cls.__qualname__}>", "exec"), namespace)
+    return namespace["build"]
+
+
+@functools.cache
+def from_mapping(cls: type) -> Converter:
+    """A function building `cls` from a dict, as dacite's `from_dict` did.
+
+    A key the dict does not have gets the field's default, or None for an
+    Optional field with no default; any other missing key is a KeyError.
+    """
+    namespace: dict[str, typing.Any] = {"cls": cls}
+    hints = typing.get_type_hints(cls)
+    arguments, assignments = [], []
+    for i, f in enumerate(dataclasses.fields(cls)):
+        key = repr(f.name)
+        value = _value(i, hints[f.name], f"d[{key}]", namespace)
+        if not f.init:
+            assignments.append(f"    if {key} in d: obj.{f.name} = {value}")
+        elif f.default is not dataclasses.MISSING:
+            namespace[f"default_{i}"] = f.default
+            arguments.append(f"{f.name}={value} if {key} in d else default_{i}")
+        elif f.default_factory is not dataclasses.MISSING:
+            namespace[f"factory_{i}"] = f.default_factory
+            arguments.append(f"{f.name}={value} if {key} in d else factory_{i}()")
+        elif _optional(hints[f.name])[0]:
+            value = _value(i, hints[f.name], f"d.get({key})", namespace)
+            arguments.append(f"{f.name}={value}")
+        else:
+            arguments.append(f"{f.name}={value}")
+    return _compile(
+        [
+            "def build(d):",
+            f"    obj = cls({', '.join(arguments)})",
+            *assignments,
+            "    return obj",
+        ],
+        namespace,
+        cls,
+    )
+
+
+@functools.cache
+def from_columns(
+    cls: type, columns: tuple[str, ...]
+) -> tuple[list[str], typing.Callable[..., typing.Iterator[typing.Any]]]:
+    """The columns `cls` reads, and a generator of instances over their values.
+
+    Columns the class has no field for are never touched. A field with no
+    column is filled as `from_mapping` fills a missing key, except that a
+    required one fails here, once, rather than on every row.
+    """
+    namespace: dict[str, typing.Any] = {"cls": cls}
+    hints = typing.get_type_hints(cls)
+    read: list[str] = []
+    arguments, assignments = [], []
+    for i, f in enumerate(dataclasses.fields(cls)):
+        if f.name not in columns:
+            if not f.init or _has_default(f):
+                continue
+            if not _optional(hints[f.name])[0]:
+                raise ValueError(
+                    f"{cls.__name__}.{f.name} has no column and no default"
+                )
+            arguments.append(f"{f.name}=None")
+            continue
+        value = _value(i, hints[f.name], f"v{len(read)}", namespace)
+        read.append(f.name)
+        if f.init:
+            arguments.append(f"{f.name}={value}")
+        else:
+            assignments.append(f"        obj.{f.name} = {value}")
+    values = ", ".join(f"v{j}" for j in range(len(read)))
+    params = ", ".join(f"c{j}" for j in range(len(read)))
+    build = _compile(
+        [
+            f"def build(count, {params}):",
+            f"    for {values}, in zip({params}):"
+            if read
+            else "    for _ in range(count):",
+            f"        obj = cls({', '.join(arguments)})",
+            *assignments,
+            "        yield obj",
+        ],
+        namespace,
+        cls,
+    )
+    return read, build
+
+
+def iterate_rows(df: pd.DataFrame, cls: type) -> typing.Iterator[typing.Any]:
+    """The frame's rows as `cls` instances, in order."""
+    if len(df) == 0:
+        return iter(())
+    columns = tuple(c for c in df.columns if isinstance(c, str))
+    read, build = from_columns(cls, columns)
+    return build(len(df), *(column_values(df[name]) for name in read))
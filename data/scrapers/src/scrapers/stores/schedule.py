@@ -0,0 +1,137 @@
+"""Runs several pipelines at once, each as soon as its sources are ready.
+
+`Pipeline.read_or_process` walks its sources depth first, one after another,
+so a run of everything waits for the KRS, wiki, PKW and article branches in
+turn even though none of them reads the others. The scheduler here builds the
+same graph `required_resources` walks -- the annotated sources -- and hands
+every pipeline whose sources have finished to a worker thread, so the run takes
+as long as its longest chain rather than the sum of its branches.
+
+Threads, not processes: the pipelines share the Context, the refresh policy
+and each other's cached results, none of which survive a pickle, and the time
+they take goes to pandas, DuckDB and the network, which all release the GIL.
+"""
+
+import dataclasses
+import threading
+import typing
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from scrapers.stores import Context, Pipeline
+
+
+def share_sources(roots: typing.Iterable[Pipeline]) -> dict[str, Pipeline]:
+    """Make every pipeline type in the graph a single instance.
+
+    `Pipeline.create` builds a fresh copy of a source for each pipeline that
+    reads it, so PeopleMerged under four parents is four objects, each loading
+    the output on its own. Run in parallel that would also be four concurrent
+    runs of it. Returns the instances by pipeline name.
+    """
+    shared: dict[str, Pipeline] = {}
+
+    def visit(pipeline: Pipeline) -> Pipeline:
+        if pipeline.pipeline_name in shared:
+            return shared[pipeline.pipeline_name]
+        shared[pipeline.pipeline_name] = pipeline
+        for annotation, dep in list(pipeline.dependencies.items()):
+            dep = visit(dep)
+            pipeline.dependencies[annotation] = dep
+            pipeline.__dict__[annotation] = dep
+        return pipeline
+
+    for root in roots:
+        visit(root)
+    return shared
+
+
+def _to_run(roots: list[Pipeline], ctx: Context) -> dict[str, Pipeline]:
+    """The pipelines a run of `roots` touches, by name.
+
+    Mirrors the laziness of the serial path: a source is only read if
+    something that reads it is going to run, so an up-to-date root costs one
+    read and none of its sources.
+    """
+    decisions = ctx.refresh_policy.execution_decisions
+    selected: dict[str, Pipeline] = {}
+
+    def visit(pipeline: Pipeline) -> None:
+        if pipeline.pipeline_name in selected:
+            return
+        selected[pipeline.pipeline_name] = pipeline
+        run, _ = decisions.get(pipeline.pipeline_name, (False, ""))
+        if run:
+            for dep in pipeline.dependencies.values():
+                visit(dep)
+
+    for root in roots:
+        visit(root)
+    return selected
+
+
+def worker_context(ctx: Context) -> Context:
+    """A Context one pipeline can use while others run beside it.
+
+    A DuckDB connection is not safe to share between threads, but a cursor
+    off it is its own connection to the same database, so the tables one
+    pipeline creates are still there for the next. The IO gets its own dumper
+    through `IO.fork`, so entities written by one pipeline are not flushed
+    under another's name.
+    """
+    return dataclasses.replace(
+        ctx,
+        io=ctx.io.fork(),
+        con=ctx.con.cursor() if ctx.con is not None else ctx.con,
+    )
+
+
+def run_pipelines(
+    ctx: Context, pipeline_types: typing.Iterable[type[Pipeline]], jobs: int
+) -> dict[str, pd.DataFrame]:
+    """Bring each of `pipeline_types` up to date, `jobs` pipelines at a time.
+
+    Returns each requested pipeline's output by name. The first failure stops
+    the run: nothing new is started, the pipelines already running finish,
+    and the exception is raised.
+    """
+    roots = [Pipeline.create(p_type) for p_type in pipeline_types]
+    share_sources(roots)
+    # Decided up front and from one thread: build_and_print_tree fills in
+    # execution_decisions, which every worker reads.
+    for root in roots:
+        ctx.refresh_policy.build_and_print_tree(root, ctx)
+
+    pending = _to_run(roots, ctx)
+    waiting_on = {
+        name: {d.pipeline_name for d in p.dependencies.values()} & pending.keys()
+        for name, p in pending.items()
+    }
+    done: set[str] = set()
+    running: dict[Future, str] = {}
+    local = threading.local()
+
+    def run(pipeline: Pipeline) -> None:
+        if not hasattr(local, "ctx"):
+            local.ctx = worker_context(ctx)
+        pipeline.read_or_process(local.ctx)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            ready = [n for n in pending if not waiting_on[n] - done]
+            for name in sorted(ready):
+                print(f"Scheduling {name}")
+                running[executor.submit(run, pending.pop(name))] = name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    print(f"Pipeline {name} failed, not starting any more")
+                    pending.clear()
+                    wait(running)
+                    raise typing.cast(BaseException, future.exception())
+                done.add(name)
+
+    return {root.pipeline_name: root.read_or_process(ctx) for root in roots}
@@ -0,0 +1,102 @@
+import io
+import tarfile
+
+import pytest
+
+from scrapers.stores.batch_archive import TAIL_SIZE, BatchArchive, BatchArchiveWriter
+
+PAGES = {
+    "www.example.pl/index": b"<html>start</html>",
+    "www.example.pl/artykuł": b"<html>" + b"tekst " * 5000 + b"</html>",
+    "www.example.pl/" + "długa-ścieżka/" * 20 + "koniec": b"<html>long</html>",
+    "www.example.pl/pusta": b"",
+}
+
+
+def archive_bytes(pages: dict[str, bytes]) -> bytes:
+    writer = BatchArchiveWriter()
+    for name, html in pages.items():
+        writer.add(name, html, mtime=1_750_000_000)
+    return writer.finish(mtime=1_750_000_000)
+
+
+class Ranges:
+    """A `read_range` over bytes that counts what it was asked for."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.reads: list[tuple[int, int | None]] = []
+        self.bytes_read = 0
+
+    def __call__(self, start: int, length: int | None) -> bytes:
+        self.reads.append((start, length))
+        tail = self.data[start:]
+        chunk = tail if length is None else tail[:length]
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def test_any_tar_reader_still_reads_it():
+    data = archive_bytes(PAGES)
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        assert tar.getnames() == [*PAGES, "index.txt"]
+        for name, html in PAGES.items():
+            extracted = tar.extractfile(name)
+            assert extracted is not None and extracted.read() == html
+        index = tar.extractfile("index.txt")
+        assert index is not None
+        assert index.read().decode() == "".join(f"{n}\n" for n in PAGES)
+
+
+def test_one_page_is_read_without_the_rest():
+    big = {f"www.example.pl/{i}": bytes(range(256)) * 400 for i in range(200)}
+    data = archive_bytes(big)
+    ranges = Ranges(data)
+    archive = BatchArchive(ranges)
+
+    assert dict(archive.pages(["www.example.pl/150"])) == {
+        "www.example.pl/150": big["www.example.pl/150"]
+    }
+    # The tail, the index and the page.
+    assert len(ranges.reads) == 3
+    assert ranges.reads[0] == (-TAIL_SIZE, None)
+    assert ranges.bytes_read < len(data) / 10
+
+
+def test_pages_come_in_archive_order_and_skip_the_unknown():
+    archive = BatchArchive(Ranges(archive_bytes(PAGES)))
+    names = [*reversed(PAGES), "www.example.pl/nie-ma"]
+    assert list(archive.pages(names)) == list(PAGES.items())
+
+
+def test_the_later_copy_of_a_page_wins():
+    writer = BatchArchiveWriter()
+    writer.add("a.pl/x", b"old", mtime=1)
+    writer.add("a.pl/x", b"new", mtime=2)
+    data = writer.finish(mtime=3)
+
+    assert dict(BatchArchive(Ranges(data)).pages(["a.pl/x"])) == {"a.pl/x": b"new"}
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        extracted = tar.extractfile("a.pl/x")
+        assert extracted is not None and extracted.read() == b"new"
+
+
+def test_a_local_file_is_read_by_seeking(tmp_path):
+    path = tmp_path / "uid_1.tar.gz"
+    path.write_bytes(archive_bytes(PAGES))
+    with path.open("rb") as f:
+        pages = dict(BatchArchive.open(f).pages(PAGES))
+    assert pages == PAGES
+
+
+@pytest.mark.parametrize("size", [0, 10, 5000])
+def test_an_archive_without_the_index_says_so(size):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        info = tarfile.TarInfo("a.pl/x")
+        info.size = size
+        tar.addfile(info, io.BytesIO(b"x" * size))
+    archive = BatchArchive(Ranges(buf.getvalue()))
+    assert archive.members() is None
+    with pytest.raises(ValueError):
+        list(archive.pages(["a.pl/x"]))
@@ -0,0 +1,139 @@
+import dataclasses
+import json
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+
+from scrapers import stores
+from scrapers.stores import Pipeline, batches
+from scrapers.stores.batches import jsonl_batches, read_batches
+from scrapers.stores.parquet import write_parquet
+from scrapers.tests.mocks import get_test_context
+
+
+@dataclasses.dataclass
+class Score:
+    url: str
+    status: str
+    score: int | None = None
+    tags: list[str] = dataclasses.field(default_factory=list)
+    extra: Any = None
+
+
+ROWS = [
+    {"url": "a.pl/1", "status": "ok", "score": 3, "tags": ["x"], "extra": {"k": 1}},
+    {"url": "a.pl/2", "status": "error", "score": 5, "tags": [], "extra": None},
+    {"url": "a.pl/3", "status": "ok", "tags": ["y", "z"], "extra": [1, 2]},
+]
+
+
+def write_jsonl(path, rows, tail: str = "") -> str:
+    path.write_text(
+        "".join(json.dumps(row) + "\n" for row in rows) + tail, encoding="utf-8"
+    )
+    return str(path)
+
+
+def rows_of(found) -> list[dict[str, Any]]:
+    return [row for batch in found for row in batch.to_pylist()]
+
+
+def test_projects_filters_and_types(tmp_path):
+    found = list(
+        jsonl_batches(
+            write_jsonl(tmp_path / "s.jsonl", ROWS),
+            Score,
+            columns=["url", "status", "score"],
+            where=pc.field("status") == "ok",
+        )
+    )
+    assert found[0].schema == pa.schema(
+        [("url", pa.string()), ("status", pa.string()), ("score", pa.int64())]
+    )
+    assert rows_of(found) == [
+        {"url": "a.pl/1", "status": "ok", "score": 3},
+        {"url": "a.pl/3", "status": "ok", "score": None},
+    ]
+
+
+def test_rows_that_break_the_schema_are_converted_or_dropped(tmp_path):
+    legacy = [
+        {"url": "b.pl/1", "status": "ok", "score": "4"},
+        {"url": "b.pl/2", "status": "ok", "score": 2.0},
+        {"url": "b.pl/3", "status": "ok", "score": "many"},
+    ]
+    path = write_jsonl(tmp_path / "s.jsonl", legacy, tail="{not json\n\n")
+    found = jsonl_batches(path, Score, columns=["url", "score"])
+    assert rows_of(found) == [
+        {"url": "b.pl/1", "score": 4},
+        {"url": "b.pl/2", "score": 2},
+        {"url": "b.pl/3", "score": None},
+    ]
+
+
+def test_undeclared_columns_come_as_json_text(tmp_path):
+    path = write_jsonl(tmp_path / "s.jsonl", ROWS)
+    found = rows_of(jsonl_batches(path, Score, columns=["extra"]))
+    assert [row["extra"] for row in found] == ['{"k": 1}', None, "[1, 2]"]
+
+
+def test_blocks_never_split_a_row(tmp_path, monkeypatch):
+    monkeypatch.setattr(batches, "_BLOCK_BYTES", 50)
+    rows = [{"url": f"c.pl/{i}", "status": "ok", "score": i} for i in range(40)]
+    found = list(
+        jsonl_batches(
+            write_jsonl(tmp_path / "s.jsonl", rows),
+            Score,
+            columns=["url", "score"],
+            batch_size=3,
+        )
+    )
+    assert len(found) > 10
+    assert all(batch.num_rows <= 3 for batch in found)
+    assert [row["score"] for row in rows_of(found)] == list(range(40))
+
+
+def test_parquet_pushes_the_filter_down(tmp_path):
+    path = str(tmp_path / "s.parquet")
+    frame = pd.DataFrame.from_records(ROWS).drop(columns="extra")
+    write_parquet(frame, path, Score)
+    found = read_batches(
+        path,
+        "parquet",
+        {},
+        columns=["url", "tags"],
+        where=pc.field("status") == "ok",
+    )
+    assert rows_of(found) == [
+        {"url": "a.pl/1", "tags": ["x"]},
+        {"url": "a.pl/3", "tags": ["y", "z"]},
+    ]
+
+
+class ScorePipeline(Pipeline[Score]):
+    filename = "batch_scores"
+
+    @property
+    def output_class(self):
+        return Score
+
+    def process(self, ctx):
+        return pd.DataFrame.from_records(ROWS)
+
+
+def test_pipeline_reads_its_local_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(stores, "VERSIONED_DIR", str(tmp_path))
+    pipeline = Pipeline.create(ScorePipeline)
+    ctx = get_test_context()
+    with pytest.raises(FileNotFoundError):
+        pipeline.read_batches(ctx)
+
+    (tmp_path / "batch_scores").mkdir()
+    write_jsonl(tmp_path / "batch_scores" / "batch_scores.jsonl", ROWS)
+    found = pipeline.read_batches(
+        ctx, columns=["url", "score"], where=pc.field("score") > 4
+    )
+    assert rows_of(found) == [{"url": "a.pl/2", "score": 5}]
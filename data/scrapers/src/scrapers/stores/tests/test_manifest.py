@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from scrapers.stores import Context, Pipeline, ProcessPolicy
+from scrapers.stores.manifest import changes
+from scrapers.tests.mocks import MockFile, get_test_context
+
+runs: list[str] = []
+settings = {"source": [1, 2], "dump": "shard1"}
+
+
+class Source(Pipeline):
+    filename = "manifest_source"
+
+    def process(self, ctx: Context):
+        runs.append(self.pipeline_name)
+        return pd.DataFrame({"v": settings["source"]})
+
+
+class Sink(Pipeline):
+    filename = "manifest_sink"
+    source: Source
+
+    def process(self, ctx: Context):
+        runs.append(self.pipeline_name)
+        return self.source.read_or_process(ctx).assign(w=1)
+
+
+class Tuned(Pipeline):
+    filename = "manifest_tuned"
+
+    def run_arguments(self):
+        return {"dump": settings["dump"]}
+
+    def process(self, ctx: Context):
+        runs.append(self.pipeline_name)
+        return pd.DataFrame({"dump": [settings["dump"]]})
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    runs.clear()
+    settings.update(source=[1, 2], dump="shard1")
+
+
+def run(ctx: Context, pipeline_type: type, refresh: list[str] = []) -> ProcessPolicy:
+    """One `koryta` invocation: a fresh policy and fresh pipeline instances."""
+    ctx.refresh_policy = ProcessPolicy.with_default(refresh)
+    Pipeline.create(pipeline_type).read_or_process(ctx)
+    return ctx.refresh_policy
+
+
+@pytest.fixture
+def ctx():
+    ctx = get_test_context()
+    run(ctx, Sink)
+    assert runs == ["Source", "Sink"]
+    runs.clear()
+    return ctx
+
+
+def test_unchanged_inputs_run_nothing(ctx):
+    policy = run(ctx, Sink)
+    assert runs == []
+    assert policy.execution_decisions["Sink"] == (False, "inputs unchanged")
+
+
+def test_a_source_that_reruns_to_the_same_output_stops_there(ctx):
+    policy = run(ctx, Sink, refresh=["Source"])
+    assert runs == ["Source"]
+    assert policy.execution_decisions["Sink"] == (False, "sources unchanged")
+
+
+def test_a_source_that_changed_reruns_what_reads_it(ctx):
+    settings["source"] = [1, 2, 3]
+    run(ctx, Sink, refresh=["Source"])
+    assert runs == ["Source", "Sink"]
+
+    runs.clear()
+    run(ctx, Sink)
+    assert runs == []
+
+
+def test_changed_arguments_rerun_the_pipeline():
+    ctx = get_test_context()
+    run(ctx, Tuned)
+    settings["dump"] = "full"
+    policy = run(ctx, Tuned)
+    assert runs == ["Tuned", "Tuned"]
+    assert policy.execution_decisions["Tuned"] == (True, "arguments changed")
+
+
+def test_a_replaced_output_has_no_manifest(ctx):
+    sink = Pipeline.create(Sink)
+    assert sink.read_manifest(ctx) is not None
+    # Restored from the shared cache, say: same name, another file.
+    ctx.io.files[sink.output_path()] = MockFile("{}\n", mtime=5.0)
+    assert sink.read_manifest(ctx) is None
+    assert sink.output_version(ctx) == "mtime:5.0"
+
+
+def test_changes_name_the_source_that_moved():
+    recorded = {"code": "a", "arguments": {}, "sources": {"A": "1", "B": "2"}}
+    current = {"code": "b", "arguments": {}, "sources": {"A": "1", "C": "3"}}
+    assert changes(recorded, current) == [
+        "code changed",
+        "source B removed",
+        "source C added",
+    ]
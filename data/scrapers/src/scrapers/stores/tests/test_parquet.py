@@ -0,0 +1,98 @@
+import dataclasses
+import io
+from typing import Literal
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scrapers.stores import Pipeline
+from scrapers.stores.file import LocalFile, VersionedBackup
+from scrapers.stores.parquet import arrow_type, from_arrow, to_arrow, write_parquet
+from scrapers.tests.mocks import get_test_context
+
+
+@dataclasses.dataclass
+class Source:
+    source: Literal["wiki", "rejestr-io"]
+    reason: str | None = None
+
+
+@dataclasses.dataclass
+class Row:
+    krs: str
+    employees: int | None = None
+    sources: list[Source] = dataclasses.field(default_factory=list)
+
+
+class RowPipeline(Pipeline[Row]):
+    filename = "parquet_rows"
+    format = "parquet"
+
+    @property
+    def output_class(self):
+        return Row
+
+    def process(self, ctx):
+        return pd.DataFrame.from_records(
+            [
+                dataclasses.asdict(Row("0000012143", 12, [Source("wiki")])),
+                dataclasses.asdict(Row("0000888730")),
+            ]
+        )
+
+
+def roundtrip(df: pd.DataFrame, output_class=None, dtype=None) -> pd.DataFrame:
+    buffer = io.BytesIO()
+    write_parquet(df, buffer, output_class, dtype)
+    buffer.seek(0)
+    return from_arrow(pq.read_table(buffer))
+
+
+def test_field_annotations_map_to_arrow_types():
+    assert arrow_type(str | None) == pa.string()
+    assert arrow_type(list[str]) == pa.list_(pa.string())
+    assert arrow_type(Literal["wiki", "rejestr-io"]) == pa.string()
+    assert arrow_type(Source) == pa.struct(
+        [pa.field("source", pa.string()), pa.field("reason", pa.string())]
+    )
+    assert arrow_type(int | str) is None
+
+
+def test_identifiers_keep_their_leading_zeros():
+    df = pd.DataFrame({"krs": ["0000012143", None], "regon": [10053589, None]})
+    back = roundtrip(df, dtype={"regon": str})
+    assert back["krs"][0] == "0000012143"
+    assert back["krs"].isna()[1]
+    assert back["regon"][0] == "10053589"
+
+
+def test_an_optional_int_survives_missing_values():
+    table = to_arrow(pd.DataFrame({"employees": [3.0, None]}), Row)
+    assert table.schema.field("employees").type == pa.int64()
+
+
+def test_nested_columns_come_back_as_lists_of_dicts():
+    df = pd.DataFrame({"krs": ["1"], "sources": [[{"source": "wiki"}]]})
+    back = roundtrip(df, Row)
+    assert back["sources"][0] == [{"source": "wiki", "reason": None}]
+    assert isinstance(back["sources"][0], list)
+
+
+def test_pipeline_writes_and_reads_parquet():
+    ctx = get_test_context()
+    pipeline = Pipeline.create(RowPipeline)
+    written = pipeline.read_or_process(ctx)
+
+    local = ctx.io.read_data(
+        LocalFile("parquet_rows/parquet_rows.parquet", "versioned")
+    ).read_dataframe("parquet")
+    assert list(local["krs"]) == list(written["krs"])
+    assert local["sources"][1] == []
+
+
+def test_parquet_backups_do_not_share_a_name_with_jsonl_ones():
+    pipeline = Pipeline.create(RowPipeline)
+    assert pipeline.backup_name() == "parquet_rows.parquet"
+    assert pipeline.backup_name(format="jsonl") == "parquet_rows"
+    assert VersionedBackup(pipeline.backup_name()).filename.endswith(".parquet")
@@ -0,0 +1,140 @@
+import dataclasses
+import enum
+from typing import Any, Literal
+
+import numpy as np
+import pandas as pd
+import pytest
+from dacite import Config, from_dict  # type: ignore[import-not-found]
+
+from entities.person import KRS as KrsPerson
+from scrapers.stores import iterate_pipeline, iterate_pipeline_dict
+from scrapers.stores.rows import column_values, from_columns
+
+
+@dataclasses.dataclass
+class Source:
+    source: Literal["wiki", "rejestr-io"]
+    reason: str | None = None
+
+
+class Kind(enum.Enum):
+    PERSON = "person"
+
+
+@dataclasses.dataclass
+class Row:
+    krs: str
+    employees: int | None
+    share: float | None = None
+    public: bool = False
+    sources: list[Source] = dataclasses.field(default_factory=list)
+    tags: set[str] = dataclasses.field(default_factory=set)
+    owner: Source | None = None
+    extra: dict[str, Any] = dataclasses.field(default_factory=dict)
+    kinds: list[Kind] = dataclasses.field(default_factory=list)
+    counted: int = dataclasses.field(default=0, init=False)
+
+
+def with_dacite(df: pd.DataFrame, cls: type) -> list:
+    """What `iterate_pipeline` did before it stopped using dacite."""
+    return [
+        from_dict(cls, row, Config(cast=[int, float, str, bool]))
+        for row in df.replace({np.nan: None}).to_dict(orient="records")
+    ]
+
+
+def test_rows_match_what_dacite_built():
+    df = pd.DataFrame(
+        {
+            "krs": ["0000012143", 888730, None],
+            "employees": [3.0, np.nan, 12.0],
+            "share": [0.5, None, 1],
+            "public": [True, False, 1],
+            "sources": [[{"source": "wiki"}], [], [{"source": "rejestr-io"}]],
+            "owner": [None, {"source": "wiki", "reason": "x"}, None],
+            "extra": [{"a": 1}, {}, {"b": [2]}],
+            "unused": ["ignored", "ignored", "ignored"],
+        }
+    )
+    assert list(iterate_pipeline(df, Row)) == with_dacite(df, Row)
+
+
+def test_krs_people_match_what_dacite_built():
+    df = pd.DataFrame(
+        {
+            "id": [123, 456],
+            "first_name": ["Jan", "Anna"],
+            "last_name": ["Kowalski", "Nowak"],
+            "full_name": ["Jan Kowalski", "Anna Nowak"],
+            "employed_krs": ["0000012143", "0000888730"],
+            "employed_start": ["2020-01-01", None],
+            "employed_end": [None, None],
+            "employed_for": [None, "12"],
+            "birth_date": [np.nan, "1970-01-01"],
+        }
+    )
+    assert list(iterate_pipeline(df, KrsPerson)) == with_dacite(df, KrsPerson)
+
+
+def test_missing_values_become_none_without_touching_the_frame():
+    df = pd.DataFrame({"x": [1.0, np.nan], "y": pd.array(["a", None], dtype="str")})
+    assert column_values(df["x"]) == [1.0, None]
+    assert column_values(df["y"]) == ["a", None]
+    assert np.isnan(df["x"][1])
+
+
+def test_nullable_int_and_bool_columns_have_none_for_their_gaps():
+    df = pd.DataFrame(
+        {
+            "n": pd.array([1, None], dtype="Int64"),
+            "b": pd.array([True, None], dtype="boolean"),
+            "plain": [1, 2],
+        }
+    )
+    assert column_values(df["n"]) == [1, None]
+    assert column_values(df["b"]) == [True, None]
+    assert column_values(df["plain"]) == [1, 2]
+
+
+def test_non_init_fields_are_set_after_construction():
+    df = pd.DataFrame({"krs": ["1"], "employees": [None], "counted": [4]})
+    (row,) = iterate_pipeline(df, Row)
+    assert row.counted == 4
+
+
+def test_sets_read_back_from_lists_are_sets():
+    # JSONL and Parquet both store a set as a list, which dacite refused.
+    df = pd.DataFrame({"krs": ["1"], "employees": [None], "tags": [["a", "a"]]})
+    (row,) = iterate_pipeline(df, Row)
+    assert row.tags == {"a"}
+
+
+def test_enums_are_built_from_their_values():
+    df = pd.DataFrame({"krs": ["1"], "employees": [None], "kinds": [["person"]]})
+    (row,) = iterate_pipeline(df, Row)
+    assert row.kinds == [Kind.PERSON]
+
+
+def test_optional_field_without_a_column_is_none():
+    (row,) = iterate_pipeline(pd.DataFrame({"krs": ["1"]}), Row)
+    assert row.employees is None
+
+
+def test_required_field_without_a_column_fails_once():
+    with pytest.raises(ValueError, match="Row.krs"):
+        list(iterate_pipeline(pd.DataFrame({"employees": [1]}), Row))
+    assert list(iterate_pipeline(pd.DataFrame({"employees": []}), Row)) == []
+
+
+def test_constructor_is_compiled_once_per_column_set():
+    columns = ("krs", "employees")
+    assert from_columns(Row, columns) is from_columns(Row, columns)
+
+
+def test_dict_rows_have_none_for_missing_values():
+    df = pd.DataFrame({"a": [1.0, np.nan], "b": ["x", None]})
+    assert list(iterate_pipeline_dict(df)) == [
+        {"a": 1.0, "b": "x"},
+        {"a": None, "b": None},
+    ]
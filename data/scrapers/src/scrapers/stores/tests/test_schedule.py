@@ -0,0 +1,84 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from scrapers.stores import Context, Pipeline
+from scrapers.stores.schedule import run_pipelines, share_sources
+from scrapers.tests.mocks import get_test_context
+
+# Both branches wait here, so a run that does them one at a time times out.
+both_branches = threading.Barrier(2, timeout=5)
+runs: list[str] = []
+
+
+class Shared(Pipeline):
+    filename = "schedule_shared"
+
+    def process(self, ctx: Context):
+        runs.append(self.pipeline_name)
+        return pd.DataFrame({"shared": [1]})
+
+
+class Left(Pipeline):
+    filename = "schedule_left"
+    shared: Shared
+
+    def process(self, ctx: Context):
+        both_branches.wait()
+        return self.shared.read_or_process(ctx).assign(side="left")
+
+
+class Right(Pipeline):
+    filename = "schedule_right"
+    shared: Shared
+
+    def process(self, ctx: Context):
+        both_branches.wait()
+        return self.shared.read_or_process(ctx).assign(side="right")
+
+
+class Fails(Pipeline):
+    filename = "schedule_fails"
+
+    def process(self, ctx: Context):
+        raise RuntimeError("broken source")
+
+
+class ReadsFails(Pipeline):
+    filename = "schedule_reads_fails"
+    fails: Fails
+
+    def process(self, ctx: Context):
+        runs.append(self.pipeline_name)
+        return self.fails.read_or_process(ctx)
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    runs.clear()
+    both_branches.reset()
+
+
+def test_independent_branches_run_at_the_same_time():
+    results = run_pipelines(get_test_context(), [Left, Right], jobs=2)
+    assert list(results["Left"]["side"]) == ["left"]
+    assert list(results["Right"]["side"]) == ["right"]
+
+
+def test_a_source_read_by_two_pipelines_runs_once():
+    run_pipelines(get_test_context(), [Left, Right], jobs=2)
+    assert runs == ["Shared"]
+
+
+def test_sources_become_one_instance():
+    left, right = Pipeline.create(Left), Pipeline.create(Right)
+    shared = share_sources([left, right])
+    assert left.shared is right.shared is shared["Shared"]
+    assert left.dependencies["shared"] is shared["Shared"]
+
+
+def test_a_failure_stops_what_depends_on_it():
+    with pytest.raises(RuntimeError, match="broken source"):
+        run_pipelines(get_test_context(), [ReadsFails], jobs=2)
+    assert runs == []
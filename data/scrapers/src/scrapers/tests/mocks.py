@@ -1,4 +1,5 @@
 import csv
+import hashlib
 import io
 import json
 import os
@@ -9,6 +10,7 @@ from unittest.mock import MagicMock
 
 import duckdb
 import pandas as pd
+import pyarrow.parquet as pq
 
 from scrapers.stores import (
     IO,
@@ -22,6 +24,7 @@ from scrapers.stores import (
     RejestrIO,
 )
 from scrapers.stores.file import DownloadableFile
+from scrapers.stores.parquet import from_arrow
 from stores.file import FromPath
 
 nested_dict: TypeAlias = dict[str, Union[str, bytes, "nested_dict"]]
@@ -47,7 +50,8 @@ class MockFile(File):
             self._content_str = content
         else:
             self._content_bytes = content
-            self._content_str = self._content_bytes.decode("utf-8")
+            # Binary content (a Parquet file, say) has no text view.
+            self._content_str = self._content_bytes.decode("utf-8", errors="replace")
 
     def read_iterable(self) -> typing.Iterable:
         return StringIO(self._content_str)
@@ -77,6 +81,8 @@ class MockFile(File):
             return pd.DataFrame(self.read_jsonl())
         elif fmt == "csv":
             return pd.read_csv(self.read_iterable(), sep=csv_sep, dtype=dtype)  # type: ignore
+        elif fmt == "parquet":
+            return from_arrow(pq.read_table(BytesIO(self._content_bytes)))
         raise NotImplementedError(f"MockFile read_dataframe not implemented for {fmt}")
 
     def read_parquet(self):
@@ -163,6 +169,13 @@ class MockIO(IO):
                 return f.mtime
         return None
 
+    def get_digest(self, fs: DataRef) -> str | None:
+        try:
+            content = self.read_data(fs).read_bytes()
+        except FileNotFoundError:
+            return None
+        return hashlib.sha256(content).hexdigest()
+
     def get_output(self, entity_type: type) -> list[typing.Any] | None:
         return [e for e in self.output if isinstance(e, entity_type)]
 
@@ -350,6 +350,10 @@ class ProcessWiki(Pipeline[People]):
     filename = "person_wikipedia"  # TODO support two filenames
     confirm_run = True
 
+    def run_arguments(self) -> dict[str, typing.Any]:
+        # A shard and the whole dump are the same pipeline over different input.
+        return {"wiki_dump_url": wiki_dump().url}
+
     def process(self, ctx: Context):
         people, companies = scrape_wiki(ctx)
 
@@ -45,6 +45,9 @@ class ProcessWikiPeopleNames(Pipeline):
     filename = "wiki_people_names"
     confirm_run = True
 
+    def run_arguments(self) -> dict[str, str]:
+        return {"wiki_dump_url": wiki_dump().url}
+
     def process(self, ctx: Context) -> pd.DataFrame:
         person_titles = []
         with (
@@ -100,6 +103,9 @@ class ProcessWikiNer(Pipeline):
     filename = "person_wikipedia_ner"
     people_names: ProcessWikiPeopleNames
 
+    def run_arguments(self) -> dict[str, str]:
+        return {"wiki_dump_url": wiki_dump().url}
+
     def process(self, ctx: Context) -> pd.DataFrame:
         people_names_df = self.people_names.read_or_process(ctx)
         people_titles = set(people_names_df["title"])
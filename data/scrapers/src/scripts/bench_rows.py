@@ -0,0 +1,111 @@
+"""How fast `iterate_pipeline` turns `person_krs` into dataclasses, against dacite.
+
+Reads the local `versioned/person_krs` output, or makes up rows of the same
+shape when there is none, and times both ways of building `entities.person.KRS`
+from it: the compiled constructors in `scrapers.stores.rows`, and the
+`replace` + `to_dict` + `dacite.from_dict` loop they replaced. It checks that
+the two agree row for row before printing anything.
+
+    uv run python src/scripts/bench_rows.py
+    uv run python src/scripts/bench_rows.py --synthetic 500000 --repeat 5
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from dacite import Config, from_dict  # type: ignore[import-not-found]
+
+from entities.person import KRS as KrsPerson
+from scrapers.krs.list import PeopleKRS
+from scrapers.stores import iterate_pipeline
+from stores.config import VERSIONED_DIR
+
+
+def with_dacite(df: pd.DataFrame) -> list[KrsPerson]:
+    return [
+        from_dict(KrsPerson, row, Config(cast=[int, float, str, bool]))
+        for row in df.replace({np.nan: None}).to_dict(orient="records")
+    ]
+
+
+def compiled(df: pd.DataFrame) -> list[KrsPerson]:
+    return list(iterate_pipeline(df, KrsPerson))
+
+
+def synthetic(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    ids = rng.integers(1, 10**7, rows)
+    # About four in ten people have no value for the optional fields; a gap is
+    # NaN, as it is in a frame read back from JSONL.
+    present = pd.Series(rng.random(rows) >= 0.4)
+
+    def sometimes(value: str) -> pd.Series:
+        return pd.Series(value, index=present.index).where(present)
+
+    return pd.DataFrame(
+        {
+            "id": ids.astype(str),
+            "first_name": "Jan",
+            "last_name": "Kowalski",
+            "full_name": "Jan Kowalski",
+            "employed_krs": [f"{i:010d}" for i in ids % 10**6],
+            "employed_start": sometimes("2020-01-01"),
+            "employed_end": None,
+            "employed_for": sometimes("12"),
+            "employed_role": "Członek zarządu",
+            "birth_date": sometimes("1970-01-01"),
+            "second_names": None,
+            "sex": sometimes("M"),
+            "rejestrio_type": "osoba",
+        }
+    )
+
+
+def load() -> pd.DataFrame | None:
+    path = os.path.join(VERSIONED_DIR, "person_krs", "person_krs.jsonl")
+    if not os.path.exists(path):
+        return None
+    return pd.read_json(path, lines=True, dtype=PeopleKRS.dtype)
+
+
+def best_of(repeat: int, build, df: pd.DataFrame) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        metavar="ROWS",
+        help="time made-up rows instead of versioned/person_krs",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = None if args.synthetic else load()
+    if df is None:
+        rows = args.synthetic or 200_000
+        print(f"No person_krs output here; timing {rows} made-up rows.")
+        df = synthetic(rows)
+
+    if compiled(df) != with_dacite(df):
+        raise SystemExit("The two disagree on some row; not timing them.")
+
+    old = best_of(args.repeat, with_dacite, df)
+    new = best_of(args.repeat, compiled, df)
+    for name, seconds in (("dacite", old), ("compiled", new)):
+        print(f"{name:>9}: {seconds:7.3f}s  {len(df) / seconds:>12,.0f} rows/s")
+    print(f"{old / new:.1f}x faster on {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+from pathlib import Path
 from typing import Any
 
 import firebase_admin
@@ -72,6 +73,8 @@ def _llm(cfg: Config) -> OpenAICompatibleMultiPortLLM:
             request_timeout_seconds=cfg.llm_timeout_seconds,
             base_url=cfg.llm_base_url,
             api_key=cfg.llm_api_key,
+            cache_path=Path(cfg.llm_cache_path) if cfg.llm_cache_path else None,
+            cache_max_bytes=cfg.llm_cache_max_mb << 20,
         )
     )
 
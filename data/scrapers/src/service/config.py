@@ -7,6 +7,7 @@ it, rather than a 500 on the first capture someone sends.
 from __future__ import annotations
 
 import os
+import tempfile
 from dataclasses import dataclass, field
 from functools import cache
 
@@ -63,6 +64,11 @@ class Config:
 
     crawled_bucket: str = "koryta-pl-crawled"
 
+    #: Finished LLM responses, so a page captured twice costs one extraction.
+    #: On Cloud Run the disk is memory, hence the small cap; empty turns it off.
+    llm_cache_path: str = ""
+    llm_cache_max_mb: int = 64
+
     missing: tuple[str, ...] = field(default_factory=tuple)
 
     @property
@@ -101,5 +107,10 @@ def config() -> Config:
         url_store_api_key=os.environ.get("URL_STORE_API_KEY", ""),
         allow_unauthenticated=_bool("ALLOW_UNAUTHENTICATED", False),
         crawled_bucket=os.environ.get("CRAWLED_BUCKET", "koryta-pl-crawled"),
+        llm_cache_path=os.environ.get(
+            "LLM_CACHE_PATH",
+            os.path.join(tempfile.gettempdir(), "koryta-llm-cache.sqlite"),
+        ),
+        llm_cache_max_mb=_int("LLM_CACHE_MAX_MB", 64),
         missing=missing,
     )
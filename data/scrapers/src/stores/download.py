@@ -1,12 +1,14 @@
 import argparse
+import collections
+import logging
 import os
 import re
-import shutil
 import tarfile
 import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import cached_property
 from pathlib import Path
-from typing import Callable, Iterator
+from typing import Callable, Iterable, Iterator
 
 import google.cloud.storage as gcs_lib
 import requests
@@ -16,6 +18,7 @@ from entities.util import NormalizedParse
 from scrapers.stores.file import DownloadableFile as FileSourceConfig
 from scrapers.stores.file import NotInMirrorError
 from stores.config import DOWNLOADED_DIR
+from stores.mirror_index import MirrorIndex
 
 base_dir = Path(DOWNLOADED_DIR)
 
@@ -80,6 +83,65 @@ class FileSource:
             raise
 
 
+# Threads fetching at once. Below the 256 connections `_make_gcs_client` pools,
+# so the threads never queue on the pool; a blob is a few kB and the time is all
+# round trip, so this is about what fills the pipe from one machine.
+PREFETCH_WORKERS = 64
+
+# How far ahead of the caller the downloads run, in refs. Bounded, so that a
+# caller that stops early leaves at most this many fetched for nothing, and a
+# listing of 29k objects is not all in flight at once.
+_PREFETCH_AHEAD = 4 * PREFETCH_WORKERS
+
+
+def prefetch[T](refs: Iterable[T], workers: int = PREFETCH_WORKERS) -> Iterator[T]:
+    """`refs` back, in order, each `DownloadableFile` already downloaded.
+
+    Reading a crawled prefix blob by blob is one GCS round trip after another:
+    rejestr.io is 29k of them and took the better part of an hour. The
+    downloads do not depend on each other, so they run on a pool a window ahead
+    of the caller, who still gets every ref in the order given and reads it
+    from the local cache as before. A failed download raises when its ref is
+    reached, as it would have sequentially; closing the generator cancels what
+    has not started and waits for what has, so nothing is left writing after.
+
+    Anything that is not a `DownloadableFile`, or is cached already, passes
+    through untouched.
+    """
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+    pending: collections.deque[tuple[T, Future | None]] = collections.deque()
+    # The same object listed twice must not be fetched by two threads at once.
+    in_flight: dict[Path, Future] = {}
+
+    def submit(ref: T) -> Future | None:
+        if not isinstance(ref, FileSourceConfig):
+            return None
+        source = FileSource(ref)
+        if source.downloaded():
+            return None
+        path = source.downloaded_path
+        if path not in in_flight:
+            logging.info("Downloading %s", ref.url)
+            in_flight[path] = pool.submit(source.download)
+        return in_flight[path]
+
+    try:
+        for ref in refs:
+            pending.append((ref, submit(ref)))
+            if len(pending) >= _PREFETCH_AHEAD:
+                yield _settled(*pending.popleft())
+        while pending:
+            yield _settled(*pending.popleft())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _settled[T](ref: T, future: Future | None) -> T:
+    if future is not None:
+        future.result()
+    return ref
+
+
 # Wikimedia 403s the default Python-urllib agent outright, so downloads have to
 # say who they are: https://foundation.wikimedia.org/wiki/Policy:User-Agent_policy
 USER_AGENT = "koryta.pl-pipeline/1.0 (https://github.com/SzymonPajzert/koryta)"
@@ -184,7 +246,9 @@ downloads["download_teryt"] = download_teryt
 
 class CompressedMirror:
     def __init__(self) -> None:
-        self._extracted: set[str] = set()  # hosts already extracted
+        self._indexes: dict[str, MirrorIndex] = {}
+        # Hosts whose index has been checked against their archives this run.
+        self._checked: set[str] = set()
 
     @cached_property
     def args(self):
@@ -210,12 +274,12 @@ class CompressedMirror:
 
         Bulk reads only: the article path resolves single URLs through this
         same mirror with nothing to fall back on, so --no-mirror must not
-        reach ensure_extracted or get.
+        reach ensure_indexed or get.
         """
         return not self.args.no_mirror
 
-    def _extract_dir(self, host: str) -> Path:
-        return base_dir / "compressed" / host
+    def _index_dir(self, host: str) -> Path:
+        return base_dir / "compressed" / "index" / host
 
     @staticmethod
     def _pick_archives(names: list[str]) -> list[str]:
@@ -274,17 +338,14 @@ class CompressedMirror:
             raise NotInMirrorError(f"{host} has no snapshot in mirror")
         return [Path(p) for p in self._pick_archives(candidates)]
 
-    def _resolve_tar_path(self, host: str) -> Path:
-        return self._resolve_tar_paths(host)[-1]
-
     def iter_objects(self, host: str) -> Iterator[tuple[str, bytes]]:
         """Every object the mirror holds for a host, as (GCS name, contents).
 
         Names are rebuilt to match the source bucket, so callers that parse the
         object path -- which most of the KRS code does -- see what they would
-        have seen listing the bucket directly. Deliberately not routed through
-        ensure_extracted: that flattens `/` to `.` in filenames, and there is no
-        way back from that to the original path.
+        have seen listing the bucket directly. Read straight from the archives
+        rather than through the index: a whole host is one pass over them
+        either way, and this one does not need the host inflated to disk.
         """
         for tar_path in self._resolve_tar_paths(host):
             with tarfile.open(tar_path) as tf:
@@ -300,38 +361,31 @@ class CompressedMirror:
                         rel = rel[len(prefix) :]
                     yield f"hostname={host}/{rel}", handle.read()
 
-    def ensure_extracted(self, host: str) -> Path:
-        extract_dir = self._extract_dir(host)
-        if host in self._extracted or extract_dir.exists():
-            self._extracted.add(host)
-            return extract_dir
-        tar_path = self._resolve_tar_path(host)
-        extract_dir.mkdir(parents=True, exist_ok=True)
-        with tarfile.open(tar_path) as tf:
-            for member in tf.getmembers():
-                if not member.isfile() or member.name == "index.txt":
-                    continue
-                rel = member.name[len(host) + 1 :]  # strip "host/"
-                filename = rel.replace("/", ".")
-                f = tf.extractfile(member)
-                if f is not None:
-                    (extract_dir / filename).write_bytes(f.read())
-        self._extracted.add(host)
-        return extract_dir
-
-    def delete_extracted(self, host: str) -> None:
-        extract_dir = self._extract_dir(host)
-        if extract_dir.exists():
-            shutil.rmtree(extract_dir)
-        self._extracted.discard(host)
+    def ensure_indexed(self, host: str) -> MirrorIndex:
+        """The host's page index, built on first use and when its archives
+        change -- see `stores.mirror_index`."""
+        index = self._indexes.get(host)
+        if index is None:
+            index = self._indexes[host] = MirrorIndex(self._index_dir(host))
+        if host not in self._checked:
+            archives = self._resolve_tar_paths(host)
+            if not index.covers(archives):
+                print(f"Indexing the compressed mirror for {host}")
+                index.build(host, archives)
+            self._checked.add(host)
+        return index
+
+    def delete_index(self, host: str) -> None:
+        index = self._indexes.pop(host, None) or MirrorIndex(self._index_dir(host))
+        index.delete()
+        self._checked.discard(host)
 
     def get(self, url: str) -> bytes:
         parsed = NormalizedParse.parse(url)
         host = parsed.hostname_normalized
-        path = (parsed.path.strip("/") or "index").replace("/", ".")
+        path = parsed.path.strip("/") or "index"
 
-        extract_dir = self.ensure_extracted(host)
-        candidates = sorted(extract_dir.glob(f"{path}.date=*"))
-        if not candidates:
+        data = self.ensure_indexed(host).read(path)
+        if data is None:
             raise NotInMirrorError(f"URL not found in mirror: {url}")
-        return candidates[-1].read_bytes()
+        return data
@@ -7,8 +7,10 @@ from typing import Any, Literal
 from zipfile import ZipFile
 
 import pandas as pd
+import pyarrow.parquet as pq
 
 from scrapers.stores import File
+from scrapers.stores.parquet import from_arrow
 
 
 class FromBytesIO(File):
@@ -51,7 +53,7 @@ class FromBytesIO(File):
                     convert_dates=False,
                 )
         elif fmt == "parquet":
-            return pd.read_parquet(self.raw_bytes)
+            return from_arrow(pq.read_table(self.raw_bytes))
         else:
             raise NotImplementedError(f"Format {fmt} not supported for FromBytesIO")
 
@@ -90,7 +92,7 @@ class FromPath(FromBytesIO):
         self.path = path
 
     def read_parquet(self):
-        return pd.read_parquet(self.path)
+        return from_arrow(pq.read_table(self.path))
 
     def read_jsonl(self):
         with open(self.path, "r", encoding="utf-8") as f:
@@ -143,7 +145,7 @@ class FromPath(FromBytesIO):
         elif fmt == "csv":
             return pd.read_csv(self.path, sep=csv_sep)
         elif fmt == "parquet":
-            return pd.read_parquet(self.path)
+            return self.read_parquet()
 
         return super().read_dataframe(fmt, csv_sep)
 
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
 import asyncio
-import itertools
+import contextlib
+import hashlib
+import json
+import logging
+import math
 import resource
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Collection
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
 
 import aiohttp
 
 from scrapers.stores import LLM, LLMRequest, LLMResponse, LLMResponsePool
+from stores.llm_cache import LLMResponseCache, cache_key
 
 
 @dataclass(frozen=True)
@@ -23,6 +33,38 @@ class OpenAICompatibleConfig:
     # concurrency lanes. api_key adds an "Authorization: Bearer" header.
     base_url: str | None = None
     api_key: str | None = None
+    # A port whose server fails this many requests in a row is ejected: it
+    # gets no requests until a /models probe, at most every
+    # probe_interval_seconds, finds it up again. Lanes onto one base_url are
+    # never ejected.
+    eject_after_failures: int = 3
+    probe_interval_seconds: float = 15.0
+    # Finished responses are kept in this SQLite file, up to cache_max_bytes,
+    # and a repeated request is answered from it -- see stores/llm_cache.py.
+    cache_path: Path | None = None
+    cache_max_bytes: int = 4 << 30
+    # Tokens a port may hold at once, counting each request as its estimated
+    # prompt plus its max_tokens. A request past it waits for the port to
+    # drain rather than overflow the server's KV cache. None counts requests
+    # only, per_port_concurrency of them.
+    port_token_budget: int | None = None
+
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest request in a port's moving-average latency.
+_LATENCY_ALPHA = 0.2
+# Characters per prompt token until the servers' usage reports say otherwise;
+# Polish in the Qwen tokenizer is a little over three.
+_CHARS_PER_TOKEN = 3.0
+# Weight of the newest usage report in the characters-per-token average.
+_CHARS_PER_TOKEN_ALPHA = 0.05
+# Responses the pool's throughput is measured over, and how often it is logged.
+_THROUGHPUT_WINDOW_S = 60.0
+_THROUGHPUT_LOG_INTERVAL_S = 60.0
+# How many times the least-loaded port's load a request's home port may carry
+# and still get it: a prefix-cache hit saves the prefill, a queue costs more.
+_AFFINITY_SLACK = 2.0
 
 
 @dataclass(frozen=True)
@@ -31,12 +73,287 @@ class _QueuedRequest:
     request: LLMRequest
 
 
+@dataclass
+class _PortState:
+    in_flight: int = 0
+    tokens: int = 0
+    latency: float | None = None
+    failures: int = 0
+    ejected_at: float | None = None
+    probing: bool = False
+
+
+class _PortRouter:
+    """Picks the port for each request: the least-loaded healthy one.
+
+    A port's load is its requests in flight, with the new one, times its
+    moving-average latency. A vLLM instance that is slow, or busy with a long
+    thinking completion, so gets fewer requests, where a round-robin gave it
+    an equal share and the pool stalled behind it. A port that has not
+    answered yet counts as the average of those that have.
+    """
+
+    def __init__(
+        self,
+        ports: tuple[int, ...],
+        eject_after_failures: int,
+        probe_interval_seconds: float,
+        token_budget: int | None = None,
+    ) -> None:
+        self.ports = ports
+        self.eject_after_failures = eject_after_failures
+        self.probe_interval_seconds = probe_interval_seconds
+        self.token_budget = token_budget
+        self._state = {port: _PortState() for port in ports}
+        self._turn = 0
+
+    def healthy(self) -> list[int]:
+        return [p for p in self.ports if self._state[p].ejected_at is None]
+
+    def acquire(
+        self,
+        avoid: Collection[int] = (),
+        affinity: str | None = None,
+        tokens: int = 0,
+    ) -> int:
+        """Take the port the next request goes to, away from `avoid` if it can.
+
+        A request with an `affinity` goes to that affinity's home port, unless
+        the home is more than `_AFFINITY_SLACK` times as loaded as the least
+        loaded port. With a token budget, ports that have room for `tokens`
+        come first. With every port ejected the requests still go out, spread
+        over all of them, rather than failing without trying.
+        """
+        candidates = [p for p in self.healthy() if p not in avoid]
+        candidates = candidates or self.healthy() or list(self.ports)
+        if self.token_budget is not None:
+            budget = self.token_budget
+            roomy = [p for p in candidates if self._state[p].tokens + tokens <= budget]
+            candidates = roomy or candidates
+        known = [s.latency for s in self._state.values() if s.latency is not None]
+        default = sum(known) / len(known) if known else 1.0
+
+        def load(port: int) -> float:
+            state = self._state[port]
+            return (state.in_flight + 1) * (state.latency or default)
+
+        # Rotating where the scan starts spreads ties, e.g. before any latency
+        # is known, as the round-robin did.
+        start = self._turn % len(candidates)
+        self._turn += 1
+        port = min(candidates[start:] + candidates[:start], key=load)
+        if affinity is not None:
+            home = _home_port(affinity, candidates)
+            if load(home) <= _AFFINITY_SLACK * load(port):
+                port = home
+        self._state[port].in_flight += 1
+        self._state[port].tokens += tokens
+        return port
+
+    def release(self, port: int, tokens: int = 0) -> None:
+        self._state[port].in_flight -= 1
+        self._state[port].tokens -= tokens
+
+    def tokens(self) -> int:
+        """Tokens of the requests assigned to ports and not yet answered."""
+        return sum(state.tokens for state in self._state.values())
+
+    def succeeded(self, port: int, seconds: float) -> None:
+        state = self._state[port]
+        state.failures = 0
+        self._observe(state, seconds)
+
+    def failed(self, port: int, seconds: float) -> None:
+        """Count a failure the server is to blame for, ejecting after enough."""
+        state = self._state[port]
+        state.failures += 1
+        # A timeout is the slowest answer there is; the average should know.
+        self._observe(state, seconds)
+        if (
+            self.eject_after_failures
+            and state.ejected_at is None
+            and state.failures >= self.eject_after_failures
+        ):
+            state.ejected_at = time.monotonic()
+            logger.warning(
+                "LLM port %d ejected after %d failures in a row; %d ports left",
+                port,
+                state.failures,
+                len(self.healthy()),
+            )
+
+    def due_probes(self) -> list[int]:
+        """Ejected ports due a health probe, now marked as being probed."""
+        now = time.monotonic()
+        due = []
+        for port in self.ports:
+            state = self._state[port]
+            if state.ejected_at is None or state.probing:
+                continue
+            if now - state.ejected_at >= self.probe_interval_seconds:
+                state.probing = True
+                due.append(port)
+        return due
+
+    def probed(self, port: int, ok: bool) -> None:
+        state = self._state[port]
+        state.probing = False
+        if not ok:
+            state.ejected_at = time.monotonic()
+            return
+        state.ejected_at = None
+        state.failures = 0
+        # What it took before the ejection says nothing about it now.
+        state.latency = None
+        logger.info("LLM port %d re-admitted after a health probe", port)
+
+    @staticmethod
+    def _observe(state: _PortState, seconds: float) -> None:
+        if state.latency is None:
+            state.latency = seconds
+        else:
+            state.latency += _LATENCY_ALPHA * (seconds - state.latency)
+
+
+class _TokenBudget:
+    """Tokens one port may hold at once, admitting requests first come first.
+
+    A request bigger than the whole budget still gets in once the port is
+    idle; it could never get in otherwise.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.used = 0
+        self._waiting: deque[object] = deque()
+        self._changed = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, tokens: int) -> AsyncIterator[None]:
+        ticket = object()
+        async with self._changed:
+            self._waiting.append(ticket)
+            try:
+                await self._changed.wait_for(
+                    lambda: (
+                        self._waiting[0] is ticket
+                        and (self.used == 0 or self.used + tokens <= self.capacity)
+                    )
+                )
+            finally:
+                self._waiting.remove(ticket)
+                # The next in line may fit now, or the head may have left.
+                self._changed.notify_all()
+            self.used += tokens
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self.used -= tokens
+                self._changed.notify_all()
+
+
+def _home_port(affinity: str, ports: list[int]) -> int:
+    """The port `affinity` belongs on, by rendezvous hashing.
+
+    Each affinity ranks the ports by a hash of the pair and takes the first, so
+    ejecting a port moves only the affinities that were on it.
+    """
+    digest = hashlib.blake2b(affinity.encode("utf-8"), digest_size=8).digest()
+    return max(
+        ports,
+        key=lambda port: hashlib.blake2b(
+            port.to_bytes(4, "little"), key=digest, digest_size=8
+        ).digest(),
+    )
+
+
+async def _read_stream(
+    resp: aiohttp.ClientResponse, max_think_chars: int
+) -> dict[str, Any]:
+    """A streamed completion, put together in the shape of a whole one.
+
+    Reading stops once the model has thought for more than `max_think_chars`:
+    the answer is then what it said so far, with finish_reason "aborted", and
+    closing the connection makes vLLM drop the request and free the lane.
+    Thinking is counted from `reasoning_content` when the server splits it out,
+    and from the content between <think> and </think> when it does not; Qwen
+    emits each tag as one token, so a tag never spans two deltas.
+    """
+    content: list[str] = []
+    thought = 0
+    thinking = False
+    finish_reason = None
+    usage = None
+    async for raw in resp.content:
+        line = raw.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            continue
+        body = line.removeprefix("data:").strip()
+        if body == "[DONE]":
+            break
+        chunk = json.loads(body)
+        usage = chunk.get("usage") or usage
+        for choice in chunk.get("choices") or []:
+            delta = choice.get("delta") or {}
+            thought += len(delta.get("reasoning_content") or "")
+            text = delta.get("content") or ""
+            if "<think>" in text:
+                thinking = True
+            if thinking:
+                thought += len(text)
+            if "</think>" in text:
+                thinking = False
+            content.append(text)
+            finish_reason = choice.get("finish_reason") or finish_reason
+        if thought > max_think_chars:
+            finish_reason = "aborted"
+            break
+    return {
+        "choices": [
+            {"message": {"content": "".join(content)}, "finish_reason": finish_reason}
+        ],
+        "usage": usage,
+    }
+
+
+def _server_failure(exc: BaseException) -> bool:
+    """Whether a failed request says the server behind its port is unwell.
+
+    A 4xx is about the request, e.g. a prompt over the context length, and
+    would fail on any port.
+    """
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status >= 500
+    return isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
 class OpenAICompatibleMultiPortLLM(LLM):
     def __init__(self, config: OpenAICompatibleConfig | None = None) -> None:
         self.config = config or OpenAICompatibleConfig()
         if not self.config.ports:
             raise ValueError("At least one LLM port must be configured")
-        self._port_cycle = itertools.cycle(self.config.ports)
+        self._router = _PortRouter(
+            self.config.ports,
+            # Lanes onto one base_url share a server; ejecting one helps none.
+            0 if self.config.base_url else self.config.eject_after_failures,
+            self.config.probe_interval_seconds,
+            self.config.port_token_budget,
+        )
+        self._budgets = {
+            port: _TokenBudget(self.config.port_token_budget)
+            for port in self.config.ports
+            if self.config.port_token_budget is not None
+        }
+        self._chars_per_token = _CHARS_PER_TOKEN
+        # (finished at, prompt tokens, completion tokens) of recent responses.
+        self._finished: deque[tuple[float, int, int]] = deque()
+        self._probes: set[asyncio.Task[None]] = set()
+        self.cache = (
+            LLMResponseCache(self.config.cache_path, self.config.cache_max_bytes)
+            if self.config.cache_path is not None
+            else None
+        )
         self._semaphores = {
             port: asyncio.Semaphore(self.config.per_port_concurrency)
             for port in self.config.ports
@@ -87,20 +404,92 @@ class OpenAICompatibleMultiPortLLM(LLM):
     def response_pool(self) -> LLMResponsePool:
         return OpenAICompatibleResponsePool(self)
 
+    def estimate_tokens(self, request: LLMRequest) -> int:
+        """What `request` may hold of a server's KV cache: prompt and budget.
+
+        The prompt is estimated from its length in characters, at the ratio
+        the servers' usage reports have shown so far.
+        """
+        return math.ceil(len(request.prompt) / self._chars_per_token) + (
+            request.max_tokens
+        )
+
+    def throughput(self) -> dict[str, float]:
+        """Tokens per second over the last `_THROUGHPUT_WINDOW_S`, and in flight."""
+        now = time.monotonic()
+        while self._finished and now - self._finished[0][0] > _THROUGHPUT_WINDOW_S:
+            self._finished.popleft()
+        prompt = sum(p for _at, p, _c in self._finished)
+        completion = sum(c for _at, _p, c in self._finished)
+        return {
+            "prompt_tok_s": prompt / _THROUGHPUT_WINDOW_S,
+            "completion_tok_s": completion / _THROUGHPUT_WINDOW_S,
+            "tokens_in_flight": self._router.tokens(),
+        }
+
+    def _start_due_probes(self, session: aiohttp.ClientSession) -> None:
+        for port in self._router.due_probes():
+            task = asyncio.create_task(self._probe(session, port))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+
+    async def _probe(self, session: aiohttp.ClientSession, port: int) -> None:
+        _port, ok, detail = await self._check_port(session, port)
+        if not ok:
+            logger.info("LLM port %d still unhealthy: %s", port, detail)
+        self._router.probed(port, ok)
+
+    async def _stop_probes(self) -> None:
+        for task in self._probes:
+            task.cancel()
+        await asyncio.gather(*self._probes, return_exceptions=True)
+
     async def _complete_with_retry(
         self,
         session: aiohttp.ClientSession,
         request: LLMRequest,
     ) -> LLMResponse:
+        key = None
+        if self.cache is not None:
+            key = cache_key(
+                request,
+                request.model or self.config.model,
+                request.enable_thinking or self.config.enable_thinking,
+            )
+            # Off the loop: a read can wait on another process's write lock,
+            # and a write can set off an eviction over the whole table, and
+            # either would hold up every request and stream in the pool.
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+        response = await self._complete_routed(session, request)
+        if key is not None and self.cache is not None:
+            await asyncio.to_thread(self.cache.put, key, response)
+        return response
+
+    async def _complete_routed(
+        self,
+        session: aiohttp.ClientSession,
+        request: LLMRequest,
+    ) -> LLMResponse:
+        self._start_due_probes(session)
+        tokens = self.estimate_tokens(request)
         last_exc: Exception | None = None
+        tried: set[int] = set()
         for attempt in range(1, self.config.retries + 1):
-            port = next(self._port_cycle)
+            # A retry goes to another port while there is one to go to.
+            port = self._router.acquire(
+                avoid=tried, affinity=request.affinity, tokens=tokens
+            )
+            tried.add(port)
             try:
-                return await self._complete_once(session, port, request)
+                return await self._complete_once(session, port, request, tokens)
             except Exception as exc:
                 last_exc = exc
                 if attempt < self.config.retries:
                     await asyncio.sleep(0.5 * attempt)
+            finally:
+                self._router.release(port, tokens)
         assert last_exc is not None
         raise last_exc
 
@@ -109,6 +498,7 @@ class OpenAICompatibleMultiPortLLM(LLM):
         session: aiohttp.ClientSession,
         port: int,
         request: LLMRequest,
+        tokens: int = 0,
     ) -> LLMResponse:
         model = request.model or self.config.model
         payload = {
@@ -125,17 +515,34 @@ class OpenAICompatibleMultiPortLLM(LLM):
                     request.enable_thinking or self.config.enable_thinking
                 ),
             }
-        async with self._semaphores[port]:
-            async with session.post(
-                f"{self._endpoint(port)}/chat/completions",
-                json=payload,
-                headers=self._headers(),
-                timeout=aiohttp.ClientTimeout(
-                    total=self.config.request_timeout_seconds
-                ),
-            ) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
+        if request.max_think_chars is not None:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        budget = self._budgets.get(port)
+        async with (
+            self._semaphores[port],
+            budget.reserve(tokens) if budget else contextlib.nullcontext(),
+        ):
+            started = time.monotonic()
+            try:
+                async with session.post(
+                    f"{self._endpoint(port)}/chat/completions",
+                    json=payload,
+                    headers=self._headers(),
+                    timeout=aiohttp.ClientTimeout(
+                        total=self.config.request_timeout_seconds
+                    ),
+                ) as resp:
+                    resp.raise_for_status()
+                    if request.max_think_chars is None:
+                        data = await resp.json()
+                    else:
+                        data = await _read_stream(resp, request.max_think_chars)
+            except Exception as exc:
+                if _server_failure(exc):
+                    self._router.failed(port, time.monotonic() - started)
+                raise
+            self._router.succeeded(port, time.monotonic() - started)
         choice = data["choices"][0]
         content = choice["message"]["content"]
         finish_reason = choice.get("finish_reason")
@@ -147,6 +554,11 @@ class OpenAICompatibleMultiPortLLM(LLM):
         self.completion_tokens += completion_tokens
         self.total_tokens += total_tokens
         self.request_count += 1
+        self._finished.append((time.monotonic(), prompt_tokens, completion_tokens))
+        if prompt_tokens:
+            self._chars_per_token += _CHARS_PER_TOKEN_ALPHA * (
+                len(request.prompt) / prompt_tokens - self._chars_per_token
+            )
         return LLMResponse(
             content=content,
             finish_reason=finish_reason,
@@ -172,6 +584,7 @@ class OpenAICompatibleResponsePool(LLMResponsePool):
             tuple[int, LLMResponse | Exception]
         ] = asyncio.Queue()
         self._next_request_id = 0
+        self._logged_at = time.monotonic()
         self._session: aiohttp.ClientSession | None = None
         self._workers: list[asyncio.Task[None]] = []
 
@@ -195,6 +608,7 @@ class OpenAICompatibleResponsePool(LLMResponsePool):
                 worker.cancel()
             await asyncio.gather(*self._workers, return_exceptions=True)
 
+        await self._llm._stop_probes()
         if self._session is not None:
             await self._session.close()
             self._session = None
@@ -218,8 +632,14 @@ class OpenAICompatibleResponsePool(LLMResponsePool):
     async def get_response(self) -> tuple[int, LLMResponse | Exception]:
         response = await self._response_queue.get()
         self._capacity.release()
+        if time.monotonic() - self._logged_at >= _THROUGHPUT_LOG_INTERVAL_S:
+            self._logged_at = time.monotonic()
+            logger.info("LLM throughput: %s", self.stats())
         return response
 
+    def stats(self) -> dict[str, float]:
+        return self._llm.throughput()
+
     async def _worker(self) -> None:
         assert self._session is not None
         while True:
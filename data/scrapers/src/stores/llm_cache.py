@@ -0,0 +1,168 @@
+"""LLM responses kept on local disk, keyed by everything that shapes them.
+
+The article pipelines each kept their own cache by re-reading their previous
+JSONL output and checking hand-picked fields, and the extractor service kept
+none. This one sits under all of them, in the LLM client: a request with the
+same model, prompt, temperature, token budget and thinking flag as one answered
+before gets that answer back without reaching a server.
+
+A truncated response is not kept -- the next run should get the chance to
+finish it, not the same cut-off text. The file is capped at a size, and the
+least recently used responses go first when it is over.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from scrapers.stores import LLMRequest, LLMResponse
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    finish_reason TEXT,
+    model TEXT,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+# Eviction goes this far under the cap, so it runs once per many inserts
+# rather than on every one.
+_EVICT_TO = 0.9
+
+
+def cache_key(request: LLMRequest, model: str, enable_thinking: bool) -> str:
+    """The request as far as it shapes the answer, hashed.
+
+    `model` and `enable_thinking` are what the client sends, with its defaults
+    applied, not what the request left unset.
+    """
+    shape = [
+        model,
+        request.temperature,
+        request.max_tokens,
+        enable_thinking,
+        request.prompt,
+    ]
+    return hashlib.sha256(json.dumps(shape).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Finished LLM responses in an SQLite file, up to `max_bytes` of them.
+
+    Several pipeline processes can share one file: it is in WAL mode, and the
+    size is re-read from the table before anything is evicted.
+    """
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._pid = 0
+        self._size = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Reconnect in a forked child rather than share the parent's handle.
+        if self._db is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+            self._size = self._stored_size(self._db)
+        return self._db
+
+    @staticmethod
+    def _stored_size(db: sqlite3.Connection) -> int:
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> LLMResponse | None:
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT content, finish_reason, model, prompt_tokens,"
+                " completion_tokens, total_tokens FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with db:
+                db.execute(
+                    "UPDATE responses SET used = ? WHERE key = ?", (time.time(), key)
+                )
+            self.hits += 1
+        content, finish_reason, model, prompt, completion, total = row
+        return LLMResponse(
+            content=content,
+            finish_reason=finish_reason,
+            model=model,
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            total_tokens=total,
+        )
+
+    def put(self, key: str, response: LLMResponse) -> None:
+        """Keep `response` for `key`, unless it ran out of tokens or is empty."""
+        if response.truncated or not response.content:
+            return
+        size = len(key) + len(response.content.encode("utf-8"))
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        response.content,
+                        response.finish_reason,
+                        response.model,
+                        response.prompt_tokens,
+                        response.completion_tokens,
+                        response.total_tokens,
+                        size,
+                        time.time(),
+                    ),
+                )
+            self._size += size
+            if self._size > self.max_bytes:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        # Other processes write to the file too; what this one counted is only
+        # a hint that it is time to look.
+        self._size = self._stored_size(db)
+        if self._size <= self.max_bytes:
+            return
+        keep = int(self.max_bytes * _EVICT_TO)
+        with db:
+            db.execute(
+                "DELETE FROM responses WHERE used <= ("
+                " SELECT used FROM ("
+                "  SELECT used, SUM(size) OVER (ORDER BY used DESC) AS kept"
+                "  FROM responses"
+                " ) WHERE kept > ? ORDER BY used DESC LIMIT 1"
+                ")",
+                (keep,),
+            )
+        self._size = self._stored_size(db)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
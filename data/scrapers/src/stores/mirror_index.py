@@ -0,0 +1,173 @@
+"""Single pages out of the compressed mirror, without extracting a host.
+
+A mirror archive is one gzip stream, written by the compressor, and there is no
+getting one member out of it without inflating everything before it. So each
+archive is inflated once, to a plain tar next to it, and every member's data
+offset in that tar goes into an SQLite table keyed by the page's path. A lookup
+is then one B-tree search and one read of exactly the page's bytes.
+
+This replaced extracting the host into a flat directory -- hundreds of
+thousands of files, one per crawl -- and globbing that directory for every URL
+resolved. The flat names also folded `/` into `.`, so `a/b` and `a.b` were one
+page; the index keys on the path as it was.
+
+The index records which archives it was built from, by path, size and mtime,
+and is rebuilt when they change: a new snapshot or delta for the host.
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tarfile
+import threading
+from pathlib import Path
+from typing import Iterator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    path TEXT NOT NULL,
+    date TEXT NOT NULL,
+    archive TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (path, date)
+) WITHOUT ROWID;
+"""
+
+# The path and the crawl date of a mirror member, `host/<path>/date=<date>`.
+_DATE_SEGMENT = "/date="
+
+Location = tuple[Path, int, int]
+
+
+def member_key(host: str, name: str) -> tuple[str, str] | None:
+    """(page path, crawl date) of a member, None for one that is not a page."""
+    rel = name.removeprefix(f"{host}/")
+    path, found, date = rel.rpartition(_DATE_SEGMENT)
+    if not found or not path:
+        return None
+    return path, date
+
+
+class MirrorIndex:
+    """Where each page of one host's mirror archives is, on local disk."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._pid = 0
+
+    @property
+    def _path(self) -> Path:
+        return self.directory / "index.sqlite"
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not cross a fork, and the article workers fork.
+        if self._db is None or self._pid != os.getpid():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self._path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    def _sources(self) -> list[tuple[str, int, float]]:
+        rows = self._connect().execute(
+            "SELECT source, size, mtime FROM archives ORDER BY position"
+        )
+        return [(source, size, mtime) for source, size, mtime in rows]
+
+    def covers(self, archives: list[Path]) -> bool:
+        """Whether the index was built from exactly these archives, as they are."""
+        with self._lock:
+            wanted = []
+            for archive in archives:
+                stat = archive.stat()
+                wanted.append((str(archive), stat.st_size, stat.st_mtime))
+            return self._sources() == wanted
+
+    def build(self, host: str, archives: list[Path]) -> None:
+        """Index `archives`, oldest first; a page in a later one wins."""
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute("DELETE FROM members")
+                db.execute("DELETE FROM archives")
+            for stale in self.directory.glob("*.tar"):
+                stale.unlink()
+            for position, archive in enumerate(archives):
+                tar_path = self.directory / f"{position}.tar"
+                _inflate(archive, tar_path)
+                stat = archive.stat()
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?)",
+                        _members(host, tar_path),
+                    )
+                    db.execute(
+                        "INSERT INTO archives VALUES (?, ?, ?, ?)",
+                        (str(archive), stat.st_size, stat.st_mtime, position),
+                    )
+
+    def locate(self, path: str) -> Location | None:
+        """Where the newest crawl of `path` is: (tar, offset, length)."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT archive, offset, length FROM members"
+                    " WHERE path = ? ORDER BY date DESC LIMIT 1",
+                    (path,),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        archive, offset, length = row
+        return self.directory / archive, offset, length
+
+    def read(self, path: str) -> bytes | None:
+        """The newest crawl of `path`, None when the mirror does not have it."""
+        location = self.locate(path)
+        if location is None:
+            return None
+        tar_path, offset, length = location
+        with open(tar_path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def delete(self) -> None:
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _inflate(archive: Path, tar_path: Path) -> None:
+    partial = tar_path.with_suffix(".part")
+    with gzip.open(archive, "rb") as src, open(partial, "wb") as out:
+        shutil.copyfileobj(src, out, 1 << 20)
+    os.replace(partial, tar_path)
+
+
+def _members(host: str, tar_path: Path) -> Iterator[tuple[str, str, str, int, int]]:
+    with tarfile.open(tar_path, "r:") as tf:
+        for member in tf:
+            if not member.isfile() or member.name == "index.txt":
+                continue
+            key = member_key(host, member.name)
+            if key is None:
+                continue
+            path, date = key
+            yield path, date, tar_path.name, member.offset_data, member.size
@@ -24,6 +24,7 @@ from uuid_extensions import uuid7str  # type: ignore
 
 from entities.util import NormalizedParse
 from scrapers.stores import IO, CloudStorage
+from scrapers.stores.batch_archive import BatchArchiveWriter
 from scrapers.stores.file import DownloadableFile
 from stores.user import get_username, pick_user
 
@@ -32,6 +33,7 @@ SHARED_BUCKET = "koryta-pl-sharedcache"
 warsaw_tz = ZoneInfo("Europe/Warsaw")
 
 
+_LISTING_FIELDS = "items(name,size,generation,updated),nextPageToken"
 _GCS_POOL_SIZE = 256  # generous cap; pool is lazy so unused slots cost nothing
 
 
@@ -67,10 +69,13 @@ class Client:
         only whether the path exists. The truncation is then permanent, and
         silent, because half a JSON document raises a parse error somewhere
         else entirely.
+
+        The partial file is named for the thread writing it: `prefetch` runs
+        these on a pool, and two writers sharing one `.part` would interleave.
         """
         bucket = self.storage_client.bucket(CRAWLED_BUCKET)
         blob = bucket.blob(blob_name)
-        partial = f"{filename}.part"
+        partial = f"{filename}.{os.getpid()}.{threading.get_ident()}.part"
         try:
             if not binary:
                 # TODO try removing it and just using download_to_filename
@@ -89,7 +94,11 @@ class Client:
             raise
 
     def cached_storage(
-        self, blob_name: str, binary: bool, size: int | None = None
+        self,
+        blob_name: str,
+        binary: bool,
+        size: int | None = None,
+        listed: storage.Blob | None = None,
     ) -> DownloadableFile:
         filename = blob_name.replace("/", ".")
         return DownloadableFile(
@@ -100,8 +109,22 @@ class Client:
             ),
             binary=binary,
             size=size,
+            generation=None if listed is None else listed.generation,
+            updated=(
+                None
+                if listed is None or listed.updated is None
+                else listed.updated.isoformat()
+            ),
         )
 
+    def read_range(self, blob_name: str, start: int, length: int | None) -> bytes:
+        """`length` bytes of a crawled blob from `start`, the last -`start` if
+        negative, in one ranged GET."""
+        blob = self.storage_client.bucket(CRAWLED_BUCKET).blob(blob_name)
+        end = None if length is None else start + length - 1
+        # The whole object's checksum says nothing about a slice of it.
+        return blob.download_as_bytes(start=start, end=end, checksum=None)
+
     def list_blobs(self, ref: CloudStorage) -> Generator[DownloadableFile, None, None]:
         """Lists blobs in a GCS bucket with a given prefix."""
         bucket = self.storage_client.bucket(CRAWLED_BUCKET)
@@ -142,12 +165,18 @@ class Client:
 
         # Now list all blobs recursively under the chosen prefix
         print(f"Attempting bucket.list_blobs(prefix={prefix}, match_glob={glob})")
-        blobs = bucket.list_blobs(prefix=prefix, match_glob=glob)
+        # Only the fields a reference carries: a listing page is otherwise
+        # mostly ACLs, hashes and metadata nothing here reads.
+        blobs = bucket.list_blobs(
+            prefix=prefix, match_glob=glob, fields=_LISTING_FIELDS
+        )
         for blob in blobs:
             # blob.size comes from the listing response, so carrying it here
             # costs no extra request and saves a caller a download each time
             # it needs to tell a failed crawl from a real one.
-            yield self.cached_storage(blob.name, ref.binary, size=blob.size)
+            yield self.cached_storage(
+                blob.name, ref.binary, size=blob.size, listed=blob
+            )
 
     def iterate_blobs(self, io: IO, ref: CloudStorage):
         """List blobs for a given hostname and yield their path and JSON data."""
@@ -489,14 +518,10 @@ class BatchClient(Client):
         with lock:
             if key not in self._batches:
                 uid = uuid7str()
-                buf = io.BytesIO()
-                tar = tarfile.open(fileobj=buf, mode="w:gz")
                 self._batches[key] = {
                     "uid": uid,
-                    "buffer": buf,
-                    "tar": tar,
+                    "archive": BatchArchiveWriter(),
                     "uncompressed_size": 0,
-                    "index": [],
                     "last_updated": time.monotonic(),
                 }
 
@@ -512,12 +537,8 @@ class BatchClient(Client):
             if isinstance(data, str):
                 data = data.encode("utf-8")
 
-            info = tarfile.TarInfo(name=rel_path)
-            info.size = len(data)
-            info.mtime = int(datetime.now(warsaw_tz).timestamp())
-
-            batch["tar"].addfile(info, io.BytesIO(data))
-            batch["index"].append(rel_path)
+            mtime = int(datetime.now(warsaw_tz).timestamp())
+            batch["archive"].add(rel_path, data, mtime)
             batch["uncompressed_size"] += len(data)
             batch["last_updated"] = time.monotonic()
 
@@ -528,14 +549,8 @@ class BatchClient(Client):
             return f"gs://{CRAWLED_BUCKET}/hostname={hostname}/date={date}/uid_{batch['uid']}.tar.gz"
 
     def _flush_batch(self, key, batch):
-        index_data = ("\n".join(batch["index"]) + "\n").encode("utf-8")
-        idx_info = tarfile.TarInfo(name="index.txt")
-        idx_info.size = len(index_data)
-        idx_info.mtime = int(datetime.now(warsaw_tz).timestamp())
-        batch["tar"].addfile(idx_info, io.BytesIO(index_data))
-
-        batch["tar"].close()
-        compressed_data = batch["buffer"].getvalue()
+        mtime = int(datetime.now(warsaw_tz).timestamp())
+        compressed_data = batch["archive"].finish(mtime)
 
         hostname, date = key
         uid = batch["uid"]
@@ -0,0 +1,349 @@
+"""Routing LLM requests across vLLM ports by load, latency and health."""
+
+import asyncio
+import json
+import socket
+import time
+from typing import Any
+
+from aiohttp import web
+
+from scrapers.stores import LLMRequest, LLMResponse
+from stores.llm import (
+    OpenAICompatibleConfig,
+    OpenAICompatibleMultiPortLLM,
+    _PortRouter,
+    _TokenBudget,
+)
+
+
+def test_a_slow_port_gets_fewer_requests():
+    router = _PortRouter((1, 2), eject_after_failures=3, probe_interval_seconds=15)
+    router.succeeded(1, 0.5)
+    router.succeeded(2, 2.0)
+
+    picked = [router.acquire() for _ in range(10)]
+
+    assert picked.count(1) == 8
+    assert picked.count(2) == 2
+
+
+def test_equal_ports_share_the_load():
+    router = _PortRouter((1, 2, 3), eject_after_failures=3, probe_interval_seconds=15)
+
+    picked = [router.acquire() for _ in range(9)]
+
+    assert sorted(picked) == [1, 1, 1, 2, 2, 2, 3, 3, 3]
+
+
+def test_requests_with_one_affinity_stay_on_one_port_until_it_is_busy():
+    router = _PortRouter(
+        tuple(range(16)), eject_after_failures=1, probe_interval_seconds=15
+    )
+
+    home = router.acquire(affinity="article")
+    assert router.acquire(affinity="article") == home
+    assert router.acquire(affinity="article") != home
+
+    other = next(port for port in range(16) if port != home)
+    router.failed(other, 1.0)
+    for _ in range(2):
+        router.release(home)
+    assert router.acquire(affinity="article") == home
+
+
+def test_a_failing_port_is_ejected_until_a_probe_finds_it_up():
+    router = _PortRouter((1, 2), eject_after_failures=2, probe_interval_seconds=0)
+    router.failed(1, 90.0)
+    router.failed(1, 90.0)
+
+    assert router.healthy() == [2]
+    assert {router.acquire() for _ in range(4)} == {2}
+    assert router.due_probes() == [1]
+    assert router.due_probes() == []
+
+    router.probed(1, ok=True)
+
+    assert router.healthy() == [1, 2]
+
+
+def test_success_in_between_resets_the_failure_count():
+    router = _PortRouter((1, 2), eject_after_failures=2, probe_interval_seconds=15)
+    router.failed(1, 1.0)
+    router.succeeded(1, 1.0)
+    router.failed(1, 1.0)
+
+    assert router.healthy() == [1, 2]
+
+
+def test_ports_with_room_in_their_token_budget_come_first():
+    router = _PortRouter(
+        (1, 2), eject_after_failures=3, probe_interval_seconds=15, token_budget=100
+    )
+    router.succeeded(1, 0.5)
+    router.succeeded(2, 2.0)
+
+    assert router.acquire(tokens=80) == 1
+    assert router.acquire(tokens=80) == 2
+    assert router.tokens() == 160
+
+
+def test_requests_past_the_token_budget_wait_their_turn():
+    async def scenario() -> list[str]:
+        budget = _TokenBudget(100)
+        order: list[str] = []
+
+        async def request(name: str, tokens: int, seconds: float) -> None:
+            async with budget.reserve(tokens):
+                order.append(name)
+                await asyncio.sleep(seconds)
+
+        await asyncio.gather(
+            request("long", 70, 0.05),
+            request("too big now", 50, 0),
+            request("would fit", 10, 0),
+            request("bigger than all", 500, 0),
+        )
+        return order
+
+    assert asyncio.run(scenario()) == [
+        "long",
+        "too big now",
+        "would fit",
+        "bigger than all",
+    ]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+async def serve(port: int, state: dict[str, Any]) -> web.AppRunner:
+    """A vLLM stand-in on `port` that answers 500 while `state["down"]`.
+
+    A streamed request gets the deltas in `state["stream"]`, one per event.
+    """
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        state["calls"] = state.get("calls", 0) + 1
+        if state["down"]:
+            return web.Response(status=500)
+        if (await request.json()).get("stream"):
+            return await stream(request)
+        return web.json_response(
+            {
+                "choices": [
+                    {"message": {"content": str(port)}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 30},
+            }
+        )
+
+    async def stream(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        events: list[dict[str, Any]] = [
+            {"choices": [{"delta": delta}]} for delta in state["stream"]
+        ]
+        events.append({"choices": [{"delta": {}, "finish_reason": "stop"}]})
+        events.append({"choices": [], "usage": {"prompt_tokens": 3}})
+        try:
+            for event in events:
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+                await asyncio.sleep(0.001)
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            pass  # the client stopped reading, as an aborted one does
+        return response
+
+    async def models(request: web.Request) -> web.Response:
+        return web.Response(status=500 if state["down"] else 200)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    app.router.add_get("/v1/models", models)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+    return runner
+
+
+def test_requests_avoid_an_unhealthy_server_and_come_back_to_it():
+    async def scenario() -> list[str]:
+        ports = (free_port(), free_port())
+        states: dict[int, dict[str, Any]] = {
+            ports[0]: {"down": True},
+            ports[1]: {"down": False},
+        }
+        runners = [await serve(port, states[port]) for port in ports]
+        llm = OpenAICompatibleMultiPortLLM(
+            OpenAICompatibleConfig(
+                ports=ports,
+                retries=2,
+                eject_after_failures=1,
+                probe_interval_seconds=0,
+            )
+        )
+        answers = []
+        try:
+            async with llm.response_pool() as pool:
+                for _ in range(4):
+                    await pool.put_request(LLMRequest(prompt="hi", max_tokens=8))
+                    _id, response = await pool.get_response()
+                    assert not isinstance(response, Exception)
+                    answers.append(response.content)
+                states[ports[0]]["down"] = False
+                for _ in range(20):
+                    await pool.put_request(LLMRequest(prompt="hi", max_tokens=8))
+                    await pool.get_response()
+                    if ports[0] in llm._router.healthy():
+                        break
+                    await asyncio.sleep(0.01)
+            assert llm._router.healthy() == list(ports)
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+        return [answer for answer in answers if answer != str(ports[1])]
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_a_repeated_request_is_answered_from_the_cache(tmp_path):
+    async def scenario() -> tuple[list[str], int]:
+        port = free_port()
+        state: dict[str, Any] = {"down": False}
+        runner = await serve(port, state)
+        llm = OpenAICompatibleMultiPortLLM(
+            OpenAICompatibleConfig(ports=(port,), cache_path=tmp_path / "llm.sqlite")
+        )
+        answers = []
+        try:
+            async with llm.response_pool() as pool:
+                for _ in range(3):
+                    await pool.put_request(LLMRequest(prompt="hi", max_tokens=8))
+                    _id, response = await pool.get_response()
+                    assert not isinstance(response, Exception)
+                    answers.append(response.content)
+        finally:
+            await runner.cleanup()
+        return answers, state["calls"]
+
+    answers, calls = asyncio.run(scenario())
+
+    assert answers == [answers[0]] * 3
+    assert calls == 1
+
+
+class SlowCache:
+    """A cache whose every call blocks its thread, as a locked SQLite file does."""
+
+    def get(self, key: str) -> LLMResponse | None:
+        time.sleep(0.2)
+        return None
+
+    def put(self, key: str, response: LLMResponse) -> None:
+        time.sleep(0.2)
+
+
+def test_a_slow_cache_does_not_hold_up_the_loop():
+    async def scenario() -> int:
+        port = free_port()
+        runner = await serve(port, {"down": False})
+        llm = OpenAICompatibleMultiPortLLM(OpenAICompatibleConfig(ports=(port,)))
+        llm.cache = SlowCache()  # type: ignore[assignment]
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        try:
+            async with llm.response_pool() as pool:
+                await pool.put_request(LLMRequest(prompt="hi", max_tokens=8))
+                await pool.get_response()
+        finally:
+            ticker.cancel()
+            await runner.cleanup()
+        return ticks
+
+    # Blocked for the 0.4s the cache takes, the ticker would not move at all.
+    assert asyncio.run(scenario()) > 10
+
+
+def test_the_pool_reports_throughput_and_learns_the_prompt_token_ratio():
+    async def scenario() -> dict[str, float]:
+        port = free_port()
+        runner = await serve(port, {"down": False})
+        llm = OpenAICompatibleMultiPortLLM(
+            OpenAICompatibleConfig(ports=(port,), port_token_budget=1000)
+        )
+        request = LLMRequest(prompt="x" * 300, max_tokens=8)
+        before = llm.estimate_tokens(request)
+        try:
+            async with llm.response_pool() as pool:
+                await pool.put_request(request)
+                await pool.get_response()
+                stats = pool.stats()
+        finally:
+            await runner.cleanup()
+        # The stand-in server reports one token for the whole prompt.
+        assert llm.estimate_tokens(request) < before
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert stats["completion_tok_s"] > 0
+    assert stats["tokens_in_flight"] == 0
+
+
+def ask(state: dict[str, Any], request: LLMRequest) -> LLMResponse:
+    async def scenario() -> LLMResponse:
+        port = free_port()
+        runner = await serve(port, state)
+        llm = OpenAICompatibleMultiPortLLM(OpenAICompatibleConfig(ports=(port,)))
+        try:
+            async with llm.response_pool() as pool:
+                await pool.put_request(request)
+                _id, response = await pool.get_response()
+        finally:
+            await runner.cleanup()
+        assert not isinstance(response, Exception)
+        return response
+
+    return asyncio.run(scenario())
+
+
+def test_a_streamed_answer_is_put_together():
+    state: dict[str, Any] = {
+        "down": False,
+        "stream": [
+            {"reasoning_content": "Hmm."},
+            {"content": "Werdykt: "},
+            {"content": "TAK"},
+        ],
+    }
+
+    response = ask(state, LLMRequest("q", max_tokens=8, max_think_chars=100))
+
+    assert response.content == "Werdykt: TAK"
+    assert response.finish_reason == "stop"
+    assert response.prompt_tokens == 3
+
+
+def test_a_runaway_think_is_cut_off():
+    state: dict[str, Any] = {
+        "down": False,
+        "stream": [{"content": "<think>"}] + [{"content": "hmm "}] * 2000,
+    }
+
+    response = ask(state, LLMRequest("q", max_tokens=8, max_think_chars=100))
+
+    assert response.finish_reason == "aborted"
+    assert response.truncated
+    assert 100 < len(response.content) < 200
+    assert state["calls"] == 1
@@ -0,0 +1,48 @@
+"""Keeping finished LLM responses on disk, keyed by what shapes them."""
+
+from scrapers.stores import LLMRequest, LLMResponse
+from stores.llm_cache import LLMResponseCache, cache_key
+
+
+def key(prompt: str, **kwargs) -> str:
+    return cache_key(LLMRequest(prompt=prompt, max_tokens=64, **kwargs), "m", False)
+
+
+def answer(content: str, finish_reason: str = "stop") -> LLMResponse:
+    return LLMResponse(
+        content=content, port=6000, model="m", finish_reason=finish_reason
+    )
+
+
+def test_a_response_comes_back_for_the_same_request_only(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+    cache.put(key("a"), answer("A"))
+
+    again = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+
+    hit = again.get(key("a"))
+    assert hit is not None and hit.content == "A" and hit.port is None
+    assert again.get(key("a", temperature=0.7)) is None
+    assert cache_key(LLMRequest("a", 64), "m", True) != key("a")
+    assert (again.hits, again.misses) == (1, 1)
+
+
+def test_a_truncated_response_is_not_kept(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+
+    cache.put(key("a"), answer("A, B i", finish_reason="length"))
+
+    assert cache.get(key("a")) is None
+
+
+def test_the_least_recently_used_go_when_over_the_cap(tmp_path):
+    entry = len(key("0")) + 100
+    cache = LLMResponseCache(tmp_path / "llm.sqlite", max_bytes=entry * 4)
+    for i in range(4):
+        cache.put(key(str(i)), answer("x" * 100))
+    cache.get(key("0"))
+
+    cache.put(key("4"), answer("x" * 100))
+
+    kept = [i for i in range(5) if cache.get(key(str(i))) is not None]
+    assert kept == [0, 3, 4]
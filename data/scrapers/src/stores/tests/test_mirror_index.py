@@ -0,0 +1,88 @@
+"""Pages out of the compressed mirror, looked up rather than extracted."""
+
+import argparse
+import io
+import tarfile
+
+import pytest
+
+from scrapers.stores.file import NotInMirrorError
+from stores import download
+from stores.download import CompressedMirror
+from stores.mirror_index import member_key
+
+HOST = "example.pl"
+
+
+def write_archive(path, pages: dict[str, bytes]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in {**pages, "index.txt": b""}.items():
+            info = tarfile.TarInfo(name if name == "index.txt" else f"{HOST}/{name}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "base_dir", tmp_path / "downloaded")
+    found = CompressedMirror()
+    found.__dict__["args"] = argparse.Namespace(
+        compressed_mirror_bucket=str(tmp_path / "bucket"), no_mirror=False
+    )
+    return found
+
+
+def archive_path(tmp_path, name: str):
+    return tmp_path / "bucket" / f"hostname={HOST}" / name
+
+
+def test_the_newest_crawl_of_a_page_is_read(tmp_path, mirror):
+    write_archive(
+        archive_path(tmp_path, "total/date=2026-07-01.tar.gz"),
+        {
+            "kraj/artykul/date=2026-06-01": b"old",
+            "kraj/artykul/date=2026-06-20": b"new",
+            "kraj.artykul/date=2026-06-30": b"not the same page",
+            "index/date=2026-06-01": b"home",
+        },
+    )
+
+    assert mirror.get(f"https://{HOST}/kraj/artykul") == b"new"
+    assert mirror.get(f"https://{HOST}/") == b"home"
+    with pytest.raises(NotInMirrorError):
+        mirror.get(f"https://{HOST}/kraj/inny")
+
+
+def test_a_delta_chain_is_read_whole_and_rebuilt_when_it_grows(tmp_path, mirror):
+    write_archive(
+        archive_path(tmp_path, "from=a/date=2026-06-01.tar.gz"),
+        {"a/date=2026-05-01": b"a", "b/date=2026-05-01": b"b1"},
+    )
+    assert mirror.get(f"https://{HOST}/a") == b"a"
+
+    write_archive(
+        archive_path(tmp_path, "from=b/date=2026-07-01.tar.gz"),
+        {"b/date=2026-06-15": b"b2"},
+    )
+    again = CompressedMirror()
+    again.__dict__["args"] = mirror.args
+    assert again.get(f"https://{HOST}/a") == b"a"
+    assert again.get(f"https://{HOST}/b") == b"b2"
+
+
+def test_a_host_missing_from_the_mirror_says_so(mirror):
+    with pytest.raises(NotInMirrorError):
+        mirror.get("https://nie-ma.pl/x")
+
+
+@pytest.mark.parametrize(
+    "name, key",
+    [
+        (f"{HOST}/a/b/date=2026-01-02", ("a/b", "2026-01-02")),
+        (f"{HOST}/date=2026-01-02", None),
+        (f"{HOST}/a/b", None),
+    ],
+)
+def test_member_key(name, key):
+    assert member_key(HOST, name) == key
@@ -0,0 +1,94 @@
+"""Prefetching downloads ahead of the reader without reordering anything."""
+
+import threading
+import time
+
+import pytest
+
+from scrapers.stores.file import DownloadableFile
+from stores import download
+from stores.download import prefetch
+
+
+class Downloads:
+    """Download lambdas that take a while and count how many run at once."""
+
+    def __init__(self, fail: str | None = None):
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+        self.fetched: list[str] = []
+
+    def ref(self, name: str) -> DownloadableFile:
+        return DownloadableFile(
+            f"gs://bucket/{name}",
+            name,
+            download_lambda=lambda path: self.fetch(name, path),
+        )
+
+    def fetch(self, name, path):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+            self.fetched.append(name)
+        if name == self.fail:
+            raise ConnectionError("connection reset")
+        path.write_text(name)
+        return path
+
+
+@pytest.fixture(autouse=True)
+def downloaded_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "base_dir", tmp_path)
+    return tmp_path
+
+
+def test_refs_come_back_in_order_and_downloaded(downloaded_dir):
+    downloads = Downloads()
+    names = [f"blob.{i}" for i in range(40)]
+    refs = [downloads.ref(name) for name in names]
+
+    for ref in prefetch(refs, workers=8):
+        assert (downloaded_dir / ref.filename).read_text() == ref.filename
+
+    assert downloads.most > 1
+    assert sorted(downloads.fetched) == sorted(names)
+
+
+def test_cached_and_repeated_refs_are_fetched_once(downloaded_dir):
+    downloads = Downloads()
+    (downloaded_dir / "blob.cached").write_text("cached")
+    refs = [
+        downloads.ref("blob.cached"),
+        downloads.ref("blob.x"),
+        "not a file",
+        downloads.ref("blob.x"),
+    ]
+
+    assert list(prefetch(refs)) == refs
+    assert downloads.fetched == ["blob.x"]
+
+
+def test_a_failure_raises_at_its_ref():
+    downloads = Downloads(fail="blob.2")
+    ahead = prefetch([downloads.ref(f"blob.{i}") for i in range(5)], workers=4)
+
+    assert [next(ahead).filename for _ in range(2)] == ["blob.0", "blob.1"]
+    with pytest.raises(ConnectionError):
+        next(ahead)
+
+
+def test_stopping_early_leaves_nothing_running(monkeypatch):
+    monkeypatch.setattr(download, "_PREFETCH_AHEAD", 4)
+    downloads = Downloads()
+    ahead = prefetch([downloads.ref(f"blob.{i}") for i in range(100)], workers=2)
+
+    next(ahead)
+    ahead.close()
+
+    assert downloads.running == 0
+    assert len(downloads.fetched) < 10
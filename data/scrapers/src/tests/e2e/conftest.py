@@ -127,6 +127,8 @@ def read_output():
             df = pd.read_json(path, lines=True)
         elif fmt == "csv":
             df = pd.read_csv(path)
+        elif fmt == "parquet":
+            df = pd.read_parquet(path)
         else:
             raise ValueError(f"Unsupported format {fmt}")
 
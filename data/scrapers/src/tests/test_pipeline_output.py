@@ -2,6 +2,7 @@ import csv
 import json
 import os
 
+import pandas as pd
 import pytest
 
 from stores.config import VERSIONED_DIR
@@ -22,7 +23,7 @@ COLUMNS_IN_FILE = {
         "birth_date",
         "employed_krs",
     ],
-    "company_krs.jsonl": [
+    "company_krs.parquet": [
         "krs",
         "name",
         "city",
@@ -32,7 +33,7 @@ COLUMNS_IN_FILE = {
         "party",
         "pkw_name",
     ],
-    "people_merged.jsonl": [
+    "people_merged.parquet": [
         "overall_score",
         "krs_name",
     ],
@@ -73,6 +74,11 @@ def test_pipeline_output(filename, column):
     should_exist = not column.startswith("-")
     column = column.removeprefix("-")
 
+    if filename.endswith(".parquet"):
+        columns = pd.read_parquet(path).columns
+        assert (column in columns) == should_exist, f"{filename}: {list(columns)}"
+        return
+
     with open(path, "r") as f:
         # Check first 10 lines
         iterator = enumerate(f)